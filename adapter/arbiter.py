@@ -0,0 +1,169 @@
+# adapter/arbiter.py
+"""
+Priority command arbiter in front of one adapter session.
+
+Everything that talks to the adapter (DTC reads/clears, brand readers,
+live-data sweeps, the background poller) submits a job: a function that
+gets exclusive use of the session until it returns. Jobs run one at a
+time on a worker thread, lowest priority number first, so a DTC read
+started from the GUI waits at most for the poll request already on the
+wire, never for the whole dashboard queue. Background jobs can be paused
+and resumed without touching the adapter state.
+
+    arbiter = arbiter_for(session)
+    raw = arbiter.run(lambda s: s.send_command("03"), INTERACTIVE)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Lower runs first
+INTERACTIVE = 0       # user actions: read/clear DTC, brand readers
+NORMAL = 5            # one-shot sweeps, discovery
+BACKGROUND = 10       # continuous polling
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# Wait times kept per priority for stats()
+WAIT_HISTORY = 256
+
+Job = Callable[[Any], Any]
+
+
+@dataclass(order=True)
+class _Entry:
+    priority: int
+    seq: int
+    fn: Job = field(compare=False)
+    future: Future = field(compare=False)
+    name: str = field(compare=False, default="")
+    queued: float = field(compare=False, default_factory=time.monotonic)
+
+
+class CommandArbiter:
+    def __init__(self, session):
+        self.session = session
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._paused = False
+        self._running: Optional[_Entry] = None
+        self._worker = None
+        self._waits: Dict[int, deque] = {}
+
+    # ---------------- Submitting work ----------------
+    def submit(self, fn: Job, priority: int = NORMAL, name: str = "") -> Future:
+        """Queue `fn(session)`; the returned future resolves with its result."""
+        entry = _Entry(priority, next(self._seq), fn, Future(), name or getattr(fn, "__name__", ""))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._ensure_worker()
+            self._cond.notify_all()
+        return entry.future
+
+    def run(self, fn: Job, priority: int = INTERACTIVE, timeout: Optional[float] = None,
+            name: str = ""):
+        """Submit and wait. Called from inside a job it runs inline (no deadlock)."""
+        if threading.current_thread() is self._worker:
+            return fn(self.session)
+        return self.submit(fn, priority, name).result(timeout)
+
+    def send(self, cmd: str, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> str:
+        return self.run(lambda session: session.send_command(cmd), priority, timeout, name=cmd)
+
+    # ---------------- Pause / resume ----------------
+    def pause(self):
+        """Hold background jobs in the queue; higher priorities still run."""
+        with self._cond:
+            self._paused = True
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    # ---------------- Statistics ----------------
+    def stats(self) -> Dict:
+        """Queue depth per priority, the running job, and recent wait times."""
+        with self._cond:
+            depth: Dict[str, int] = {}
+            for entry in self._queue:
+                label = PRIORITY_NAMES.get(entry.priority, str(entry.priority))
+                depth[label] = depth.get(label, 0) + 1
+            waits = {}
+            for priority, samples in self._waits.items():
+                if samples:
+                    waits[PRIORITY_NAMES.get(priority, str(priority))] = {
+                        "count": len(samples),
+                        "avg": sum(samples) / len(samples),
+                        "max": max(samples),
+                    }
+            return {
+                "depth": len(self._queue),
+                "depth_by_priority": depth,
+                "running": self._running.name if self._running else None,
+                "paused": self._paused,
+                "wait": waits,
+            }
+
+    # ---------------- Worker ----------------
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="CommandArbiter", daemon=True)
+            self._worker.start()
+
+    def _next_entry(self) -> Optional[_Entry]:
+        if not self._queue:
+            return None
+        if self._paused and self._queue[0].priority >= BACKGROUND:
+            return None        # only paused background work left
+        return heapq.heappop(self._queue)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                entry = self._next_entry()
+                while entry is None:
+                    self._cond.wait()
+                    entry = self._next_entry()
+                if not entry.future.set_running_or_notify_cancel():
+                    continue
+                self._running = entry
+                self._waits.setdefault(entry.priority, deque(maxlen=WAIT_HISTORY)).append(
+                    time.monotonic() - entry.queued)
+            try:
+                # each job gets a fresh recovery budget (adapter.recovery)
+                new_cycle = getattr(self.session, "new_cycle", None)
+                if new_cycle:
+                    new_cycle()
+                entry.future.set_result(entry.fn(self.session))
+            except BaseException as exc:
+                entry.future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._running = None
+
+
+_arbiters = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def arbiter_for(session) -> CommandArbiter:
+    """The one arbiter in front of `session`, created on first use."""
+    with _registry_lock:
+        arbiter = _arbiters.get(session)
+        if arbiter is None:
+            arbiter = CommandArbiter(session)
+            _arbiters[session] = arbiter
+        return arbiter
@@ -0,0 +1,240 @@
+# adapter/async_driver.py
+"""
+asyncio-native ELM327 driver.
+
+The serial port is opened non-blocking and its file descriptor is watched
+by the running event loop, so one process can drive several adapters and
+serve other consumers without an OS thread per blocking call. Every
+command has a deadline; cancelling or timing out a send() leaves the
+driver usable, stale bytes are dropped before the next command.
+
+    async with AsyncELM327("/dev/rfcomm0") as elm:
+        rpm = (await elm.read_pids(["010C"])).get("010C")
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import serial
+
+from adapter.session import (
+    CAN_PROTOCOLS,
+    DEFAULT_BAUDRATE,
+    DEFAULT_PORT,
+    INIT_COMMANDS,
+    PROMPT_GRACE,
+    SETTLE_TIME,
+    TERMINAL_RESPONSES,
+)
+from adapter.transport import is_serial_url, open_transport
+from adapter.negotiation import (
+    SEARCH_TIMEOUT,
+    cached_settings,
+    describe_protocol,
+    protocol_setup_commands,
+)
+from obd.dtc_lookup import parse_dtc_response
+from obd.framer import frames_for_service, parse_frames
+from obd.live_diagnostic_commands import (
+    build_pid_batches,
+    decode_batch_reply,
+    decode_pid_reply,
+)
+from obd.discovery import (
+    SUPPORT_BASES,
+    chained_pids,
+    next_bases,
+    parse_support_reply,
+    support_requests,
+)
+
+
+@dataclass
+class Response:
+    command: str
+    raw: bytes
+    elapsed: float
+    complete: bool
+
+    @property
+    def text(self) -> str:
+        return self.raw.decode(errors="ignore")
+
+    @property
+    def lines(self) -> List[str]:
+        return [ln.strip() for ln in self.text.replace(">", "").splitlines() if ln.strip()]
+
+
+class AsyncELM327:
+    def __init__(self, port: str = DEFAULT_PORT, baudrate: int = DEFAULT_BAUDRATE, timeout: float = 3):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.protocol = ""
+        self.ser = None
+        self._loop = None
+        self._buf = bytearray()
+        self._waiter: Optional[asyncio.Future] = None
+        self._grace = None
+        self._lock = asyncio.Lock()
+
+    # ---------------- Lifecycle ----------------
+    async def open(self) -> bool:
+        if self.ser:
+            return True
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.ser = open_transport(self.port, self.baudrate, 0)
+            self._loop.add_reader(self.ser.fileno(), self._on_readable)
+        except (serial.SerialException, OSError) as exc:
+            # loop:// has no file descriptor to watch
+            print(f"❌ Async adapter failed on {self.port}: {exc}")
+            if self.ser:
+                self.ser.close()
+                self.ser = None
+            return False
+        try:
+            if is_serial_url(self.port):
+                await asyncio.sleep(SETTLE_TIME)
+            self._buf.clear()
+            for cmd in INIT_COMMANDS:
+                await self.send(cmd)
+            # reuse the protocol cached by the sync session, else let it search
+            for cmd in protocol_setup_commands(cached_settings(self.port)):
+                await self.send(cmd)
+            await self.send("0100", timeout=SEARCH_TIMEOUT)
+            self.protocol = describe_protocol((await self.send("ATDPN")).text)
+        except (asyncio.TimeoutError, ConnectionError) as exc:
+            # a half-initialised port must not pass for an open one next time
+            print(f"❌ Async adapter init failed on {self.port}: {exc!r}")
+            await self.close()
+            return False
+        return True
+
+    async def close(self):
+        self._drop_link()
+        self.protocol = ""
+
+    def _drop_link(self, error: Optional[Exception] = None):
+        """Stop watching and close the port; a pending send() gets `error` (or an incomplete reply)."""
+        if not self.ser:
+            return
+        ser, self.ser = self.ser, None
+        try:
+            self._loop.remove_reader(ser.fileno())
+        except (OSError, ValueError):
+            pass
+        try:
+            ser.close()
+        except (serial.SerialException, OSError):
+            pass
+        if error is not None and self._waiter is not None and not self._waiter.done():
+            self._cancel_grace()
+            self._waiter.set_exception(error)
+        else:
+            self._resolve(False)
+
+    async def __aenter__(self):
+        if not await self.open():
+            raise ConnectionError(f"Adapter not reachable on {self.port}")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def is_can(self) -> bool:
+        return self.protocol in CAN_PROTOCOLS
+
+    # ---------------- Raw I/O ----------------
+    def _on_readable(self):
+        try:
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as exc:
+            # EOF or a dead port stays readable: stop watching it or this callback spins
+            print(f"❌ Async adapter lost {self.port}: {exc}")
+            self._drop_link(ConnectionError(f"link to {self.port} dropped: {exc}"))
+            return
+        if not chunk:
+            return
+        self._buf += chunk
+        if self._waiter is None:
+            return
+        if b">" in chunk:
+            self._resolve(True)
+        elif self._grace is None and any(term in self._buf for term in TERMINAL_RESPONSES):
+            self._grace = self._loop.call_later(PROMPT_GRACE, self._resolve, True)
+
+    def _cancel_grace(self):
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+
+    def _resolve(self, complete: bool):
+        self._cancel_grace()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(complete)
+
+    async def send(self, cmd: str, timeout: Optional[float] = None) -> Response:
+        """
+        Send one command and wait for its reply. Raises asyncio.TimeoutError
+        when neither the prompt nor a terminal reply arrives within `timeout`.
+        """
+        if not self.ser:
+            raise ConnectionError("Adapter is not open")
+        async with self._lock:
+            self._buf.clear()
+            self._waiter = self._loop.create_future()
+            start = time.monotonic()
+            try:
+                self.ser.write((cmd + "\r").encode())
+            except (serial.SerialException, OSError) as exc:
+                self._waiter = None
+                self._drop_link()
+                raise ConnectionError(f"write to {self.port} failed: {exc}") from exc
+            try:
+                complete = await asyncio.wait_for(self._waiter, timeout or self.timeout)
+            finally:
+                self._waiter = None
+                self._cancel_grace()
+            raw = bytes(self._buf)
+            self._buf.clear()
+            return Response(cmd, raw, time.monotonic() - start, complete)
+
+    # ---------------- OBD operations ----------------
+    async def supported_pids(self, mode: str = "01") -> List[str]:
+        """Every PID any ECU supports in `mode`, following the 00/20/40/... chain."""
+        bitmaps: Dict[int, Dict[int, int]] = {}
+        pending = list(SUPPORT_BASES) if self.is_can and mode == "01" else [0x00]
+        asked = set()
+        while pending:
+            asked.update(pending)
+            for request in support_requests(mode, pending, self.is_can):
+                reply = parse_support_reply((await self.send(request)).text, mode, self.protocol)
+                for ecu, maps in reply.items():
+                    bitmaps.setdefault(ecu, {}).update(maps)
+            pending = next_bases(bitmaps, asked)
+        return sorted({pid for maps in bitmaps.values() for pid in chained_pids(maps, mode)})
+
+    async def read_pids(self, pid_cmds: List[str], batch: bool = True) -> Dict[str, float]:
+        """Mode 01 values for `pid_cmds`, batched six per request on CAN."""
+        values = {}
+        if batch and self.is_can:
+            for request in build_pid_batches(pid_cmds):
+                values.update(decode_batch_reply((await self.send(request)).text, self.protocol))
+            return values
+        for pid_cmd in pid_cmds:
+            value = decode_pid_reply(pid_cmd, (await self.send(pid_cmd)).text, self.protocol)
+            if value is not None:
+                values[pid_cmd] = value
+        return values
+
+    async def read_dtcs(self) -> List[Dict[str, str]]:
+        return parse_dtc_response((await self.send("03")).text, self.protocol)
+
+    async def clear_dtcs(self) -> bool:
+        raw = (await self.send("04")).text
+        # ECUs confirm with a bare 44 (positive response to service 04)
+        return bool(frames_for_service(parse_frames(raw, self.protocol), 0x44)) or "OK" in raw
@@ -0,0 +1,115 @@
+# adapter/baudrate.py
+"""
+Opt-in serial baud-rate upgrade for USB/serial ELM327 and STN adapters.
+
+ELM327:  ATBRD hh   (hh = 4 MHz / baud), replies OK at the old rate, then
+         sends its ID string at the new rate and waits for a CR.
+STN11xx: STBR baud  same handshake with the STN ID string.
+
+If the adapter does not answer at the new rate it reverts on its own
+after a short timeout; we revert the host side as well. The highest rate
+that worked is remembered per adapter.
+"""
+
+import time
+from typing import Iterable, Tuple
+
+from utils.profile_store import get_profile, hashed_key, update_profile
+
+ELM_CLOCK_HZ = 4_000_000
+DEFAULT_CANDIDATES = (500000, 230400, 115200)
+
+# Adapter-side wait for the confirming CR (ELM default ATBRT is ~75 ms)
+BRT_TIMEOUT = 0.2
+
+
+def _read_until(ser, markers: Tuple[bytes, ...], timeout: float) -> bytes:
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        chunk = ser.read(ser.in_waiting or 1)
+        if chunk:
+            buf += chunk
+            if any(m in buf for m in markers):
+                break
+    return bytes(buf)
+
+
+def probe(ser) -> bool:
+    """True if an ELM327/STN answers ATI at the port's current rate."""
+    ser.reset_input_buffer()
+    ser.write(b"ATI\r")
+    reply = _read_until(ser, (b">",), 0.5)
+    return b"ELM" in reply or b"STN" in reply
+
+
+def is_stn(ser) -> bool:
+    ser.reset_input_buffer()
+    ser.write(b"STI\r")
+    reply = _read_until(ser, (b">",), 0.5)
+    return b"STN" in reply
+
+
+def upgrade_command(baud: int, stn: bool = False) -> str:
+    if stn:
+        return f"STBR{baud}"
+    return f"ATBRD{round(ELM_CLOCK_HZ / baud):02X}"
+
+
+def try_baudrate(ser, baud: int, stn: bool = False) -> bool:
+    """Run one upgrade handshake; the port is back at its old rate on failure."""
+    old = ser.baudrate
+    ser.reset_input_buffer()
+    ser.write((upgrade_command(baud, stn) + "\r").encode())
+    if b"OK" not in _read_until(ser, (b"OK", b"?"), 0.5):
+        _read_until(ser, (b">",), 0.2)
+        return False
+
+    ser.baudrate = baud
+    ident = _read_until(ser, (b"\r",), BRT_TIMEOUT)
+    if b"ELM" in ident or b"STN" in ident:
+        ser.write(b"\r")
+        if b">" in _read_until(ser, (b">",), 0.5):
+            return True
+
+    # adapter falls back by itself once its BRT window expires
+    ser.baudrate = old
+    time.sleep(BRT_TIMEOUT)
+    ser.reset_input_buffer()
+    return False
+
+
+def negotiate_baudrate(ser, port: str, candidates: Iterable[int] = DEFAULT_CANDIDATES) -> int:
+    """
+    Move the link to the fastest rate the adapter accepts and return it.
+    Starts with the rate remembered for this adapter, if any.
+    """
+    adapter_key = hashed_key("adapter", port)
+    stored = get_profile("adapters", adapter_key).get("baudrate")
+    default = ser.baudrate
+
+    if not probe(ser):
+        # the adapter may still run at the rate negotiated last time
+        if stored and stored != default:
+            ser.baudrate = stored
+            if probe(ser):
+                return stored
+            ser.baudrate = default
+        return default
+
+    stn = is_stn(ser)
+    order = sorted(set(candidates), reverse=True)
+    if stored in order:
+        order.remove(stored)
+        order.insert(0, stored)
+
+    for baud in order:
+        if baud <= default:
+            continue
+        if try_baudrate(ser, baud, stn):
+            print(f"⚡ Adapter link upgraded to {baud} baud")
+            update_profile("adapters", adapter_key, baudrate=baud)
+            return baud
+
+    update_profile("adapters", adapter_key, baudrate=default)
+    return default
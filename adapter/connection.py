@@ -1,8 +1,12 @@
 #This module finds the MAC of the ELM327 device and establishes the bluetooth connection
 
+import queue
+import re
 import subprocess
+import threading
 import time
-import re
+
+from utils.profile_store import get_profile, update_profile
 
 # Global variable to store ELM327 MAC address.
 elm_mac = None
@@ -28,94 +32,181 @@ OBD2_NAMES = [
     'Micro Mechanic', 'THINMI.COM', 'KUULAA', 'xTool', 'KONNWEI', 'Mini OBD2', 'ELMconfig', 'VINT-TT55502'
 ]
 
-def run_bluetoothctl_and_connect_obd2(timeout=7):
+# Upper bounds for bluetoothctl steps; each returns as soon as its answer arrives
+KNOWN_DEVICES_TIMEOUT = 1.0
+PAIR_TIMEOUT = 10
+TRUST_TIMEOUT = 3
+CONNECT_TIMEOUT = 10
+
+DEVICE_LINE = re.compile(r'Device ([0-9A-F:]{17}) (.+)', re.I)
+# bluetoothctl colours its output
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]|\x01|\x02')
+
+
+def is_obd2_name(name):
+    return any(obd_name.lower() in name.lower() for obd_name in OBD2_NAMES)
+
+
+def _obd2_device(line):
+    """(mac, name) if the line announces an OBD2 adapter, else None."""
+    match = DEVICE_LINE.search(line)
+    if match and is_obd2_name(match.group(2)):
+        return match.group(1).upper(), match.group(2).strip()
+    return None
+
+
+class BluetoothCtl:
     """
-    Scans for a Bluetooth OBD2 device, pairs, trusts, connects to it,
-    and stores its MAC address in the global elm_mac variable.
+    bluetoothctl driven by its output: a reader thread queues every line
+    and each step waits only until the line it needs shows up.
     """
-    global elm_mac
 
-    try:
-        process = subprocess.Popen(
-            ['bluetoothctl'],
+    def __init__(self, command=("bluetoothctl",)):
+        self.process = subprocess.Popen(
+            list(command),
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
             bufsize=1
         )
+        self.lines = queue.Queue()
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        for line in self.process.stdout:
+            self.lines.put(ANSI_ESCAPE.sub("", line).strip())
+        self.lines.put(None)
+
+    def send(self, cmd):
+        print(f"> {cmd}")
+        self.process.stdin.write(cmd + '\n')
+        self.process.stdin.flush()
+
+    def expect(self, match, timeout):
+        """
+        Wait for the first line for which `match(line)` is truthy and
+        return that result; None on timeout or when bluetoothctl exits.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if line is None:
+                return None
+            if line:
+                print(line)
+            result = match(line)
+            if result:
+                return result
+
+    def expect_any(self, patterns, timeout):
+        regex = re.compile("|".join(patterns), re.I)
+        return self.expect(regex.search, timeout)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.terminate()
+
+
+def _pair_trust_connect(ctl, mac):
+    """
+    Pair, trust and connect one device. True only if bluetoothctl confirms
+    every step; a "Failed to ..." reply or a timeout gives False.
+    """
+    ctl.send(f'pair {mac}')
+    paired = ctl.expect_any([r'Pairing successful', r'AlreadyExists', r'Failed to pair',
+                             r'not available'], PAIR_TIMEOUT)
+    # an already paired device answers "Failed to pair: ...AlreadyExists"
+    if not paired or not re.search(r'Pairing successful|AlreadyExists', paired.string, re.I):
+        print(f"❌ Pairing with {mac} failed.")
+        return False
+
+    ctl.send(f'trust {mac}')
+    trusted = ctl.expect_any([r'trust succeeded', r'not available'], TRUST_TIMEOUT)
+    if not trusted or 'succeeded' not in trusted.group(0).lower():
+        print(f"❌ Trusting {mac} failed.")
+        return False
+
+    ctl.send(f'connect {mac}')
+    connected = ctl.expect_any([r'Connection successful', r'Failed to connect', r'not available'],
+                               CONNECT_TIMEOUT)
+    if not connected or 'successful' not in connected.group(0).lower():
+        print(f"❌ Connecting to {mac} failed.")
+        return False
+    return True
+
+
+def run_bluetoothctl_and_connect_obd2(timeout=7, command=("bluetoothctl",)):
+    """
+    Finds a Bluetooth OBD2 device (known devices first, then a scan that
+    stops at the first match), pairs, trusts and connects to it, stores
+    its MAC address in elm_mac and remembers it for the next launch.
+    A known device that does not connect (e.g. out of range) falls back
+    to the scan. Returns None unless the connection was confirmed.
+    """
+    global elm_mac
+
+    try:
+        ctl = BluetoothCtl(command)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        return None
 
-        def send(cmd, wait=0.5):
-            print(f"> {cmd}")
-            process.stdin.write(cmd + '\n')
-            process.stdin.flush()
-            time.sleep(wait)
-
-        send('agent on')
-        send('power on')
-        send('default-agent')
-        send('scan on')
-        print("🔍 Scanning for OBD2 devices...")
-
-        start_time = time.time()
-        found_mac = None
-
-        while time.time() - start_time < timeout:
-            line = process.stdout.readline()
-            if not line:
-                continue
-
-            print(line.strip())
-
-            match = re.search(r'Device ([0-9A-F:]{17}) (.+)', line.strip(), re.I)
-            if match:
-                mac, name = match.groups()
-                if any(obd_name.lower() in name.lower() for obd_name in OBD2_NAMES):
-                    print(f"✅ Found OBD2 device: {name} at {mac}")
-                    found_mac = mac
-                    break
-
-        send('scan off')
-
-        if not found_mac:
-            print("🔄 Trying 'devices' command to check known list...")
-            send('devices')
-            time.sleep(1)
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                print(line.strip())
-                match = re.search(r'Device ([0-9A-F:]{17}) (.+)', line.strip(), re.I)
-                if match:
-                    mac, name = match.groups()
-                    if any(obd_name.lower() in name.lower() for obd_name in OBD2_NAMES):
-                        print(f"✅ Found OBD2 in saved devices: {name} at {mac}")
-                        found_mac = mac
-                        break
-
-        if not found_mac:
-            print("❌ No OBD2 device found.")
-            process.stdin.close()
-            process.terminate()
-            return None
-
-        send(f'pair {found_mac}', wait=2)
-        send(f'trust {found_mac}')
-        send(f'connect {found_mac}', wait=2)
-
-        print(f"✅ OBD2 device {found_mac} paired, trusted, and connected.")
-
-        # Save to global variable
-        elm_mac = found_mac
-
-        process.stdin.close()
-        process.terminate()
-        return found_mac
+    try:
+        ctl.send('agent on')
+        ctl.send('power on')
+        ctl.send('default-agent')
+
+        # an already known adapter needs no scan at all
+        ctl.send('devices')
+        found = ctl.expect(_obd2_device, KNOWN_DEVICES_TIMEOUT)
+        connected_mac = None
+        if found:
+            print(f"✅ Found OBD2 in saved devices: {found[1]} at {found[0]}")
+            if _pair_trust_connect(ctl, found[0]):
+                connected_mac = found[0]
+            else:
+                print("⚠️ Saved OBD2 device did not connect, scanning instead...")
+
+        if connected_mac is None:
+            ctl.send('scan on')
+            print("🔍 Scanning for OBD2 devices...")
+            found = ctl.expect(_obd2_device, timeout)
+            ctl.send('scan off')
+            if not found:
+                print("❌ No OBD2 device found.")
+                return None
+            print(f"✅ Found OBD2 device: {found[1]} at {found[0]}")
+            if not _pair_trust_connect(ctl, found[0]):
+                return None
+            connected_mac = found[0]
+
+        print(f"✅ OBD2 device {connected_mac} paired, trusted, and connected.")
+
+        # Save to global variable and for the next launch
+        elm_mac = connected_mac
+        update_profile("bluetooth", "last", mac=connected_mac)
+        return connected_mac
 
     except Exception as e:
         print(f"❌ Error: {e}")
         return None
+    finally:
+        ctl.close()
+
+
+def last_adapter_mac():
+    """MAC of the adapter that connected last time, or None."""
+    return get_profile("bluetooth", "last").get("mac")
 
 if __name__ == "__main__":
     run_bluetoothctl_and_connect_obd2()
@@ -1,7 +1,29 @@
 # This module gets the MAC from connection.py and binds it to a serial port rfcomm0
 
+import re
 import subprocess
 
+from utils.profile_store import update_profile
+
+RFCOMM_DEVICE = 0
+BINDING_LINE = re.compile(r'^(rfcomm\d+):\s+([0-9A-F:]{17})', re.I | re.M)
+
+def bound_port(elm_mac):
+    """
+    /dev/rfcommN already bound to `elm_mac`, or None. Plain `rfcomm`
+    lists the bindings without needing sudo.
+    """
+    if not elm_mac:
+        return None
+    try:
+        result = subprocess.run(["rfcomm"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=2)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    for device, mac in BINDING_LINE.findall(result.stdout):
+        if mac.upper() == elm_mac.upper():
+            return f"/dev/{device}"
+    return None
+
 def run_rfcomm_binding(elm_mac, sudo_pass):
     if not elm_mac:
         print("❌ No MAC address provided. Did you run the scan first?")
@@ -9,7 +31,7 @@ def run_rfcomm_binding(elm_mac, sudo_pass):
 
     cmd = (
         f"echo '{sudo_pass}' | sudo -S rfcomm release all && "
-        f"echo '{sudo_pass}' | sudo -S rfcomm bind 0 {elm_mac}"
+        f"echo '{sudo_pass}' | sudo -S rfcomm bind {RFCOMM_DEVICE} {elm_mac}"
     )
 
     print(f"🔧 Binding rfcomm to {elm_mac}...")
@@ -19,6 +41,8 @@ def run_rfcomm_binding(elm_mac, sudo_pass):
 
         if result.returncode == 0:
             print("✅ Binding successful.")
+            # remembered so the next launch can reuse the binding without sudo
+            update_profile("bluetooth", "last", mac=elm_mac.upper(), port=f"/dev/rfcomm{RFCOMM_DEVICE}")
             return True
         else:
             print(f"❌ Binding failed:\n{result.stderr}")
@@ -0,0 +1,155 @@
+# adapter/negotiation.py
+"""
+Protocol and timing negotiation for ELM327 sessions.
+
+The first connect to a vehicle lets the adapter search (ATSP0), turns on
+adaptive timing and derives an ATST value from the measured ECU response
+times (probed with the responder count, so the adapter's own wait is not
+measured). The result is cached per vehicle, keyed by a hash of the
+ECU's 0100 answer, and the adapter remembers which vehicle it last
+talked to.
+The next connect sets that protocol directly and skips SEARCHING...
+"""
+
+import math
+from typing import Callable, Dict, List, Optional
+
+from obd.framer import frames_for_service, parse_frames
+from utils.profile_store import get_profile, hashed_key, update_profile
+
+PROTOCOL_NAMES = {
+    "1": "SAE J1850 PWM",
+    "2": "SAE J1850 VPW",
+    "3": "ISO 9141-2",
+    "4": "ISO 14230-4 KWP (5 baud init)",
+    "5": "ISO 14230-4 KWP (fast init)",
+    "6": "ISO 15765-4 CAN (11 bit, 500 kbaud)",
+    "7": "ISO 15765-4 CAN (29 bit, 500 kbaud)",
+    "8": "ISO 15765-4 CAN (11 bit, 250 kbaud)",
+    "9": "ISO 15765-4 CAN (29 bit, 250 kbaud)",
+}
+
+# A protocol search can walk all nine protocols; give it room
+SEARCH_TIMEOUT = 12
+
+# ATST counts in 4 ms steps; keep a floor so slow ECUs are not cut off
+ST_STEP_MS = 4
+ST_MIN, ST_MAX = 0x10, 0xFF
+PROBE_COUNT = 3
+
+SendFn = Callable[..., str]
+
+
+def protocol_setup_commands(settings: Optional[Dict]) -> List[str]:
+    """AT commands that put the adapter into the cached (or search) state."""
+    if not settings:
+        return ["ATSP0", "ATAT1"]
+    return [
+        f"ATSP{settings['protocol']}",
+        f"ATAT{settings.get('adaptive', 1)}",
+        f"ATST{settings.get('st', ST_MAX):02X}",
+    ]
+
+
+def st_from_latencies(latencies: List[float]) -> int:
+    """ATST value covering the slowest measured reply with 50 % headroom."""
+    if not latencies:
+        return ST_MAX
+    worst_ms = max(latencies) * 1000 * 1.5
+    return max(ST_MIN, min(ST_MAX, math.ceil(worst_ms / ST_STEP_MS)))
+
+
+def adaptive_mode(latencies: List[float]) -> int:
+    """ATAT2 (aggressive) for consistently quick ECUs, ATAT1 otherwise."""
+    return 2 if latencies and max(latencies) < 0.05 else 1
+
+
+def _bitmaps_0100(reply: str, protocol: str = "") -> List[str]:
+    return sorted(
+        f"{f.ecu:X}:{bytes(f.payload[2:6]).hex()}"
+        for f in frames_for_service(parse_frames(reply, protocol), 0x41)
+        if len(f.payload) >= 6 and f.payload[1] == 0x00
+    )
+
+
+def vehicle_fingerprint(reply_0100: str, protocol: str) -> Optional[str]:
+    """Hash of protocol + every ECU's 0100 bitmap, or None if no ECU answered."""
+    answers = _bitmaps_0100(reply_0100, protocol)
+    if not answers:
+        return None
+    return hashed_key(protocol, *answers)
+
+
+def answered(reply: str) -> bool:
+    return bool(_bitmaps_0100(reply))
+
+
+def describe_protocol(reply: str) -> str:
+    """ATDPN reply → protocol number, without the 'A' (automatic) prefix."""
+    reply = reply.replace(">", "").strip().upper()
+    return reply[1:] if reply.startswith("A") else reply
+
+
+def cached_settings(port: str) -> Dict:
+    """Settings of the vehicle last seen on this adapter, or {}."""
+    last_vehicle = get_profile("adapters", hashed_key("adapter", port)).get("vehicle")
+    return get_profile("vehicles", last_vehicle) if last_vehicle else {}
+
+
+def negotiate(send: SendFn, port: str, timer: Callable[[], float]) -> Dict:
+    """
+    Bring the adapter onto the vehicle's protocol.
+
+    `send(cmd, timeout=None)` runs one command; `timer()` returns the
+    latency of the last one. Returns the settings in use, with "cached"
+    set when the stored profile was reused.
+    """
+    adapter_key = hashed_key("adapter", port)
+    cached = cached_settings(port)
+
+    if cached.get("protocol"):
+        for cmd in protocol_setup_commands(cached):
+            send(cmd)
+        reply = send("0100")
+        fingerprint = vehicle_fingerprint(reply, cached["protocol"]) if answered(reply) else None
+        known = get_profile("vehicles", fingerprint) if fingerprint else {}
+        if known:
+            # same protocol, possibly another known car: use its timing
+            if known != cached:
+                for cmd in protocol_setup_commands(known)[1:]:
+                    send(cmd)
+                update_profile("adapters", adapter_key, vehicle=fingerprint)
+            return dict(known, vehicle=fingerprint, cached=True)
+        print("🔄 Cached protocol did not match this vehicle, searching...")
+
+    for cmd in protocol_setup_commands(None):
+        send(cmd)
+    reply = send("0100", timeout=SEARCH_TIMEOUT)
+    protocol = describe_protocol(send("ATDPN"))
+    if not answered(reply):
+        return {"protocol": protocol, "cached": False}
+
+    # With the responder count appended the adapter returns as soon as the
+    # last ECU has answered; a bare 0100 would also time the adapter's own
+    # wait for further replies, i.e. the timeout being tuned.
+    responders = len(_bitmaps_0100(reply, protocol))
+    probe = "0100" + (f"{responders:X}" if responders <= 0xF else "")
+    latencies = []
+    for _ in range(PROBE_COUNT):
+        send(probe)
+        latencies.append(timer())
+    settings = {
+        "protocol": protocol,
+        "adaptive": adaptive_mode(latencies),
+        "st": st_from_latencies(latencies),
+    }
+    send(f"ATAT{settings['adaptive']}")
+    send(f"ATST{settings['st']:02X}")
+
+    fingerprint = vehicle_fingerprint(reply, protocol)
+    if fingerprint:
+        update_profile("vehicles", fingerprint, **settings)
+        update_profile("adapters", adapter_key, vehicle=fingerprint)
+    name = PROTOCOL_NAMES.get(protocol, protocol)
+    print(f"✅ Protocol {name}, ATST {settings['st']:02X}, ATAT{settings['adaptive']}")
+    return dict(settings, vehicle=fingerprint, cached=False)
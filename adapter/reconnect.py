@@ -0,0 +1,47 @@
+# adapter/reconnect.py
+"""
+Fast reconnect at startup.
+
+The full path (bluetoothctl scan + pair, then a sudo rfcomm rebind) takes
+15 s or more. Usually the adapter from last time is still bound, so we
+first open the remembered /dev/rfcomm* port (then any other one) and
+ping it with ATI. Only when nothing answers does the GUI fall back to
+scanning and binding.
+"""
+
+import glob
+import os
+from typing import Iterable, List, Optional
+
+from adapter.session import DEFAULT_PORT, get_session, redirect_port
+from adapter.transport import is_serial_url
+from utils.profile_store import get_profile, update_profile
+
+
+def candidate_ports() -> List[str]:
+    """Remembered port first, then the default, then every other rfcomm device."""
+    stored = get_profile("bluetooth", "last").get("port")
+    ports = []
+    for port in [stored, DEFAULT_PORT, *sorted(glob.glob("/dev/rfcomm*"))]:
+        if port and port not in ports:
+            ports.append(port)
+    return ports
+
+
+def fast_reconnect(ports: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Open the first port whose adapter answers and return it, or None.
+    The session stays open and DEFAULT_PORT users are redirected to it.
+    """
+    for port in ports if ports is not None else candidate_ports():
+        if is_serial_url(port) and not os.path.exists(port):
+            continue
+        print(f"🔁 Trying {port}...")
+        session = get_session(port)
+        if session.open():
+            redirect_port(DEFAULT_PORT, port)
+            update_profile("bluetooth", "last", port=port)
+            print(f"✅ Reconnected on {port}")
+            return port
+        session.close()
+    return None
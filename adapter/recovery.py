@@ -0,0 +1,181 @@
+# adapter/recovery.py
+"""
+Recovery from adapter errors and dropped links, below the OBD readers.
+
+Every OBD reply that comes back from AdapterSession.send_command is
+classified first. Good replies (including NO DATA, which just means the
+ECU has nothing for that request) go straight through; the rest get the
+cheapest fix that usually works for their class, and the command is sent
+again:
+
+    retry           BUFFER FULL, CAN ERROR/BUS BUSY, STOPPED, garbage, timeout
+    ATPC            BUS INIT: ...ERROR (K-line/KWP needs a fresh bus init)
+    reopen port     link dropped (rfcomm hang-up, TCP reset)
+    full reinit     UNABLE TO CONNECT (ignition cycled, protocol changed)
+
+A fix that does not help escalates one step on the next attempt. Attempts
+are spaced by exponential backoff (10 ms, 20 ms, 40 ms...) and drawn from
+a per-cycle budget, so a flaky link costs a few ms per sweep while a dead
+one gives up fast instead of stalling the dashboard. A cycle is one
+arbiter job (a sweep, a poll request, a DTC read).
+"""
+
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from obd.framer import has_incomplete_message
+
+# Reply classes
+OK = "ok"
+NO_DATA = "no_data"
+BUFFER_FULL = "buffer_full"
+BUS_ERROR = "bus_error"              # CAN ERROR, BUS BUSY, BUS ERROR, FB ERROR, DATA ERROR, <RX ERROR
+BUS_INIT_ERROR = "bus_init_error"
+STOPPED = "stopped"
+GARBAGE = "garbage"
+TIMEOUT = "timeout"
+LINK_DOWN = "link_down"
+UNABLE_TO_CONNECT = "unable_to_connect"
+
+GOOD = (OK, NO_DATA)
+
+# Fixes, cheapest first
+RETRY = 0
+PROTOCOL_CLOSE = 1
+REOPEN = 2
+REINIT = 3
+
+FIX_NAMES = {RETRY: "retry", PROTOCOL_CLOSE: "ATPC", REOPEN: "reopen", REINIT: "reinit"}
+
+FIRST_FIX = {
+    BUFFER_FULL: RETRY,
+    BUS_ERROR: RETRY,
+    STOPPED: RETRY,
+    GARBAGE: RETRY,
+    TIMEOUT: RETRY,
+    BUS_INIT_ERROR: PROTOCOL_CLOSE,
+    LINK_DOWN: REOPEN,
+    UNABLE_TO_CONNECT: REINIT,
+}
+
+# Recovery attempts per cycle and per command
+CYCLE_BUDGET = 6
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.01
+BACKOFF_MAX = 0.5
+
+_BUS_ERRORS = ("CAN ERROR", "BUS BUSY", "BUS ERROR", "FB ERROR", "DATA ERROR", "<RX ERROR")
+# Lines an OBD reply may contain besides hex frames
+_STATUS_LINE = re.compile(r"^(SEARCHING\.*|BUS INIT:? ?\.*OK|OK|NO DATA)$")
+_FRAME_LINE = re.compile(r"^([0-9A-F]:)?[0-9A-F ]+$")
+
+
+def classify(cmd: str, raw: bytes, complete: bool, link_up: bool = True,
+             protocol: str = "") -> str:
+    """Sort one reply to `cmd` into the classes above."""
+    if not link_up:
+        return LINK_DOWN
+    text = raw.decode("ascii", errors="replace").upper()
+    if "BUFFER FULL" in text:
+        return BUFFER_FULL
+    if "BUS INIT" in text and "ERROR" in text:
+        return BUS_INIT_ERROR
+    if any(err in text for err in _BUS_ERRORS):
+        return BUS_ERROR
+    if "UNABLE TO CONNECT" in text:
+        return UNABLE_TO_CONNECT
+    if "STOPPED" in text:
+        return STOPPED
+    if not complete:
+        return TIMEOUT
+    if any(c not in "\r\n>" and not 32 <= ord(c) < 127 for c in text):
+        return GARBAGE
+    if cmd.upper().startswith("AT"):
+        return OK
+    lines = [line.strip() for line in text.replace(">", "").split("\r")]
+    lines = [line for line in lines if line and line != cmd.upper()]
+    if any(line == "NO DATA" for line in lines) and all(_STATUS_LINE.match(line) for line in lines):
+        return NO_DATA
+    for line in lines:
+        if not (_STATUS_LINE.match(line) or _FRAME_LINE.match(line)):
+            return GARBAGE       # "?" or clone noise
+    if has_incomplete_message(text, protocol):
+        return GARBAGE           # multi-frame answer lost a frame
+    return OK
+
+
+def backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+
+
+class Recovery:
+    """Per-session recovery state: the cycle budget and counters."""
+
+    def __init__(self, budget: int = CYCLE_BUDGET, attempts: int = MAX_ATTEMPTS):
+        self.budget = budget
+        self.attempts = attempts
+        self.remaining = budget
+        self.errors: Counter = Counter()         # reply class → times seen
+        self.fixes: Counter = Counter()          # fix name → times applied
+        self.recovered = 0
+        self.given_up = 0
+
+    def new_cycle(self):
+        self.remaining = self.budget
+
+    def stats(self) -> Dict:
+        return {
+            "errors": dict(self.errors),
+            "fixes": dict(self.fixes),
+            "recovered": self.recovered,
+            "given_up": self.given_up,
+            "budget_left": self.remaining,
+        }
+
+    def handle(self, session, cmd: str, timeout: Optional[float],
+               reply: Tuple[bytes, bool]) -> bytes:
+        """
+        Return the reply to `cmd`, recovering first if it is bad. Called by
+        the session with its lock held; `reply` is (raw, complete).
+        """
+        raw, complete = reply
+        kind = classify(cmd, raw, complete, session.ser is not None, session.protocol)
+        if kind in GOOD:
+            return raw
+
+        fix = FIRST_FIX[kind]
+        attempt = 0
+        while attempt < self.attempts and self.remaining > 0:
+            self.errors[kind] += 1
+            self.remaining -= 1
+            time.sleep(backoff(attempt))
+            self.fixes[FIX_NAMES[fix]] += 1
+            if self._apply(session, fix):
+                raw, complete = session.transact_raw(cmd, timeout)
+                kind = classify(cmd, raw, complete, session.ser is not None, session.protocol)
+                if kind in GOOD:
+                    self.recovered += 1
+                    return raw
+            elif session.ser is None:
+                kind = LINK_DOWN
+            # whatever did not help, the next attempt goes one step further
+            fix = min(REINIT, max(fix + 1, FIRST_FIX[kind]))
+            attempt += 1
+
+        self.given_up += 1
+        print(f"⚠️ {cmd}: no recovery from {kind}")
+        return raw
+
+    def _apply(self, session, fix: int) -> bool:
+        if fix == RETRY:
+            return session.ser is not None
+        if fix == PROTOCOL_CLOSE:
+            if session.ser is None:
+                return False
+            session.transact_raw("ATPC")
+            return True
+        if fix == REOPEN:
+            return session.reopen()
+        return session.reinit()
@@ -0,0 +1,395 @@
+# adapter/session.py
+"""
+Long-lived ELM327 adapter session.
+
+One AdapterSession owns the adapter link (serial, TCP or loopback, see
+adapter.transport), runs the AT init sequence once
+and is then shared by live data, DTC and Mode 22 readers. Sessions are
+pooled per port through get_session(), so a second "Rerun" or DTC read
+only pays for the OBD round-trips.
+"""
+
+import atexit
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+
+import serial
+
+from adapter.baudrate import negotiate_baudrate
+from adapter.negotiation import negotiate, protocol_setup_commands
+from adapter.recovery import Recovery
+from adapter.transport import is_serial_url, open_transport
+
+# A device path (/dev/rfcomm0, /dev/ttyUSB0), tcp://host:port or loop://
+DEFAULT_PORT = os.environ.get("LIBREDIAG_PORT", "/dev/rfcomm0")
+DEFAULT_BAUDRATE = 38400
+# Protocol selection (ATSP) and timing are handled by adapter.negotiation
+INIT_COMMANDS = ("ATE0", "ATL0", "ATS0", "ATH1")
+
+# ATDPN protocol numbers that run over ISO 15765-4 (CAN)
+CAN_PROTOCOLS = {"6", "7", "8", "9"}
+CAN_29BIT_PROTOCOLS = {"7", "9"}
+
+# Longest wait for the adapter to answer ATI after the port opens (an
+# rfcomm open also brings up the Bluetooth link). Most answer far sooner.
+SETTLE_TIME = 2
+READY_PROBE = 0.5
+
+# Port-level read timeout. Reads return as soon as bytes arrive; this only
+# bounds how often the reader re-checks its per-command deadline.
+READ_POLL = 0.05
+
+# Replies after which the ELM327 is done with the command; the prompt
+# normally follows within a few ms, so we only wait PROMPT_GRACE for it.
+TERMINAL_RESPONSES = (b"NO DATA", b"?", b"UNABLE TO CONNECT", b"STOPPED")
+PROMPT_GRACE = 0.05
+
+
+def read_until_prompt(ser, timeout: float) -> Tuple[bytes, bool]:
+    """
+    Read one ELM327 reply without fixed sleeps.
+
+    Returns (raw_bytes, complete). `complete` is False when the deadline
+    passed before the '>' prompt or a terminal response was seen.
+    """
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while True:
+        chunk = ser.read(ser.in_waiting or 1)
+        if chunk:
+            buf += chunk
+            if b">" in chunk:
+                return bytes(buf), True
+            if any(term in buf for term in TERMINAL_RESPONSES):
+                deadline = min(deadline, time.monotonic() + PROMPT_GRACE)
+        if time.monotonic() >= deadline:
+            finished = any(term in buf for term in TERMINAL_RESPONSES)
+            return bytes(buf), finished
+
+
+def wait_until_ready(ser, limit: float) -> bool:
+    """Ping with ATI until the adapter answers or `limit` seconds pass."""
+    if limit <= 0:
+        return True
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        ser.reset_input_buffer()
+        ser.write(b"ATI\r")
+        _, complete = read_until_prompt(ser, min(READY_PROBE, max(0.05, deadline - time.monotonic())))
+        if complete:
+            return True
+    return False
+
+
+class AdapterSession:
+    def __init__(self, port: str = DEFAULT_PORT, baudrate: int = DEFAULT_BAUDRATE, timeout: int = 3,
+                 upgrade_baudrate: bool = False):
+        self.port = port
+        self.default_baudrate = baudrate   # rate the adapter powers up at
+        self.baudrate = baudrate           # rate the link runs at now
+        self.timeout = timeout
+        # opt-in: only meaningful on real serial/USB links, not rfcomm
+        self.upgrade_baudrate = upgrade_baudrate
+        self.ser = None
+        self.initialised = False
+        self.protocol = ""
+        self.settings = {}
+        self.target = None            # ECU the requests are addressed to, None = broadcast
+        self.target_header = None     # its request ID when not the usual response ID - 8
+        self.last_latency = 0.0
+        # (command, seconds) for the most recent commands, newest last
+        self.timings = deque(maxlen=256)
+        # bad replies are retried/repaired here, see adapter.recovery
+        self.recovery = Recovery()
+        self._lock = threading.RLock()
+
+    # ---------------- Lifecycle ----------------
+    def open(self) -> bool:
+        """Open the port and run the init sequence, unless already done."""
+        with self._lock:
+            if self.is_healthy():
+                return True
+            self.close()
+            try:
+                self.baudrate = self.default_baudrate
+                self.ser = open_transport(self.port, self.baudrate, READ_POLL)
+                if is_serial_url(self.port) and not wait_until_ready(self.ser, SETTLE_TIME):
+                    raise ConnectionError("no answer to ATI")
+                self.ser.reset_input_buffer()
+                if self.upgrade_baudrate and is_serial_url(self.port):
+                    # reopen() must come back at the rate the adapter now runs at
+                    self.baudrate = negotiate_baudrate(self.ser, self.port)
+                for cmd in INIT_COMMANDS:
+                    self.send_command(cmd)
+                self.settings = negotiate(self.send_command, self.port, lambda: self.last_latency)
+                self.protocol = self.settings.get("protocol", "")
+                self.initialised = True
+                return True
+            except Exception as exc:
+                print(f"❌ Adapter session failed on {self.port}: {exc}")
+                self.close()
+                return False
+
+    def reopen(self) -> bool:
+        """
+        Reopen a dropped link and replay the known setup (init, protocol,
+        timing, ECU target) without renegotiating the protocol.
+        """
+        with self._lock:
+            if not self.initialised:
+                return False
+            self._drop_link()
+            try:
+                self.ser = open_transport(self.port, self.baudrate, READ_POLL)
+                if is_serial_url(self.port) and not wait_until_ready(self.ser, SETTLE_TIME):
+                    raise ConnectionError("no answer to ATI")
+                self.ser.reset_input_buffer()
+            except Exception as exc:
+                print(f"❌ Reopening {self.port} failed: {exc}")
+                self._drop_link()
+                return False
+            target, self.target = self.target, None
+            for cmd in INIT_COMMANDS + tuple(protocol_setup_commands(self.settings)):
+                self.transact_raw(cmd)
+            if target:
+                self.target_ecu(target, self.target_header)
+            print(f"🔁 Reopened {self.port}")
+            return self.ser is not None
+
+    def reinit(self) -> bool:
+        """
+        Full close and open, renegotiating the protocol; the ECU target is
+        set again, so a retried request still goes to the same module. The
+        recovery budget is left alone (only new_cycle() refills it).
+        """
+        with self._lock:
+            target, request = self.target, self.target_header
+            self.close()
+            if not self.open():
+                return False
+            if target:
+                self.target_ecu(target, request)
+            return True
+
+    def new_cycle(self):
+        """Refill the recovery budget; the arbiter calls this once per job."""
+        self.recovery.new_cycle()
+
+    def close(self):
+        with self._lock:
+            if self.ser and self.ser.is_open:
+                try:
+                    self.ser.close()
+                except Exception:
+                    pass
+            self.ser = None
+            self.initialised = False
+            self.protocol = ""
+            self.target = None
+            self.target_header = None
+
+    def _drop_link(self):
+        """Close the port only; settings stay for reopen()."""
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+        self.ser = None
+
+    def is_healthy(self) -> bool:
+        """True while the port is open and the init sequence has completed."""
+        return bool(self.ser and self.ser.is_open and self.initialised)
+
+    @property
+    def is_can(self) -> bool:
+        return self.protocol in CAN_PROTOCOLS
+
+    # ---------------- ECU addressing ----------------
+    def target_ecu(self, ecu: int, request: Optional[int] = None) -> bool:
+        """
+        Address requests to one ECU (by its response ID, e.g. 0x7E8) and
+        only accept its replies, so other ECUs' answers are never waited
+        for. `request` is the ECU's request ID for 11-bit pairs that do not
+        follow the OBD "response - 8" rule (e.g. 0x713/0x77D); ISO-TP flow
+        control is then sent from that ID as well. CAN only; returns False
+        when targeting is not possible.
+        """
+        with self._lock:
+            if not self.is_can or not ecu:
+                return False
+            if request == ecu - 8:
+                request = None
+            if self.target == ecu and self.target_header == request:
+                return True
+            if self.protocol in CAN_29BIT_PROTOCOLS:
+                if request is not None:
+                    return False
+                source = ecu & 0xFF
+                cmds = ("ATCP18", f"ATSHDA{source:02X}F1", f"ATCRA{ecu:08X}")
+            elif request is not None:
+                cmds = (f"ATSH{request:03X}", f"ATCRA{ecu:03X}",
+                        f"ATFCSH{request:03X}", "ATFCSD300000", "ATFCSM1")
+            else:
+                cmds = (f"ATSH{ecu - 8:03X}", f"ATCRA{ecu:03X}")
+                if self.target_header is not None:
+                    cmds += ("ATFCSM0",)
+            for cmd in cmds:
+                self.send_command(cmd)
+            self.target = ecu
+            self.target_header = request
+            return True
+
+    def clear_target(self):
+        """Back to functional (broadcast) requests answered by every ECU."""
+        with self._lock:
+            if self.target is None:
+                return
+            if self.protocol in CAN_29BIT_PROTOCOLS:
+                cmds = ("ATCP18", "ATSHDB33F1", "ATCRA")
+            else:
+                cmds = ("ATSH7DF", "ATCRA")
+            if self.target_header is not None:
+                cmds += ("ATFCSM0",)
+            for cmd in cmds:
+                self.send_command(cmd)
+            self.target = None
+            self.target_header = None
+
+    # ---------------- I/O ----------------
+    def send_command(self, cmd: str, timeout: Optional[float] = None) -> str:
+        """
+        Send one command and return the reply as soon as the prompt arrives.
+        `timeout` is the per-command deadline (defaults to self.timeout).
+        Once initialised, bad replies and dropped links go through
+        adapter.recovery before the reply is returned.
+        """
+        with self._lock:
+            if not self.ser and not self.initialised:
+                return ""
+            reply = self.transact_raw(cmd, timeout)
+            if self.initialised:
+                raw = self.recovery.handle(self, cmd, timeout, reply)
+            else:
+                raw = reply[0]
+            return raw.decode(errors="ignore")
+
+    def transact_raw(self, cmd: str, timeout: Optional[float] = None) -> Tuple[bytes, bool]:
+        """
+        One raw round-trip: (reply bytes, complete), with no recovery, so
+        adapter.recovery can resend without recursing. Drops the link on
+        I/O errors.
+        """
+        with self._lock:
+            if not self.ser:
+                return b"", False
+            try:
+                if self.ser.in_waiting:
+                    # late bytes from a previous command that hit its deadline
+                    self.ser.reset_input_buffer()
+                start = time.monotonic()
+                self.ser.write((cmd + "\r").encode())
+                raw, complete = read_until_prompt(self.ser, timeout or self.timeout)
+                self.last_latency = time.monotonic() - start
+                self.timings.append((cmd, self.last_latency))
+                if not complete:
+                    print(f"⚠️ {cmd} timed out after {self.last_latency:.2f}s")
+                return raw, complete
+            except (serial.SerialException, OSError) as exc:
+                print(f"❌ Adapter I/O error on {self.port}: {exc}")
+                self._drop_link()
+                return b"", False
+
+    # Mode 22 helpers expect this name
+    send_and_receive = send_command
+
+    @contextlib.contextmanager
+    def raw_stream(self) -> Iterator[Optional[object]]:
+        """
+        Exclusive use of the port for continuous output (ATMA monitoring):
+        yields the transport, or None when the link is down. No other
+        command runs until the block exits; the caller must leave the
+        adapter at its prompt. Pending input is discarded on both ends.
+        """
+        with self._lock:
+            ser = self.ser
+            if ser is not None:
+                ser.reset_input_buffer()
+            try:
+                yield ser
+            finally:
+                if ser is not None and self.ser is ser:
+                    ser.reset_input_buffer()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# -----------------------------------------------------------
+#  Session pool: one session per port for the whole process
+# -----------------------------------------------------------
+_sessions: Dict[str, AdapterSession] = {}
+_pool_lock = threading.Lock()
+
+
+_redirects: Dict[str, str] = {}
+
+
+def redirect_port(port: str, actual: str):
+    """
+    Serve requests for `port` (usually DEFAULT_PORT) from the session on
+    `actual`, e.g. when a fast reconnect found the adapter on /dev/rfcomm1.
+    """
+    with _pool_lock:
+        if actual == port:
+            _redirects.pop(port, None)
+        else:
+            _redirects[port] = actual
+
+
+def get_session(port: str = DEFAULT_PORT, baudrate: Optional[int] = None,
+                timeout: Optional[int] = None, upgrade_baudrate: Optional[bool] = None) -> AdapterSession:
+    """
+    Return the shared session for `port`, creating it on first use.
+
+    The first caller's settings win: the pooled session is already open at
+    its rate, so a later call asking for a different baudrate, timeout or
+    upgrade_baudrate gets the existing session unchanged and a warning.
+    Leave them as None to take whatever the session has.
+    """
+    with _pool_lock:
+        port = _redirects.get(port, port)
+        session = _sessions.get(port)
+        if session is None:
+            session = AdapterSession(port,
+                                     baudrate=DEFAULT_BAUDRATE if baudrate is None else baudrate,
+                                     timeout=3 if timeout is None else timeout,
+                                     upgrade_baudrate=bool(upgrade_baudrate))
+            _sessions[port] = session
+            return session
+        requested = {"baudrate": (baudrate, session.default_baudrate),
+                     "timeout": (timeout, session.timeout),
+                     "upgrade_baudrate": (upgrade_baudrate, session.upgrade_baudrate)}
+        ignored = [f"{name}={wanted} (has {actual})" for name, (wanted, actual) in requested.items()
+                   if wanted is not None and wanted != actual]
+        if ignored:
+            print(f"⚠️ Session on {port} already exists, ignoring {', '.join(ignored)}")
+        return session
+
+
+def close_all():
+    with _pool_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_all)
@@ -0,0 +1,267 @@
+# adapter/stream.py
+"""
+Incremental reader for continuous adapter output (ATMA monitoring,
+back-to-back polling).
+
+A reader thread fills a fixed-size ring buffer straight from the port's
+file descriptor (readinto, no per-chunk bytes objects) while the consumer
+pops complete lines and hands them to the framer, so parsing overlaps
+with I/O. The ring never grows: if the consumer falls behind the reader
+waits, and a ring full of garbage without any line end is discarded.
+Memory use stays flat no matter how long the stream runs.
+
+    for frame in monitor(session, duration=10):
+        print(f"{frame.ecu:X}", bytes(frame.payload).hex())
+"""
+
+import io
+import select
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+import serial
+
+from obd.framer import Frame, FrameAssembler
+
+RING_SIZE = 64 * 1024
+READ_POLL = 0.05
+PROMPT = b">"
+
+# Line ends in adapter output; the prompt is returned as its own token
+_SEPARATORS = (b"\r", b">")
+
+
+class RingBuffer:
+    """Fixed-capacity byte ring. Filled in place, drained one line at a time."""
+
+    def __init__(self, capacity: int = RING_SIZE):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._head = 0          # first unread byte
+        self._size = 0
+        self.dropped = 0        # bytes discarded because no line end ever arrived
+
+    def __len__(self) -> int:
+        return self._size
+
+    def writable(self) -> memoryview:
+        """Largest contiguous free region after the unread data (may be empty)."""
+        if self._size == self.capacity:
+            return self._view[0:0]
+        tail = (self._head + self._size) % self.capacity
+        end = self.capacity if tail >= self._head else self._head
+        return self._view[tail:end]
+
+    def commit(self, count: int):
+        """Mark `count` bytes written into the last writable() region as data."""
+        self._size += count
+
+    def write(self, data: bytes) -> int:
+        """Copy `data` in (for sources without readinto); returns bytes stored."""
+        stored = 0
+        while stored < len(data):
+            region = self.writable()
+            if not region:
+                break
+            n = min(len(region), len(data) - stored)
+            region[:n] = data[stored:stored + n]
+            self.commit(n)
+            stored += n
+        return stored
+
+    def _find(self, sep: bytes) -> int:
+        """Offset of `sep` from head, or -1. Searches both halves of a wrapped ring."""
+        end = self._head + self._size
+        first_end = min(end, self.capacity)
+        pos = self._buf.find(sep, self._head, first_end)
+        if pos >= 0:
+            return pos - self._head
+        if end > self.capacity:
+            pos = self._buf.find(sep, 0, end - self.capacity)
+            if pos >= 0:
+                return first_end - self._head + pos
+        return -1
+
+    def _take(self, count: int) -> bytes:
+        start = self._head
+        stop = start + count
+        if stop <= self.capacity:
+            out = bytes(self._view[start:stop])
+        else:
+            out = bytes(self._view[start:]) + bytes(self._view[:stop - self.capacity])
+        self._head = stop % self.capacity
+        self._size -= count
+        return out
+
+    def _skip(self, count: int):
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+
+    def pop_line(self) -> Optional[bytes]:
+        """
+        Next complete line (without its CR), PROMPT for a '>' prompt, or
+        None if no complete line is buffered yet. Empty lines are skipped.
+        """
+        while self._size:
+            hits = [(pos, sep) for sep in _SEPARATORS if (pos := self._find(sep)) >= 0]
+            if not hits:
+                if self._size == self.capacity:
+                    self.dropped += self._size
+                    self._skip(self._size)
+                return None
+            pos, sep = min(hits)
+            line = self._take(pos) if pos else b""
+            self._skip(1)
+            if sep == PROMPT:
+                return PROMPT
+            if line.strip():
+                return line
+        return None
+
+
+def _make_reader(ser) -> Callable[[memoryview], int]:
+    """readinto()-style function for `ser` that returns 0 after READ_POLL without data."""
+    try:
+        fd = ser.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation, serial.SerialException):
+        fd = None
+
+    if fd is not None:
+        raw = io.FileIO(fd, "rb", closefd=False)
+
+        def read_fd(region: memoryview) -> int:
+            ready, _, _ = select.select([fd], [], [], READ_POLL)
+            if not ready:
+                return 0
+            try:
+                return raw.readinto(region) or 0
+            except BlockingIOError:
+                return 0
+        return read_fd
+
+    def read_copy(region: memoryview) -> int:
+        chunk = ser.read(min(len(region), ser.in_waiting or 1))
+        region[:len(chunk)] = chunk
+        return len(chunk)
+    return read_copy
+
+
+class StreamReader:
+    """Background thread moving bytes from the port into a RingBuffer."""
+
+    def __init__(self, ser, capacity: int = RING_SIZE):
+        self.ser = ser
+        self.ring = RingBuffer(capacity)
+        self._read = _make_reader(ser)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.error: Optional[Exception] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="StreamReader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                region = self.ring.writable()
+                if not region:
+                    # consumer is behind: wait instead of growing
+                    self._cond.wait(READ_POLL)
+                    continue
+            try:
+                count = self._read(region)
+            except (OSError, serial.SerialException) as exc:
+                self.error = exc
+                break
+            finally:
+                region.release()
+            if count:
+                with self._cond:
+                    self.ring.commit(count)
+                    self._cond.notify_all()
+        with self._cond:
+            self._cond.notify_all()
+
+    def next_line(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Block until a complete line (or PROMPT) is available; None on timeout/stop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                line = self.ring.pop_line()
+                if line is not None:
+                    self._cond.notify_all()
+                    return line
+                if not self.running:
+                    return None
+                remaining = READ_POLL if deadline is None else deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(min(remaining, READ_POLL))
+
+    def lines(self) -> Iterator[bytes]:
+        while True:
+            line = self.next_line(READ_POLL)
+            if line is not None:
+                yield line
+            elif not self.running:
+                return
+
+
+def monitor(session, command: str = "ATMA", duration: Optional[float] = None,
+            stop: Optional[threading.Event] = None) -> Iterator[Frame]:
+    """
+    Run a monitor command (ATMA, ATMR xx, ATMT xx) on an open session and
+    yield frames as they arrive, until `duration` passes or `stop` is set.
+    The session is held for the whole run; any byte sent stops the
+    monitor, after which the adapter prints STOPPED and the prompt.
+    """
+    with session.raw_stream() as ser:
+        if ser is None:
+            return
+        ser.write((command + "\r").encode())
+        reader = StreamReader(ser).start()
+        assembler = FrameAssembler(session.protocol)
+        deadline = None if duration is None else time.monotonic() + duration
+        prompted = False
+        try:
+            while not (stop and stop.is_set()):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                line = reader.next_line(READ_POLL)
+                if line is None:
+                    if not reader.running:
+                        break
+                    continue
+                if line == PROMPT:
+                    # adapter stopped on its own (e.g. BUFFER FULL)
+                    prompted = True
+                    break
+                for frame in assembler.feed(line):
+                    yield frame
+        finally:
+            try:
+                if not prompted:
+                    # a bare CR would repeat the last command once the monitor has ended
+                    ser.write(b"\r")
+                    prompt_deadline = time.monotonic() + session.timeout
+                    while reader.running and time.monotonic() < prompt_deadline:
+                        if reader.next_line(READ_POLL) == PROMPT:
+                            break
+            finally:
+                reader.stop()
@@ -0,0 +1,219 @@
+# adapter/transport.py
+"""
+Byte transports under the adapter session.
+
+Everything above this layer (AdapterSession, baud-rate negotiation, the
+stream reader, the async driver) uses the small pyserial-style surface
+below, so the whole stack runs unchanged over:
+
+    /dev/rfcomm0, /dev/ttyUSB0          serial (Bluetooth SPP, USB)
+    tcp://192.168.0.10:35000            Wi-Fi ELM327 clones
+    loop://                             in-process emulated adapter (tests, benchmarks)
+    loop://name                         in-process handler registered with register_loopback()
+
+    write(data)   read(size)   in_waiting   reset_input_buffer()
+    close()       is_open      baudrate     fileno()
+
+Reads never block longer than the transport's `timeout` and return
+whatever has arrived, which is what read_until_prompt() relies on.
+"""
+
+import errno
+import fcntl
+import io
+import select
+import socket
+import struct
+import termios
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import serial
+
+DEFAULT_TCP_PORT = 35000
+TCP_CONNECT_TIMEOUT = 5
+# ELM327 replies are tiny; small kernel buffers keep latency predictable
+SOCKET_BUFFER = 16 * 1024
+
+Handler = Callable[[str], Tuple[str, float]]
+
+_loopbacks: Dict[str, Handler] = {}
+
+
+def parse_url(url: str) -> Tuple[str, str]:
+    """'tcp://host:port' → ('tcp', 'host:port'); plain device paths → ('serial', path)."""
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return "serial", url
+    return scheme.lower(), rest
+
+
+def is_serial_url(url: str) -> bool:
+    return parse_url(url)[0] == "serial"
+
+
+class TcpTransport:
+    """Non-blocking TCP socket with Nagle off, for Wi-Fi adapters."""
+
+    def __init__(self, address: str, timeout: float = 0.05):
+        host, _, port = address.rpartition(":")
+        if not host:
+            host, port = address, DEFAULT_TCP_PORT
+        self.port = f"tcp://{host}:{port}"
+        self.timeout = timeout
+        self.baudrate = 0             # no line rate; ATBRD is never tried over TCP
+        try:
+            self._sock = socket.create_connection((host, int(port)), timeout=TCP_CONNECT_TIMEOUT)
+        except OSError as exc:
+            raise serial.SerialException(f"could not connect to {self.port}: {exc}") from exc
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        self._sock.setblocking(False)
+
+    @property
+    def is_open(self) -> bool:
+        return self._sock is not None
+
+    def fileno(self) -> int:
+        return self._sock.fileno()
+
+    @property
+    def in_waiting(self) -> int:
+        if self._sock is None:
+            return 0
+        raw = fcntl.ioctl(self._sock.fileno(), termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("i", raw)[0]
+
+    def write(self, data: bytes) -> int:
+        try:
+            self._sock.sendall(data)
+        except OSError as exc:
+            raise serial.SerialException(f"write failed on {self.port}: {exc}") from exc
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if self._sock is None:
+            raise serial.SerialException(f"{self.port} is closed")
+        ready, _, _ = select.select([self._sock], [], [], self.timeout)
+        if not ready:
+            return b""
+        try:
+            data = self._sock.recv(max(size, 1))
+        except BlockingIOError:
+            return b""
+        except OSError as exc:
+            raise serial.SerialException(f"read failed on {self.port}: {exc}") from exc
+        if not data:
+            raise serial.SerialException(f"{self.port} closed by the adapter")
+        return data
+
+    def reset_input_buffer(self):
+        while True:
+            try:
+                if not self._sock.recv(SOCKET_BUFFER):
+                    return
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise serial.SerialException(str(exc)) from exc
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class LoopbackTransport:
+    """
+    In-process adapter: each written command line goes to `handler(cmd)`,
+    which returns (reply, delay) like ELM327Emulator.handle. The reply
+    becomes readable after `delay`, with the usual echo, CRs and prompt.
+    """
+
+    def __init__(self, handler: Optional[Handler] = None, timeout: float = 0.05, name: str = ""):
+        self.emulator = getattr(handler, "__self__", None)
+        if handler is None:
+            from simulator.elm327_emulator import ELM327Emulator
+            self.emulator = ELM327Emulator(latency=0.0)
+            handler = self.emulator.handle
+        self.handler = handler
+        self.port = f"loop://{name}"
+        self.timeout = timeout
+        self.baudrate = 0
+        self.is_open = True
+        self._pending = bytearray()
+        self._ready_at = 0.0
+        self._line = bytearray()
+        self._lock = threading.Lock()
+
+    def fileno(self) -> int:
+        raise io.UnsupportedOperation("loop:// has no file descriptor")
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            return len(self._pending) if time.monotonic() >= self._ready_at else 0
+
+    def write(self, data: bytes) -> int:
+        self._line += data.replace(b"\n", b"")
+        while b"\r" in self._line:
+            cmd, _, rest = bytes(self._line).partition(b"\r")
+            self._line[:] = rest
+            reply, delay = self.handler(cmd.decode("ascii", errors="ignore"))
+            echo = cmd + b"\r" if getattr(self.emulator, "echo", False) else b""
+            body = reply.encode("ascii") + b"\r" if reply else b""
+            with self._lock:
+                self._pending += echo + body + b"\r>"
+                self._ready_at = time.monotonic() + delay
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise serial.SerialException("loop:// is closed")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._pending and now >= self._ready_at:
+                    out = bytes(self._pending[:size])
+                    del self._pending[:size]
+                    return out
+                wake = self._ready_at if self._pending else deadline
+            if now >= deadline:
+                return b""
+            time.sleep(max(0.0, min(wake, deadline) - now))
+
+    def reset_input_buffer(self):
+        with self._lock:
+            if time.monotonic() >= self._ready_at:
+                self._pending.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+def register_loopback(name: str, handler: Handler):
+    """Make `handler` (e.g. ELM327Emulator(...).handle) reachable as loop://name."""
+    _loopbacks[name] = handler
+
+
+def unregister_loopback(name: str):
+    _loopbacks.pop(name, None)
+
+
+def open_transport(url: str, baudrate: int, timeout: float):
+    """Open the transport named by `url` (see module docstring)."""
+    scheme, rest = parse_url(url)
+    if scheme == "serial":
+        return serial.Serial(url, baudrate=baudrate, timeout=timeout)
+    if scheme in ("tcp", "socket"):
+        return TcpTransport(rest, timeout=timeout)
+    if scheme == "loop":
+        if rest and rest not in _loopbacks:
+            raise serial.SerialException(f"No loopback adapter registered as {url}")
+        return LoopbackTransport(_loopbacks.get(rest), timeout=timeout, name=rest)
+    raise serial.SerialException(f"Unsupported adapter URL: {url}")
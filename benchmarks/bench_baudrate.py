@@ -0,0 +1,99 @@
+# benchmarks/bench_baudrate.py
+"""
+Bytes/s over an emulated ELM327 serial link before and after the
+ATBRD upgrade handshake.
+
+The emulated adapter delivers reply bytes no faster than the line rate
+(10 bits per byte) and implements the ATBRD handshake, so the numbers
+show what the upgrade buys on a USB/serial adapter.
+
+    python -m benchmarks.bench_baudrate
+"""
+
+import time
+
+from adapter.baudrate import try_baudrate
+from adapter.session import read_until_prompt
+
+# 6-PID CAN reply with headers on, as seen on every dashboard refresh
+REPLY = b"7E8100F410C1AF80D28\r7E821057811400F33\r7E82210019000000000\r\r>"
+
+
+class EmulatedLink:
+    """Serial stand-in whose reads are paced by the current baud rate."""
+
+    def __init__(self, baudrate=38400):
+        self._baudrate = baudrate
+        self.adapter_rate = baudrate
+        self.pending = bytearray()
+        self.ready_at = time.monotonic()
+        self.switch_to = None
+
+    @property
+    def baudrate(self):
+        return self._baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        self._baudrate = value
+        # ATBRD divisors only approximate the requested rate; UARTs allow ~3 %
+        if self.switch_to and abs(value - self.switch_to) / self.switch_to < 0.03:
+            self.adapter_rate = value
+            self._queue(b"ELM327 v1.5\r")
+
+    @property
+    def in_waiting(self):
+        return len(self.pending) if time.monotonic() >= self.ready_at else 0
+
+    def _queue(self, data):
+        self.pending += data
+        # line time for these bytes at the adapter's rate
+        self.ready_at = time.monotonic() + len(data) * 10 / self.adapter_rate
+
+    def write(self, data):
+        cmd = data.decode().strip()
+        if cmd.startswith("ATBRD"):
+            self.switch_to = round(4_000_000 / int(cmd[5:], 16))
+            self._queue(b"OK")
+        elif cmd == "" and self.switch_to:
+            self.switch_to = None
+            self._queue(b"\r>")
+        else:
+            self._queue(REPLY)
+
+    def read(self, size=1):
+        wait = self.ready_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        out = bytes(self.pending)
+        self.pending.clear()
+        if self._baudrate != self.adapter_rate:
+            return b"\x00" * len(out)  # framing garbage at the wrong rate
+        return out
+
+    def reset_input_buffer(self):
+        self.pending.clear()
+
+
+def throughput(link, requests=50):
+    start = time.monotonic()
+    received = 0
+    for _ in range(requests):
+        link.write(b"010C0D05110F10\r")
+        raw, _ = read_until_prompt(link, timeout=2)
+        received += len(raw)
+    return received / (time.monotonic() - start)
+
+
+def main():
+    link = EmulatedLink()
+    before = throughput(link)
+    upgraded = try_baudrate(link, 230400)
+    after = throughput(link)
+    print(f"38400 baud : {before:10.0f} bytes/s")
+    print(f"{link.baudrate} baud: {after:10.0f} bytes/s  (upgrade {'ok' if upgraded else 'FAILED'})")
+    print(f"gain       : {after / before:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
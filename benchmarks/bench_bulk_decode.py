@@ -0,0 +1,90 @@
+# benchmarks/bench_bulk_decode.py
+"""
+Vectorized bulk decode vs the per-sample decoders, on a million recorded
+samples: a mixed log over the dashboard PIDs, a single PID channel, and
+raw DTC words.
+
+Two comparisons, so the speedup is not taken from mismatched inputs:
+  - like for like: decode_pid per sample vs pack_payloads + decode_pids,
+    both starting from the same data bytes (packing is counted);
+  - reprocessing: decode_pids alone on a log already packed once.
+parse_pid_response (hex text in) is printed for reference only; it also
+pays for text parsing, which neither bulk figure includes.
+
+    python -m benchmarks.bench_bulk_decode
+"""
+
+import time
+
+import numpy as np
+
+from obd.bulk_decode import decode_dtc_words, decode_pids, pack_payloads
+from obd.dtc_lookup import DTCHandler
+from obd.live_diagnostic_commands import PID_MAP, parse_pid_response
+from obd.pid_table import PID_TABLE, decode_pid
+
+
+def make_samples(n, seed=0):
+    """n (pid, data) samples spread over the dashboard PIDs, like a session log."""
+    rng = np.random.default_rng(seed)
+    dashboard = sorted({int(cmd[2:], 16) for cmd, _ in PID_MAP.values()})
+    pids = rng.choice(np.array(dashboard, dtype=np.uint8), n)
+    raw = rng.integers(0, 256, (n, 4), dtype=np.uint8)
+    lengths = np.zeros(256, dtype=np.int64)
+    for (_, pid), definition in PID_TABLE.items():
+        lengths[pid] = definition.length
+    payloads = [bytes(row[:lengths[pid]]) for pid, row in zip(pids.tolist(), raw)]
+    return pids, payloads
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def raw_replies(pids, payloads):
+    """The CAN replies (headers on) the samples were recorded from."""
+    return [f"7E8 {len(data) + 2:02X} 41 {pid:02X} {data.hex(' ').upper()}"
+            for pid, data in zip(pids.tolist(), payloads)]
+
+
+def main(n=1_000_000, repeat=3):
+    pids, payloads = make_samples(n)
+    replies = raw_replies(pids, payloads)
+    pid_list = pids.tolist()
+    rpm = np.full(n, 0x0C, dtype=np.uint8)
+
+    text = best_of(lambda: [parse_pid_response(p, t) for p, t in zip(pid_list, replies)], 1)
+    loop = best_of(lambda: [decode_pid(p, d) for p, d in zip(pid_list, payloads)], 1)
+    pack = best_of(lambda: pack_payloads(payloads), repeat)
+    data, lengths = pack_payloads(payloads)
+    bulk = best_of(lambda: decode_pids(pids, data, lengths), repeat)
+    # one log channel (all RPM)
+    rpm_loop = best_of(lambda: [decode_pid(0x0C, d) for d in payloads], 1)
+    rpm_bulk = best_of(lambda: decode_pids(rpm, data, lengths), repeat)
+
+    words = np.random.default_rng(1).integers(0, 0x10000, n, dtype=np.uint16)
+    nibbles = [f"{w:04X}" for w in words.tolist()]
+    dtc_loop = best_of(lambda: [DTCHandler._decode_dtc(x) for x in nibbles], 1)
+    dtc_bulk = best_of(lambda: decode_dtc_words(words), repeat)
+
+    print(f"samples                          : {n:,}")
+    print(f"parse_pid_response loop (text)   : {text * 1e3:8.1f} ms   reference only")
+    print(f"decode_pid loop (bytes)          : {loop * 1e3:8.1f} ms")
+    print(f"pack_payloads + decode_pids      : {(pack + bulk) * 1e3:8.1f} ms  "
+          f"({loop / (pack + bulk):.1f}x end to end)")
+    print(f"decode_pids on a packed log      : {bulk * 1e3:8.1f} ms  ({loop / bulk:.0f}x per re-run)")
+    print(f"single PID decode_pid loop       : {rpm_loop * 1e3:8.1f} ms")
+    print(f"pack + decode_pids (single PID)  : {(pack + rpm_bulk) * 1e3:8.1f} ms  "
+          f"({rpm_loop / (pack + rpm_bulk):.1f}x end to end)")
+    print(f"decode_pids, packed (single PID) : {rpm_bulk * 1e3:8.1f} ms  ({rpm_loop / rpm_bulk:.0f}x per re-run)")
+    print(f"DTCHandler._decode_dtc loop      : {dtc_loop * 1e3:8.1f} ms")
+    print(f"decode_dtc_words                 : {dtc_bulk * 1e3:8.1f} ms  ({dtc_loop / dtc_bulk:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
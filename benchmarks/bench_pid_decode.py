@@ -0,0 +1,59 @@
+# benchmarks/bench_pid_decode.py
+"""
+Compiled PID table vs the former one-regex-per-PID parse_* functions.
+
+    python -m benchmarks.bench_pid_decode
+"""
+
+import re
+import timeit
+
+from obd.pid_table import PID_TABLE, decode_mode01_payload, decode_pid
+
+
+# --- the regex parsers as they were before the PID table ---------------
+def legacy_rpm(text):
+    match = re.search(r'41\s?0C\s?([0-9A-Fa-f]{2})\s?([0-9A-Fa-f]{2})', text)
+    if match:
+        return ((int(match.group(1), 16) * 256) + int(match.group(2), 16)) // 4
+    return None
+
+def legacy_temp(text):
+    match = re.search(r'41\s?[0-5][0-9A-Fa-f]\s?([0-9A-Fa-f]{2})', text)
+    if match:
+        return int(match.group(1), 16) - 40
+    return None
+
+def legacy_maf(text):
+    match = re.search(r'41\s?10\s?([0-9A-Fa-f]{2})\s?([0-9A-Fa-f]{2})', text)
+    if match:
+        return ((int(match.group(1), 16) * 256) + int(match.group(2), 16)) / 100.0
+    return None
+
+
+SAMPLES_TEXT = [
+    (legacy_rpm, "7E804410C1AF8\r\r>"),
+    (legacy_temp, "7E803410578\r\r>"),
+    (legacy_maf, "7E80441100190\r\r>"),
+]
+SAMPLES_BYTES = [
+    (0x0C, b"\x1a\xf8"),
+    (0x05, b"\x78"),
+    (0x10, b"\x01\x90"),
+]
+BATCH_PAYLOAD = bytes.fromhex("410C1AF80D2805781140 0F3310 0190".replace(" ", ""))
+
+
+def main(number=200_000):
+    regex = timeit.timeit(lambda: [fn(t) for fn, t in SAMPLES_TEXT], number=number)
+    table = timeit.timeit(lambda: [decode_pid(p, d) for p, d in SAMPLES_BYTES], number=number)
+    batch = timeit.timeit(lambda: decode_mode01_payload(BATCH_PAYLOAD), number=number)
+    per = 1e9 / (number * len(SAMPLES_TEXT))
+    print(f"PID table entries       : {len(PID_TABLE)}")
+    print(f"regex parse_* functions : {regex * per:7.0f} ns/sample")
+    print(f"compiled table decode   : {table * per:7.0f} ns/sample  ({regex / table:.1f}x)")
+    print(f"6-PID payload split     : {batch * 1e9 / (number * 6):7.0f} ns/sample")
+
+
+if __name__ == "__main__":
+    main()
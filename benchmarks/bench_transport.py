@@ -0,0 +1,81 @@
+# benchmarks/bench_transport.py
+"""
+Dashboard sweeps per second over each transport, with the real
+AdapterSession + read_pids stack on top and the ELM327 emulator below:
+
+    serial  pty served by the emulator (stands in for rfcomm/USB)
+    tcp     emulator on 127.0.0.1, like a Wi-Fi adapter
+    loop    emulator called in-process, no OS I/O at all
+
+The emulated ECUs answer with zero latency by default, so the numbers
+show the cost of each transport itself.
+
+    python -m benchmarks.bench_transport [--latency 0.02]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import adapter.session as session_module
+import utils.profile_store as profile_store
+from adapter.session import AdapterSession
+from adapter.transport import register_loopback, unregister_loopback
+from obd.live_diagnostic_commands import PID_MAP, read_pids
+from simulator.elm327_emulator import ELM327Emulator
+
+SWEEPS = 200
+
+
+def run(session: AdapterSession, sweeps: int = SWEEPS):
+    pid_cmds = [cmd for cmd, _ in PID_MAP.values()]
+    session.timings.clear()
+    start = time.monotonic()
+    for _ in range(sweeps):
+        read_pids(session, pid_cmds)
+    elapsed = time.monotonic() - start
+    latencies = sorted(t for _, t in session.timings)
+    return sweeps / elapsed, statistics.mean(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.0, help="emulated ECU latency (s)")
+    parser.add_argument("--sweeps", type=int, default=SWEEPS)
+    args = parser.parse_args()
+
+    # keep benchmark vehicles out of the user's profile store
+    profile_store.PROFILE_FILE = Path(tempfile.mkdtemp()) / "profiles.json"
+    session_module.SETTLE_TIME = 0
+
+    results = {}
+    for name in ("serial", "tcp", "loop"):
+        emulator = ELM327Emulator(ecus=1, latency=args.latency, search_time=0)
+        if name == "serial":
+            url = emulator.serve_pty()
+        elif name == "tcp":
+            host, port = emulator.serve_tcp()
+            url = f"tcp://{host}:{port}"
+        else:
+            register_loopback("bench", emulator.handle)
+            url = "loop://bench"
+        session = AdapterSession(url)
+        try:
+            if not session.open():
+                print(f"{name:7}: could not open {url}")
+                continue
+            results[name] = run(session, args.sweeps)
+        finally:
+            unregister_loopback("bench")
+            session.close()
+            emulator.stop()
+
+    print(f"{'':7}  {'sweeps/s':>9}  {'mean ms':>8}  {'p95 ms':>7}")
+    for name, (rate, mean, p95) in results.items():
+        print(f"{name:7}: {rate:9.1f}  {mean * 1000:8.2f}  {p95 * 1000:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox
+import itertools
+import threading
+import time
 from obd.mode22_support import read_brand_dtcs, clear_brand_dtcs
+from adapter.arbiter import INTERACTIVE, arbiter_for
+from adapter.session import get_session
 
 CAR_BRANDS = [
     "Audi", "BMW", "Ford", "Honda", "Hyundai",
@@ -13,6 +18,7 @@ class BrandInterface:
         self.parent = parent_gui
         self.frame  = parent_gui.main_frame
         self.style  = parent_gui.button_style
+        self.loading = False
         self.build_brand_picker()
 
     # ------------------------------------------------------------------ #
@@ -72,9 +78,14 @@ class BrandInterface:
                  font=("Helvetica", 28, "bold"),
                  fg="#18353F", bg="#ffffff").pack(pady=40)
 
-        tk.Button(self.frame, text="Read Brand Trouble Codes",
-                  command=lambda: self.read_brand_dtcs(brand),
-                  **self.style).pack(pady=10)
+        self.read_button = tk.Button(self.frame, text="Read Brand Trouble Codes",
+                                     command=lambda: self.read_brand_dtcs(brand),
+                                     **self.style)
+        self.read_button.pack(pady=10)
+
+        self.loading_label = tk.Label(self.frame, text="", font=("Helvetica", 12),
+                                      fg="gray", bg="#ffffff")
+        self.loading_label.pack(pady=5)
 
         # ⇢  bigger gap before nav
         tk.Label(self.frame, bg="#ffffff").pack(pady=40)
@@ -92,9 +103,12 @@ class BrandInterface:
     # 3.  Real actions with safe fallback                                #
     # ------------------------------------------------------------------ #
     def read_brand_dtcs(self, brand):
-        # For now we don’t pass a live adapter → safe fallback
-        dtcs = read_brand_dtcs(brand, elm_adapter=None)
+        # walking every module can take seconds: keep it off the Tk thread
+        self._in_background("Reading", lambda: self._on_adapter(
+            lambda adapter: read_brand_dtcs(brand, elm_adapter=adapter)),
+            lambda dtcs: self._show_brand_dtcs(brand, dtcs))
 
+    def _show_brand_dtcs(self, brand, dtcs):
         if not dtcs:
             messagebox.showinfo("DTC Result", f"No DTC found for {brand}.")
             return
@@ -103,13 +117,72 @@ class BrandInterface:
         messagebox.showinfo("DTC Result", f"{brand} trouble codes:\n\n{msg}")
 
     def clear_brand_dtcs(self, brand):
-        success = clear_brand_dtcs(brand, elm_adapter=None)
+        self._in_background("Clearing", lambda: self._on_adapter(
+            lambda adapter: clear_brand_dtcs(brand, elm_adapter=adapter)),
+            lambda success: self._show_clear_result(brand, success))
+
+    @staticmethod
+    def _show_clear_result(brand, success):
         if success:
             messagebox.showinfo("Clear DTC", f"{brand} DTCs cleared.")
         else:
             messagebox.showwarning("Clear DTC", f"Failed to clear {brand} DTCs.")
 
     # ------------------------------------------------------------------ #
+    # 4.  Background work                                                #
+    # ------------------------------------------------------------------ #
+    def _in_background(self, task_name, work, done):
+        """Run `work()` on a worker thread with the loader; `done(result)` runs on the Tk thread."""
+        if self.loading:
+            return
+        self.loading = True
+        self.read_button.config(state=tk.DISABLED)
+        threading.Thread(target=self.animate_loader, args=(task_name,), daemon=True).start()
+
+        def run():
+            try:
+                result = work()
+            except Exception as e:
+                # `e` is unbound once the except block ends, the callback runs later
+                msg = str(e)
+                self.root.after(0, lambda: messagebox.showerror("Error", msg))
+            else:
+                self.root.after(0, lambda: done(result))
+            finally:
+                self.root.after(0, self._stop_loader)
+        threading.Thread(target=run, daemon=True).start()
+
+    def animate_loader(self, task_name):
+        for frame in itertools.cycle(['|', '/', '-', '\\']):
+            if not self.loading or not self.loading_label.winfo_exists():
+                break
+            try:
+                self.loading_label.config(text=f"{task_name}... {frame}")
+            except tk.TclError:
+                break
+            time.sleep(0.1)
+
+    def _stop_loader(self):
+        self.loading = False
+        if self.loading_label.winfo_exists():
+            self.loading_label.config(text="")
+        if self.read_button.winfo_exists():
+            self.read_button.config(state=tk.NORMAL)
+
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _adapter():
+        """Shared adapter session, or None → safe fallback when offline."""
+        session = get_session()
+        return session if session.open() else None
+
+    def _on_adapter(self, action):
+        """Run `action(adapter)` as an interactive job, ahead of live polling."""
+        session = self._adapter()
+        if session is None:
+            return action(None)
+        return arbiter_for(session).run(action, INTERACTIVE)
+
     def _clear(self):
         for w in self.frame.winfo_children():
             w.destroy()
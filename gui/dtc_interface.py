@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox
+from obd.dtc_index import dtc_index
 from obd.dtc_lookup import DTCHandler
+from obd.pid_table import get_definition
+from obd.readiness import summarize
 import threading
 import time
 import itertools
@@ -32,6 +35,9 @@ class DTCInterface:
         self.clear_button.pack(pady=10)
         self.clear_button.config(state=tk.DISABLED)  # initially disabled
 
+        tk.Button(button_frame, text="Readiness Check", command=self.check_readiness,
+                  **self.button_style).pack(pady=10)
+
         self.result_label = tk.Label(self.main_frame, text="", font=("Helvetica", 14),
                                      fg="#18353F", bg="#ffffff", wraplength=700, justify="center")
         self.result_label.pack(pady=20)
@@ -40,12 +46,47 @@ class DTCInterface:
                                       fg="gray", bg="#ffffff")
         self.loading_label.pack(pady=5)
 
+        self.build_search()
+
         tk.Button(self.main_frame, text="Back", command=self.parent_gui.show_diagnostic_menu,
                   **self.button_style).pack(pady=10)
 
         tk.Button(self.main_frame, text="Exit", command=self.root.quit,
                   **self.button_style).pack(pady=10)
 
+    # ---------------- Code search ----------------
+    def build_search(self):
+        """Search box: type a symptom ('camshaft', 'evap leak') or part of a code."""
+        search_frame = tk.Frame(self.main_frame, bg="#ffffff")
+        search_frame.pack(pady=10)
+
+        tk.Label(search_frame, text="Search codes:", font=("Helvetica", 12),
+                 fg="#18353F", bg="#ffffff").grid(row=0, column=0, padx=5)
+
+        self.search_var = tk.StringVar()
+        entry = tk.Entry(search_frame, textvariable=self.search_var, font=("Helvetica", 12),
+                         width=30, bd=2, relief=tk.GROOVE)
+        entry.grid(row=0, column=1, padx=5)
+        entry.bind("<KeyRelease>", lambda e: self.update_search())
+
+        self.brand_var = tk.StringVar(value="All brands")
+        brands = ["All brands"] + [b.capitalize() for b in dtc_index().brands()]
+        tk.OptionMenu(search_frame, self.brand_var, *brands,
+                      command=lambda _: self.update_search()).grid(row=0, column=2, padx=5)
+
+        self.search_results = tk.Listbox(search_frame, width=90, height=8, font=("Helvetica", 11),
+                                         fg="#18353F", bg="#ffffff")
+        self.search_results.grid(row=1, column=0, columnspan=3, pady=5)
+
+    def update_search(self):
+        self.search_results.delete(0, tk.END)
+        brand = self.brand_var.get()
+        matches = dtc_index().search(self.search_var.get(),
+                                     brand=None if brand == "All brands" else brand)
+        for match in matches:
+            source = match.brand.capitalize() if match.brand else "Generic"
+            self.search_results.insert(tk.END, f"{match.code}  {match.desc}  ({source})")
+
     def animate_loader(self, task_name):
         for frame in itertools.cycle(['|', '/', '-', '\\']):
             if not self.loading or not self.loading_label.winfo_exists():
@@ -67,10 +108,11 @@ class DTCInterface:
         try:
             handler = DTCHandler()
             if handler.connect():
-                codes = handler.read_dtc()
+                snapshot = handler.read_snapshot(freeze_frames=True)
                 handler.disconnect()
-                if codes:
-                    self.result_label.config(text="\n".join(codes))
+                lines = self.format_snapshot(snapshot)
+                if lines:
+                    self.result_label.config(text="\n".join(lines))
                     self.clear_button.config(state=tk.NORMAL)
                 else:
                     self.result_label.config(text="✅ No trouble codes found.")
@@ -83,6 +125,69 @@ class DTCInterface:
             self.loading = False
             self.loading_label.config(text="")
 
+    @staticmethod
+    def format_snapshot(snapshot):
+        """One block per ECU that has codes: MIL state, then stored/pending/permanent."""
+        lines = []
+        for ecu, entry in sorted(snapshot.items()):
+            groups = [(label, entry[key]) for label, key in
+                      (("Stored", "stored"), ("Pending", "pending"), ("Permanent", "permanent"))
+                      if entry[key]]
+            if not groups:
+                continue
+            mil = "MIL on" if entry["mil"] else "MIL off"
+            lines.append(f"ECU {ecu:X} ({mil})")
+            for label, codes in groups:
+                for d in codes:
+                    lines.append(f"{label}: {d['code']} – {d['desc']}")
+                    if "freeze_frame" in d:
+                        lines.append("    Freeze frame: " + DTCInterface.format_freeze_frame(d["freeze_frame"]))
+        return lines
+
+    @staticmethod
+    def format_freeze_frame(frame):
+        parts = []
+        for cmd, value in frame["values"].items():
+            definition = get_definition(int(cmd[2:], 16))
+            if definition is None:
+                continue
+            unit = f" {definition.unit}" if definition.unit else ""
+            shown = f"{value:.1f}" if isinstance(value, float) else value
+            parts.append(f"{definition.name}: {shown}{unit}")
+        return ", ".join(parts)
+
+    def check_readiness(self):
+        self.result_label.config(text="")
+        self.loading = True
+        threading.Thread(target=self.animate_loader, args=("Checking readiness",)).start()
+        threading.Thread(target=self._readiness_logic).start()
+
+    def _readiness_logic(self):
+        try:
+            handler = DTCHandler()
+            if handler.connect():
+                report = handler.read_readiness()
+                handler.disconnect()
+                summary = summarize(report)
+                if summary is None:
+                    self.result_label.config(text="⚠️ No readiness data from the vehicle.")
+                    return
+                lines = ["✅ Ready for inspection" if summary["ready"] else "❌ Not ready for inspection"]
+                if summary["mil"]:
+                    lines.append("MIL is on")
+                if summary["incomplete"]:
+                    lines.append("Incomplete monitors: " + ", ".join(summary["incomplete"]))
+                if summary["failed_tests"]:
+                    lines.append("Failed tests: " + "; ".join(summary["failed_tests"]))
+                self.result_label.config(text="\n".join(lines))
+            else:
+                messagebox.showerror("Connection Failed", "Unable to connect to OBD device.")
+        except Exception as e:
+            self.result_label.config(text=f"Error: {e}")
+        finally:
+            self.loading = False
+            self.loading_label.config(text="")
+
     def clear_dtc(self):
         self.result_label.config(text="")
         try:
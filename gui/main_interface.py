@@ -2,8 +2,10 @@
 import tkinter as tk
 from tkinter import messagebox
 from utils import log_manager
-from adapter import connection, initialization
+from adapter import connection, initialization, reconnect
+from adapter.session import DEFAULT_PORT
 from obd.live_diagnostic_commands import fetch_live_data
+from obd.live_poller import LivePoller
 import threading
 import itertools
 import time
@@ -61,6 +63,9 @@ class LibreDiagnosticGUI:
         # 5) build UI
         self.build_main_screen()
 
+        # 6) reuse last session's adapter binding if it still answers
+        threading.Thread(target=self.try_fast_reconnect, daemon=True).start()
+
 
     def resize_background(self, event):
         if event.width < 2 or event.height < 2:
@@ -138,6 +143,15 @@ class LibreDiagnosticGUI:
         SimulationInterface(self.root, self)
 
 
+    def try_fast_reconnect(self):
+        if reconnect.fast_reconnect():
+            self.root.after(0, self.enter_reconnected)
+
+    def enter_reconnected(self):
+        # only jump ahead if the user is still on the start screen
+        if getattr(self, "scan_button", None) is not None and self.scan_button.winfo_exists():
+            self.show_diagnostic_menu()
+
     def start_scan_thread(self):
         self.scan_button.config(state=tk.DISABLED)
         self.loading = True
@@ -153,6 +167,11 @@ class LibreDiagnosticGUI:
             time.sleep(0.1)
 
     def scan_and_connect(self):
+        if reconnect.fast_reconnect():
+            self.loading = False
+            self.loading_label.pack_forget()
+            self.root.after(0, self.show_diagnostic_menu)
+            return
         mac = connection.run_bluetoothctl_and_connect_obd2()
         self.loading = False
         self.loading_label.pack_forget()
@@ -181,10 +200,15 @@ class LibreDiagnosticGUI:
             self.scan_button.config(state=tk.NORMAL)
 
     def start_bind_thread(self):
-        sudo_pass = self.ask_sudo_password()
         if not connection.elm_mac:
             messagebox.showwarning("Not Connected", "Please scan and connect to a device first.")
             return
+        # already bound from an earlier session: no sudo, no rebind
+        port = initialization.bound_port(connection.elm_mac)
+        if port and reconnect.fast_reconnect([port]):
+            self.show_diagnostic_menu()
+            return
+        sudo_pass = self.ask_sudo_password()
         if sudo_pass:
             self.loading = True
             self.loading_label.pack(pady=5)
@@ -304,7 +328,7 @@ class LibreDiagnosticGUI:
         rerun_button = tk.Button(right_frame, text="Rerun", command=lambda: self.rerun_live_data(left_frame), **self.button_style)
         rerun_button.pack(pady=(20, 10))
 
-        back_button = tk.Button(right_frame, text="Back", command=self.show_diagnostic_menu, **self.button_style)
+        back_button = tk.Button(right_frame, text="Back", command=self.leave_live_data, **self.button_style)
         back_button.pack(pady=(20, 10))
 
         exit_button = tk.Button(right_frame, text="Exit", command=self.root.quit, **self.button_style)
@@ -312,11 +336,13 @@ class LibreDiagnosticGUI:
 
     def fetch_and_display_live_data(self, left_frame):
         try:
-            data = fetch_live_data("/dev/rfcomm0")
+            data = fetch_live_data(DEFAULT_PORT)
+            self.live_values = dict(data)
+            self.selected_live_label = None
 
             def show_value(label):
-                value = data.get(label, "N/A")
-                self.live_data_label.config(text=f"{label}:\n{value}")
+                self.selected_live_label = label
+                self.refresh_live_value()
 
             for widget in left_frame.winfo_children():
                 widget.destroy()
@@ -325,6 +351,7 @@ class LibreDiagnosticGUI:
                 tk.Button(left_frame, text=label, command=lambda l=label: show_value(l), **self.button_style).pack(pady=5)
 
             self.live_data_label.config(text="Select a data point to view")
+            self.start_live_poller()
 
         except Exception as e:
             print(f"❌ Error in fetch_and_display_live_data: {e}")
@@ -333,7 +360,38 @@ class LibreDiagnosticGUI:
             self.loading = False
             self.loading_label.pack_forget()
 
+    def start_live_poller(self):
+        """Keep the values on screen updating after the first sweep."""
+        if getattr(self, "live_poller", None) is None:
+            self.live_poller = LivePoller()
+            self.live_poller.subscribe(self.on_live_sample)
+        self.live_poller.start()     # resumes a paused poller
+
+    def stop_live_poller(self):
+        if getattr(self, "live_poller", None) is not None:
+            self.live_poller.stop()
+
+    def on_live_sample(self, sample):
+        # called on the poller thread → hand over to Tk
+        self.live_values[sample.label] = sample.value
+        if sample.label == self.selected_live_label:
+            self.root.after(0, self.refresh_live_value)
+
+    def refresh_live_value(self):
+        label = self.selected_live_label
+        if label is None or not self.live_data_label.winfo_exists():
+            return
+        value = self.live_values.get(label, "N/A")
+        self.live_data_label.config(text=f"{label}:\n{value}")
+
+    def leave_live_data(self):
+        self.stop_live_poller()
+        self.show_diagnostic_menu()
+
     def rerun_live_data(self, left_frame):
+        # pause rather than stop: the sweep runs on the same adapter session
+        if getattr(self, "live_poller", None) is not None:
+            self.live_poller.pause()
         self.loading = True
         self.loading_label.pack(pady=5)
         threading.Thread(target=self.animate_loading, args=("Fetching Live Data",)).start()
@@ -0,0 +1,158 @@
+# obd/bulk_decode.py
+"""
+Bulk decoding for offline reprocessing of recorded responses.
+
+The live path decodes one PID or one DTC at a time (obd.pid_table,
+obd.dtc_lookup), which is right for a dashboard but slow for re-running a
+whole session log. Here samples are masked per PID and each group's data
+bytes are handed to the same compiled PID table formula as NumPy columns,
+so a group costs a handful of array operations instead of one Python
+call per sample.
+
+    pids = np.array([0x0C, 0x05, 0x0C], dtype=np.uint8)
+    data, lengths = pack_payloads([b"\\x1a\\xf8", b"\\x78", b"\\x0b\\xb8"])
+    decode_pids(pids, data, lengths)        # array([1726., 80., 750.])
+    decode_dtc_words([0x0133, 0xC101])      # array(['P0133', 'U0101'])
+
+Needs NumPy, declared in requirements-dev.txt with the other offline and
+test tools; the GUI and live readers do not import this module.
+"""
+
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from obd.pid_table import PID_TABLE
+
+Columns = Callable[[List[np.ndarray]], np.ndarray]
+
+
+# -----------------------------------------------------------
+#  PID values
+# -----------------------------------------------------------
+def _vector_decoder(pid: int, mode: int) -> Optional[Columns]:
+    """
+    Decoder over a list of int64 byte columns. The compiled table formulas
+    only index d[0], d[1], ... and do arithmetic, so they run on columns
+    as they are; bitmapped PIDs (formula None) get their big-endian
+    integer instead of int.from_bytes.
+    """
+    definition = PID_TABLE.get((mode, pid))
+    if definition is None:
+        return None
+    if definition.formula is not None:
+        return definition.decode
+    return lambda d: sum(column << (8 * (len(d) - 1 - i)) for i, column in enumerate(d))
+
+
+def pack_payloads(payloads: Iterable[bytes], width: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Data bytes of many samples → (uint8 matrix, lengths), left-aligned and
+    zero-padded to `width` (default: the longest payload). Touches each
+    payload once in Python (join + len); do it when loading a log, not
+    per decode.
+    """
+    payloads = payloads if isinstance(payloads, list) else list(payloads)
+    n = len(payloads)
+    lengths = np.fromiter(map(len, payloads), dtype=np.int64, count=n)
+    if width is None:
+        width = int(lengths.max()) if n else 0
+    out = np.zeros((n, width), dtype=np.uint8)
+    if width and n:
+        flat = np.frombuffer(b"".join(payloads), dtype=np.uint8)
+        # scatter the joined bytes: row = sample, column = offset in its payload
+        rows = np.repeat(np.arange(n), lengths)
+        cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        keep = cols < width
+        out[rows[keep], cols[keep]] = flat[keep]
+    # narrow lengths keep the per-decode gather cheap
+    return out, np.minimum(lengths, width).astype(np.uint16)
+
+
+def _decode_group(pid: int, columns: List[np.ndarray], valid: Optional[np.ndarray],
+                  mode: int, out: np.ndarray):
+    """Decode one PID's samples (byte columns) into `out`, NaN where unusable."""
+    decode = _vector_decoder(pid, mode)
+    length = PID_TABLE[(mode, pid)].length if decode else 0
+    if decode is None or len(columns) < length:
+        out[:] = np.nan
+        return
+    out[:] = decode([column.astype(np.int64) for column in columns[:length]])
+    if valid is not None:
+        out[valid < length] = np.nan
+
+
+def decode_pids(pids, payloads, lengths=None, mode: int = 0x01) -> np.ndarray:
+    """
+    Engineering values (float64) for n samples: `pids` has shape (n,), or
+    is a single PID for a one-channel log; `payloads` is an (n, width)
+    byte matrix of each sample's data bytes (see pack_payloads). Samples
+    are decoded per PID group with the PID table formulas; unknown PIDs
+    and payloads shorter than the PID's data length (per `lengths`, or the
+    matrix width) come out as NaN.
+    """
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    if payloads.ndim != 2:
+        raise ValueError("payloads must be an (n, width) matrix")
+    n = len(payloads)
+    out = np.empty(n)
+    valid = None if lengths is None else np.asarray(lengths)
+    pids = np.asarray(pids)
+    if pids.ndim == 0 or (n and (pids == pids[0]).all()):
+        # one channel: decode in place, no regrouping
+        pid = int(pids) if pids.ndim == 0 else int(pids[0])
+        _decode_group(pid, [payloads[:, i] for i in range(payloads.shape[1])], valid, mode, out)
+        return out
+    if len(pids) != n:
+        raise ValueError("pids and payloads must have one entry per sample")
+
+    # logs hold a handful of PIDs: one mask per PID present, no sort. The
+    # mask becomes an index array once, gathers with it are far cheaper
+    # than repeated boolean indexing.
+    columns = [np.ascontiguousarray(payloads[:, i]) for i in range(payloads.shape[1])]
+    for pid in np.flatnonzero(np.bincount(pids, minlength=0x100)).tolist():
+        rows = np.flatnonzero(pids == pid)
+        group = np.empty(len(rows))
+        _decode_group(pid, [column[rows] for column in columns],
+                      None if valid is None else valid[rows], mode, group)
+        out[rows] = group
+    return out
+
+
+# -----------------------------------------------------------
+#  DTC codes
+# -----------------------------------------------------------
+_LETTERS = np.array([ord(c) for c in "PCBU"], dtype=np.uint32)
+_HEX = np.array([ord(c) for c in "0123456789ABCDEF"], dtype=np.uint32)
+
+
+_dtc_table: Optional[np.ndarray] = None
+
+
+def _dtc_codes(words: np.ndarray) -> np.ndarray:
+    """'P0133' style codes for uint32 words, built from code points."""
+    # five UCS-4 code points per row, viewed as one '<U5' string each
+    chars = np.empty((len(words), 5), dtype=np.uint32)
+    chars[:, 0] = _LETTERS[words >> 14]
+    chars[:, 1] = ord("0") + ((words >> 12) & 0x3)
+    chars[:, 2] = _HEX[(words >> 8) & 0xF]
+    chars[:, 3] = _HEX[(words >> 4) & 0xF]
+    chars[:, 4] = _HEX[words & 0xF]
+    chars[words == 0] = 0
+    return chars.view("<U5").reshape(len(words))
+
+
+def decode_dtc_words(words) -> np.ndarray:
+    """
+    Raw 16-bit DTC words (first byte high) → array of 'P0133' style codes,
+    '' for the 0000 filler. `words` may also be the raw DTC bytes of a
+    Mode 03/07/0A reply, read two at a time. All 65536 codes are built
+    once, so a decode is a single table lookup.
+    """
+    global _dtc_table
+    if isinstance(words, (bytes, bytearray, memoryview)):
+        words = np.frombuffer(bytes(words)[:len(words) // 2 * 2], dtype=">u2")
+    words = np.asarray(words)
+    if _dtc_table is None:
+        _dtc_table = _dtc_codes(np.arange(0x10000, dtype=np.uint32))
+    return _dtc_table.take(words.astype(np.intp) & 0xFFFF)
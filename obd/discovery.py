@@ -0,0 +1,138 @@
+# obd/discovery.py
+"""
+Supported-PID discovery for Mode 01, Mode 09, (freeze frame 0) Mode 02
+and Mode 06 (OBDMIDs, CAN only).
+
+Each support PID (00, 20, 40, ... E0) returns a 32-bit bitmap of the next
+32 PIDs; its last bit says whether the next support PID exists. The chain
+is followed per ECU until an ECU stops announcing one. On CAN all Mode 01
+and Mode 06 support PIDs are asked for up front in multi-PID requests
+(two round trips instead of up to eight); ECUs simply leave out the ones
+they lack.
+
+The merged result is stored in the vehicle profile (keyed by the hashed
+ECU fingerprint from negotiation, never the VIN), so the next connect to
+the same car skips discovery entirely.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from obd.framer import frames_for_service, parse_frames
+from obd.pid_table import MAX_PIDS_PER_REQUEST, supported_from_bitmap
+from utils.profile_store import get_profile, update_profile
+
+SUPPORT_BASES = tuple(range(0x00, 0x100, 0x20))
+DISCOVERY_MODES = ("01", "09")
+
+# Modes whose support PIDs may be packed six per CAN request
+BATCHED_MODES = ("01", "06")
+
+# {mode: {ecu: ['0101', ...]}}
+Support = Dict[str, Dict[int, List[str]]]
+
+
+def support_requests(mode: str, bases: Iterable[int], can: bool) -> List[str]:
+    """Requests for the given support PIDs; Mode 01/06 on CAN pack six per request."""
+    bases = list(bases)
+    if can and mode in BATCHED_MODES:
+        return [mode + "".join(f"{b:02X}" for b in bases[i:i + MAX_PIDS_PER_REQUEST])
+                for i in range(0, len(bases), MAX_PIDS_PER_REQUEST)]
+    if mode == "02":
+        return [f"02{b:02X}00" for b in bases]       # support of freeze frame 0
+    return [f"{mode}{b:02X}" for b in bases]
+
+
+def parse_support_reply(raw: str, mode: str = "01", protocol: str = "") -> Dict[int, Dict[int, int]]:
+    """
+    {ecu: {base: bitmap}} from a (multi-)support-PID reply. Mode 09 on
+    legacy protocols carries a message count byte before the bitmap,
+    Mode 02 always carries the freeze frame number there.
+    """
+    service = 0x40 + int(mode, 16)
+    bitmaps: Dict[int, Dict[int, int]] = {}
+    for frame in frames_for_service(parse_frames(raw, protocol), service):
+        payload = frame.payload
+        skip = 1 if mode == "02" or (mode == "09" and not frame.can) else 0
+        pos = 1
+        while pos + 5 + skip <= len(payload) and payload[pos] in SUPPORT_BASES:
+            start = pos + 1 + skip
+            bits = int.from_bytes(payload[start:start + 4], "big")
+            bitmaps.setdefault(frame.ecu, {})[payload[pos]] = bits
+            pos = start + 4
+    return bitmaps
+
+
+def next_bases(bitmaps: Dict[int, Dict[int, int]], asked: Iterable[int]) -> List[int]:
+    """Support PIDs announced by any ECU that have not been asked for yet."""
+    asked = set(asked)
+    wanted = {base + 0x20 for ecu_maps in bitmaps.values()
+              for base, bits in ecu_maps.items() if bits & 1 and base + 0x20 in SUPPORT_BASES}
+    return sorted(wanted - asked)
+
+
+def chained_pids(ecu_maps: Dict[int, int], mode: str = "01") -> List[str]:
+    """
+    PIDs one ECU supports, following its own chain from base 00. Bitmaps
+    the ECU did not announce (e.g. stray multi-PID answers) are ignored.
+    """
+    pids = []
+    base = 0x00
+    while base in ecu_maps:
+        bits = ecu_maps[base]
+        pids += supported_from_bitmap(bits.to_bytes(4, "big"), base, mode)
+        if not bits & 1:
+            break
+        base += 0x20
+    return pids
+
+
+def discover_mode(send: Callable[[str], str], mode: str = "01", protocol: str = "",
+                  can: bool = False) -> Dict[int, List[str]]:
+    """Walk one mode's support chain with `send(cmd)`; returns {ecu: ['0101', ...]}."""
+    bitmaps: Dict[int, Dict[int, int]] = {}
+    if mode == "06" and not can:
+        return {}           # pre-CAN Mode 06 uses a different, TID-based layout
+    pending = list(SUPPORT_BASES) if can and mode in BATCHED_MODES else [0x00]
+    asked = set()
+    while pending:
+        asked.update(pending)
+        for request in support_requests(mode, pending, can):
+            for ecu, maps in parse_support_reply(send(request), mode, protocol).items():
+                bitmaps.setdefault(ecu, {}).update(maps)
+        pending = next_bases(bitmaps, asked)
+    return {ecu: pids for ecu, maps in sorted(bitmaps.items()) if (pids := chained_pids(maps, mode))}
+
+
+def merged(support: Support, mode: str = "01") -> List[str]:
+    """Union of every ECU's supported PIDs for one mode."""
+    return sorted({pid for pids in support.get(mode, {}).values() for pid in pids})
+
+
+def _to_profile(support: Support) -> Dict:
+    return {mode: {f"{ecu:X}": pids for ecu, pids in by_ecu.items()} for mode, by_ecu in support.items()}
+
+
+def _from_profile(stored: Dict) -> Support:
+    return {mode: {int(ecu, 16): list(pids) for ecu, pids in by_ecu.items()} for mode, by_ecu in stored.items()}
+
+
+def supported_pids(session, modes: Iterable[str] = DISCOVERY_MODES, refresh: bool = False) -> Support:
+    """
+    Supported PIDs per mode and ECU for the connected vehicle. Served from
+    the vehicle profile when known; otherwise discovered (broadcast, all
+    ECUs) and stored. Pass `refresh` to rediscover, e.g. after an ECU swap.
+    """
+    modes = list(modes)
+    vehicle: Optional[str] = (session.settings or {}).get("vehicle")
+    stored = get_profile("vehicles", vehicle).get("supported", {}) if vehicle else {}
+    if stored and not refresh and all(mode in stored for mode in modes):
+        return {mode: _from_profile(stored)[mode] for mode in modes}
+
+    session.clear_target()
+    support = {mode: discover_mode(session.send_command, mode, session.protocol, session.is_can)
+               for mode in modes}
+    if vehicle and any(support.values()):
+        update_profile("vehicles", vehicle, supported=dict(stored, **_to_profile(support)))
+    for mode in modes:
+        print(f"🔍 Discovered {len(merged(support, mode))} Mode {mode} PIDs on {len(support.get(mode, {}))} ECU(s)")
+    return support
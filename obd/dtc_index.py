@@ -0,0 +1,304 @@
+# obd/dtc_index.py
+"""
+One DTC index over the generic table (assets/dtc_db.json) and every
+brand table (assets/manufacturer_specific_dtc/<brand>.json).
+
+Tables are parsed on first use and then kept, so the DTC reader, the
+Mode 22 reader and the brand simulator share a single copy. Lookups are
+dict hits; with a brand, its codes override the generic description.
+Prefix and range queries ("all P03xx") bisect a sorted code list, which
+works because DTC codes are fixed-width and their hex digits sort in
+ASCII order.
+
+    index = dtc_index()
+    index.lookup("P1101", brand="audi")
+    index.prefix("P03")
+    index.range("P0300", "P0308")
+    index.search("cam pos sensor", brand="audi")
+
+search() runs on an inverted index over every description (and code)
+in all tables, built once on the first search. Every query word has to
+match, either exactly or as a prefix of a word in the description, so
+results narrow while the user types. Ranking is IDF-weighted: rare words
+count more than "circuit" or "sensor", exact words more than prefixes.
+"""
+
+import bisect
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ASSETS_DIR = Path(__file__).resolve().parents[1] / "assets"
+GENERIC_FILE = ASSETS_DIR / "dtc_db.json"
+BRANDS_DIR = ASSETS_DIR / "manufacturer_specific_dtc"
+
+GENERIC = ""        # table key of the generic table
+
+SEARCH_LIMIT = 50
+# A prefix hit counts this much of an exact word hit
+PREFIX_WEIGHT = 0.6
+CODE_WEIGHT = 2.0
+# Prefixes up to this length match much of the vocabulary, so their
+# postings are merged once when the index is built (first keystroke)
+SHORT_PREFIX = 2
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def brand_key(brand: Optional[str]) -> str:
+    """'Volkswagen', 'mercedes-benz ' → file stem ('volkswagen', 'mercedesbenz')."""
+    return (brand or "").strip().lower().replace(" ", "").replace("-", "")
+
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    try:
+        st = path.stat()
+    except OSError:
+        return 0, 0
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_table(path: Path) -> Dict[str, str]:
+    """Flat {"P0001": "..."} or wrapped {"dtcs": {...}} / {"codes": {...}}."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as exc:
+        print(f"Warning: bad DTC table {path}: {exc}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    for wrapper in ("dtcs", "codes"):
+        if isinstance(data.get(wrapper), dict):
+            data = data[wrapper]
+            break
+    return {str(code).strip().upper(): str(desc) for code, desc in data.items()}
+
+
+@dataclass
+class Match:
+    code: str
+    desc: str
+    brand: str          # table key, "" for the generic table
+    score: float
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class _SearchIndex:
+    """Inverted index over (code, brand, desc) entries."""
+
+    def __init__(self, entries: List[Tuple[str, str, str]]):
+        self.entries = entries
+        postings: Dict[str, set] = {}
+        for i, (code, _, desc) in enumerate(entries):
+            for word in set(tokenize(desc)) | {code.lower()}:
+                postings.setdefault(word, set()).add(i)
+        n = len(entries) or 1
+        self.postings = postings
+        self.idf = {word: math.log(1 + n / len(ids)) for word, ids in postings.items()}
+        self.vocabulary = sorted(postings)
+        # first keystrokes: merged postings and their ranking, built once
+        self._short: Dict[str, Dict[int, float]] = {}
+        self._short_ranked: Dict[str, List[Tuple[int, float]]] = {}
+        for prefix in {word[:n] for word in self.vocabulary for n in range(1, SHORT_PREFIX + 1)}:
+            scores = self._short[prefix] = self._scan(prefix)
+            self._short_ranked[prefix] = sorted(scores.items(), key=self._rank)
+
+    def _rank(self, item: Tuple[int, float]):
+        """Best score first, then the shorter description, then the code."""
+        i, score = item
+        return -score, len(self.entries[i][2]), self.entries[i][0]
+
+    def _matches(self, term: str) -> Dict[int, float]:
+        """Entry → best score for one query term (exact or prefix). Do not mutate."""
+        if len(term) <= SHORT_PREFIX:
+            return self._short.get(term, {})
+        return self._scan(term)
+
+    def _scan(self, term: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        lo = bisect.bisect_left(self.vocabulary, term)
+        hi = bisect.bisect_left(self.vocabulary, term + "{")     # "{" sorts after "z"
+        for word in self.vocabulary[lo:hi]:
+            weight = self.idf[word] * (1.0 if word == term else PREFIX_WEIGHT)
+            if word[0] in "pcbu" and word[1:2].isdigit() and len(word) == 5:
+                weight *= CODE_WEIGHT
+            for i in self.postings[word]:
+                if weight > scores.get(i, 0.0):
+                    scores[i] = weight
+        return scores
+
+    def _ranked(self, terms: List[str], keep) -> List[Tuple[int, float]]:
+        """(entry, score) for entries matching every term, best first (at least the top ones)."""
+        if len(terms) == 1 and len(terms[0]) <= SHORT_PREFIX:
+            return self._short_ranked.get(terms[0], [])
+        # rarest-looking (longest) term first keeps the candidate set small
+        terms = sorted(terms, key=len, reverse=True)
+        scores = self._matches(terms[0])
+        for term in terms[1:]:
+            if not scores:
+                break
+            hits = self._matches(term)
+            scores = {i: score + hits[i] for i, score in scores.items() if i in hits}
+        return sorted((item for item in scores.items() if keep(item[0])), key=self._rank)
+
+    def search(self, query: str, tables: Optional[set], shadowed, limit: int) -> List[Match]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        def keep(i):
+            if tables is None:
+                return True
+            # generic entries the brand overrides are left out
+            code, brand, _ = self.entries[i]
+            return brand in tables and not (brand == GENERIC and code in shadowed)
+
+        matches, seen = [], set()
+        for i, score in self._ranked(terms, keep):
+            code, brand, desc = self.entries[i]
+            if (code, desc) in seen or not keep(i):
+                continue
+            seen.add((code, desc))
+            matches.append(Match(code, desc, brand, round(score, 3)))
+            if len(matches) >= limit:
+                break
+        return matches
+
+
+class DTCIndex:
+    def __init__(self, generic_file: Path = GENERIC_FILE, brands_dir: Path = BRANDS_DIR):
+        self.generic_file = Path(generic_file)
+        self.brands_dir = Path(brands_dir)
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._merged: Dict[str, Dict[str, str]] = {}
+        self._sorted: Dict[str, List[str]] = {}
+        self._search: Optional[_SearchIndex] = None
+        self._lock = threading.Lock()
+
+    # ---------------- Tables ----------------
+    def _path(self, key: str) -> Path:
+        return self.generic_file if key == GENERIC else self.brands_dir / f"{key}.json"
+
+    def brands(self) -> List[str]:
+        """Brand keys that have a table on disk."""
+        if not self.brands_dir.exists():
+            return []
+        return sorted(p.stem for p in self.brands_dir.glob("*.json"))
+
+    def _table(self, key: str) -> Dict[str, str]:
+        table = self._tables.get(key)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(key)
+                if table is None:
+                    path = self._path(key)
+                    self._stamps[key] = _stamp(path)
+                    table = self._tables[key] = _read_table(path)
+        return table
+
+    def generic(self) -> Dict[str, str]:
+        """The generic (SAE) table. Do not mutate."""
+        return self._table(GENERIC)
+
+    def table(self, brand: Optional[str]) -> Dict[str, str]:
+        """A brand's own codes, {} without a table or brand. Do not mutate."""
+        key = brand_key(brand)
+        return self._table(key) if key else {}
+
+    def view(self, brand: Optional[str] = None) -> Dict[str, str]:
+        """Generic codes with the brand's codes layered on top."""
+        key = brand_key(brand)
+        if key == GENERIC:
+            return self.generic()
+        merged = self._merged.get(key)
+        if merged is None:
+            merged = dict(self.generic())
+            merged.update(self.table(key))
+            self._merged[key] = merged
+        return merged
+
+    def refresh(self) -> List[str]:
+        """Drop tables whose JSON changed on disk; returns their keys."""
+        with self._lock:
+            stale = [key for key, stamp in self._stamps.items() if _stamp(self._path(key)) != stamp]
+            for key in stale:
+                self._tables.pop(key, None)
+                self._stamps.pop(key, None)
+            if stale:
+                self._merged.clear()
+                self._sorted.clear()
+                self._search = None
+            return stale
+
+    # ---------------- Queries ----------------
+    def lookup(self, code: str, brand: Optional[str] = None) -> Optional[str]:
+        code = code.strip().upper()
+        desc = self.table(brand).get(code)
+        if desc is not None:
+            return desc
+        return self.generic().get(code)
+
+    def _codes(self, brand: Optional[str]) -> List[str]:
+        key = brand_key(brand)
+        codes = self._sorted.get(key)
+        if codes is None:
+            codes = self._sorted[key] = sorted(self.view(key))
+        return codes
+
+    def range(self, first: str, last: str, brand: Optional[str] = None) -> List[Tuple[str, str]]:
+        """All (code, desc) with first <= code <= last, in code order."""
+        codes = self._codes(brand)
+        view = self.view(brand)
+        lo = bisect.bisect_left(codes, first.strip().upper())
+        hi = bisect.bisect_right(codes, last.strip().upper())
+        return [(code, view[code]) for code in codes[lo:hi]]
+
+    def prefix(self, prefix: str, brand: Optional[str] = None) -> List[Tuple[str, str]]:
+        """All codes starting with `prefix`, e.g. 'P03' or 'P03xx'."""
+        prefix = prefix.strip().upper().rstrip("X")
+        if not prefix:
+            view = self.view(brand)
+            return [(code, view[code]) for code in self._codes(brand)]
+        # "~" sorts after every code character, so this is the end of the prefix block
+        return self.range(prefix, prefix + "~", brand)
+
+    def search(self, query: str, brand: Optional[str] = None,
+               limit: int = SEARCH_LIMIT) -> List[Match]:
+        """
+        Best matches for free text ('camshaft', 'evap leak', 'P03'),
+        highest score first. With `brand`, only generic codes and that
+        brand's codes are searched.
+        """
+        if self._search is None:
+            entries = []
+            for key in [GENERIC] + self.brands():
+                entries.extend((code, key, desc) for code, desc in self._table(key).items())
+            self._search = _SearchIndex(entries)
+        key = brand_key(brand)
+        if not key:
+            return self._search.search(query, None, (), limit)
+        return self._search.search(query, {GENERIC, key}, self.table(key), limit)
+
+
+_index: Optional[DTCIndex] = None
+_index_lock = threading.Lock()
+
+
+def dtc_index() -> DTCIndex:
+    """The process-wide index, created on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DTCIndex()
+        return _index
@@ -1,88 +1,193 @@
-import serial
-import time
-import re
-import json
-import pathlib
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from adapter.arbiter import INTERACTIVE, arbiter_for
+from adapter.session import AdapterSession, get_session, DEFAULT_PORT
+from obd.discovery import supported_pids
+from obd.dtc_index import dtc_index
+from obd.framer import frames_for_service, group_by_ecu, parse_frames
 
 # -----------------------------------------------------------
-#  Load the generic DTC lookup table once at import‑time
+#  Response parsing (shared by the sync handler and async driver)
 # -----------------------------------------------------------
-ASSET_FILE = pathlib.Path(__file__).resolve().parent.parent / "assets" / "dtc_db.json"
-try:
-    with ASSET_FILE.open(encoding="utf-8") as f:
-        DTC_DB = json.load(f)
-except FileNotFoundError:
-    print(f"Warning: DTC database file not found: {ASSET_FILE}")
-    DTC_DB = {}
+def dtc_from_bytes(hi: int, lo: int) -> str:
+    """Two raw DTC bytes → 'P0133' style code ('' for the 0000 filler)."""
+    if hi == 0 and lo == 0:
+        return ""
+    prefix = "PCBU"[hi >> 6]
+    return f"{prefix}{(hi >> 4) & 0x3}{hi & 0xF:X}{lo:02X}"
+
+def decode_dtc_frames(frames, service: int = 0x43) -> List[str]:
+    """
+    DTC codes from framed Mode 03/07/0A replies. On CAN the byte after the
+    service is the DTC count; legacy protocols send bare pairs per message.
+    """
+    codes = []
+    for frame in frames_for_service(frames, service):
+        data = frame.data(2) if frame.can else frame.data()
+        for i in range(0, len(data) - 1, 2):
+            code = dtc_from_bytes(data[i], data[i + 1])
+            if code:
+                codes.append(code)
+    return codes
+
+def _describe(codes: List[str]) -> List[Dict[str, str]]:
+    index = dtc_index()
+    return [{"code": code, "desc": index.lookup(code) or "Manufacturer‑specific or undocumented"}
+            for code in codes]
+
+def parse_dtc_response(response: str, protocol: str = "") -> List[Dict[str, str]]:
+    """Return list like [{'code': 'P0301', 'desc': 'Cylinder 1 Misfire Detected'}, …]"""
+    return _describe(decode_dtc_frames(parse_frames(response, protocol)))
+
+def parse_dtc_response_by_ecu(response: str, protocol: str = "") -> Dict[int, List[Dict[str, str]]]:
+    """Same as parse_dtc_response, keyed by responding ECU (e.g. 0x7E8, 0x7E9)."""
+    return {
+        ecu: _describe(decode_dtc_frames(frames))
+        for ecu, frames in group_by_ecu(parse_frames(response, protocol)).items()
+        if frames_for_service(frames, 0x43)
+    }
+
+# Snapshot requests: service → result key
+SNAPSHOT_SERVICES = (("03", "stored"), ("07", "pending"), ("0A", "permanent"))
+
+def parse_status_response(response: str, protocol: str = "") -> Dict[int, Dict]:
+    """Mode 01 PID 01 → {ecu: {'mil': bool, 'dtc_count': int}}."""
+    status = {}
+    for frame in frames_for_service(parse_frames(response, protocol), 0x41):
+        if len(frame.payload) >= 3 and frame.payload[1] == 0x01:
+            a = frame.payload[2]
+            status[frame.ecu] = {"mil": bool(a & 0x80), "dtc_count": a & 0x7F}
+    return status
+
+def build_snapshot(status: Dict[int, Dict], replies: Dict[str, str],
+                   protocol: str = "") -> Dict[int, Dict]:
+    """
+    Combine a 0101 status and the 03/07/0A replies into one entry per ECU:
+    {ecu: {'mil', 'dtc_count', 'stored', 'pending', 'permanent'}}.
+    """
+    snapshot: Dict[int, Dict] = {}
+
+    def entry(ecu):
+        return snapshot.setdefault(ecu, {"mil": None, "dtc_count": None,
+                                         "stored": [], "pending": [], "permanent": []})
+
+    for ecu, values in status.items():
+        entry(ecu).update(values)
+    for cmd, key in SNAPSHOT_SERVICES:
+        service = int(cmd, 16) + 0x40
+        for ecu, frames in group_by_ecu(parse_frames(replies.get(cmd, ""), protocol)).items():
+            if frames_for_service(frames, service):
+                entry(ecu)[key] = _describe(decode_dtc_frames(frames, service))
+    return snapshot
 
 # -----------------------------------------------------------
 #  Main handler class
 # -----------------------------------------------------------
 class DTCHandler:
-    def __init__(self, port: str = "/dev/rfcomm0", baudrate: int = 38400, timeout: int = 3):
+    def __init__(self, port: str = DEFAULT_PORT, baudrate: int = 38400, timeout: int = 3,
+                 session: Optional[AdapterSession] = None):
         self.port = port
-        self.baudrate = baudrate
-        self.timeout = timeout
-        self.ser = None
+        self.session = session or get_session(port, baudrate=baudrate, timeout=timeout)
+        self.connected = False
 
-    # ---------------- Serial helpers ----------------
+    # ---------------- Session helpers ----------------
     def connect(self) -> bool:
-        try:
-            self.ser = serial.Serial(self.port, baudrate=self.baudrate, timeout=self.timeout)
-            time.sleep(2)
-            self.ser.reset_input_buffer()
-            for cmd in ("ATE0", "ATL0", "ATS0", "ATH1", "ATSP3"):
-                self.send_command(cmd)
-            return True
-        except Exception as exc:
-            print(f"Connection failed: {exc}")
-            return False
+        """Attach to the shared adapter session (opens and inits it only once)."""
+        self.connected = self.session.open()
+        return self.connected
 
     def disconnect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
+        """Detach from the session; the port stays open for the next reader."""
+        self.connected = False
 
     def send_command(self, cmd: str) -> str:
-        if not self.ser:
+        if not self.connected:
+            return ""
+        return arbiter_for(self.session).send(cmd, INTERACTIVE)
+
+    def _broadcast(self, cmd: str) -> str:
+        """
+        Send `cmd` to all ECUs as one interactive job, ahead of any live
+        polling and without a poll request retargeting the adapter between
+        clearing the target and sending.
+        """
+        if not self.connected:
             return ""
-        self.ser.write((cmd + "\r").encode())
-        time.sleep(0.4)
-        return self.ser.read_until(b">").decode(errors="ignore")
+
+        def job(session):
+            session.clear_target()
+            return session.send_command(cmd)
+        return arbiter_for(self.session).run(job, INTERACTIVE, name=cmd)
 
     # ---------------- Public API ----------------
-    def read_dtc(self) -> List[Dict[str, str]]:
-        raw = self.send_command("03")
-        return self._parse_dtcs(raw)
+    def read_dtc(self, freeze_frames: bool = False) -> List[Dict]:
+        """
+        Stored DTCs. With `freeze_frames`, each code that set a Mode 02
+        freeze frame gets it under 'freeze_frame' (see obd.freeze_frame).
+        """
+        raw = self._broadcast("03")
+        dtcs = self._parse_dtcs(raw)
+        if freeze_frames and dtcs:
+            from obd.freeze_frame import attach_freeze_frames
+            frames = self.read_freeze_frames()
+            attach_freeze_frames(dtcs, [f for ecu_frames in frames.values() for f in ecu_frames])
+        return dtcs
+
+    def read_freeze_frames(self) -> Dict[int, List[Dict]]:
+        """Mode 02 freeze frames per ECU, as one interactive job."""
+        if not self.connected:
+            return {}
+        from obd.freeze_frame import read_freeze_frames
+        return arbiter_for(self.session).run(read_freeze_frames, INTERACTIVE, name="freeze frames")
+
+    def read_dtc_by_ecu(self) -> Dict[int, List[Dict[str, str]]]:
+        """Stored DTCs keyed by the ECU that reported them."""
+        return parse_dtc_response_by_ecu(self._broadcast("03"), self.session.protocol)
+
+    def read_snapshot(self, freeze_frames: bool = False) -> Dict[int, Dict]:
+        """
+        Stored (03), pending (07) and permanent (0A) DTCs plus MIL state
+        and DTC count (0101), per ECU, in one interactive job. Every OBD
+        ECU known from PID discovery (cached in the vehicle profile)
+        answers these, so their number goes out as the expected response
+        count and the adapter returns as soon as the last one has
+        answered instead of waiting out its timer. With `freeze_frames`,
+        stored codes also get their Mode 02 freeze frame attached.
+        """
+        if not self.connected:
+            return {}
+
+        def job(session):
+            ecus = len(supported_pids(session, modes=("01",)).get("01", {}))
+            session.clear_target()
+            suffix = f"{ecus:X}" if 0 < ecus <= 0xF else ""
+            status = parse_status_response(session.send_command("0101" + suffix), session.protocol)
+            replies = {cmd: session.send_command(cmd + suffix) for cmd, _ in SNAPSHOT_SERVICES}
+            snapshot = build_snapshot(status, replies, session.protocol)
+            if freeze_frames and any(entry["stored"] for entry in snapshot.values()):
+                from obd.freeze_frame import attach_freeze_frames, read_freeze_frames
+                for ecu, frames in read_freeze_frames(session).items():
+                    if ecu in snapshot:
+                        attach_freeze_frames(snapshot[ecu]["stored"], frames)
+            return snapshot
+        return arbiter_for(self.session).run(job, INTERACTIVE, name="DTC snapshot")
+
+    def read_readiness(self, tests: bool = True) -> Dict[int, Dict]:
+        """Readiness monitors and Mode 06 results per ECU (obd.readiness), as one job."""
+        if not self.connected:
+            return {}
+        from obd.readiness import read_readiness
+        return arbiter_for(self.session).run(lambda session: read_readiness(session, tests),
+                                             INTERACTIVE, name="readiness")
 
     def clear_dtc(self) -> bool:
-        raw = self.send_command("04")
-        return "Cleared" in raw or "OK" in raw
+        raw = self._broadcast("04")
+        # ECUs confirm with a bare 44 (positive response to service 04)
+        return bool(frames_for_service(parse_frames(raw, self.session.protocol), 0x44)) or "OK" in raw
 
     # ---------------- Internal helpers ----------------
     def _parse_dtcs(self, response: str) -> List[Dict[str, str]]:
-        """Return list like [{'code': 'P0301', 'desc': 'Cylinder 1 Misfire Detected'}, …]"""
-        dtc_list = []
-        hex_stream = "".join(
-            ln.strip().replace(" ", "") for ln in response.replace("\r", "").split("\n") if ln.startswith("43")
-        )
-        if not hex_stream:
-            return []
-
-        payload = hex_stream[2:]  # drop 43
-        for i in range(0, len(payload), 4):
-            chunk = payload[i : i + 4]
-            if len(chunk) < 4 or chunk == "0000":
-                continue
-            code = self._decode_dtc(chunk)
-            if code:
-                dtc_list.append(
-                    {
-                        "code": code,
-                        "desc": DTC_DB.get(code, "Manufacturer‑specific or undocumented")
-                    }
-                )
-        return dtc_list
+        return parse_dtc_response(response, self.session.protocol)
 
     @staticmethod
     def _decode_dtc(nibbles: str) -> str:
@@ -106,3 +211,4 @@ if __name__ == "__main__":
         else:
             print("\nNo DTCs found.")
         handler.disconnect()
+        handler.session.close()
@@ -0,0 +1,188 @@
+# obd/framer.py
+"""
+ELM327 response framer.
+
+Turns the raw bytes of one adapter reply into typed frames:
+
+    7E8 10 14 49 02 01 31 44 34      (CAN 11-bit, headers on, first frame)
+    7E8 21 47 50 30 30 52 35 35      (consecutive frame)
+    18DAF110 03 41 0D 28             (CAN 29-bit)
+    48 6B 10 43 01 33 00 00 00 00 CS (ISO 9141 / KWP / J1850, check byte last)
+    014 / 0: 49 02 01 ... / 1: ...   (CAN, headers off, multi-frame)
+    41 0C 1A F8                      (headers off)
+
+CAN first/consecutive frames are reassembled per responding ECU (ISO-TP),
+so callers always get whole messages. Status lines such as SEARCHING...,
+NO DATA or BUS INIT are skipped.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Union
+
+CAN_11BIT_PROTOCOLS = {"6", "8"}
+CAN_29BIT_PROTOCOLS = {"7", "9"}
+LEGACY_PROTOCOLS = {"1", "2", "3", "4", "5"}
+
+# Target byte of a legacy response header: 6B (J1850/ISO 9141), F1 (KWP tester)
+_LEGACY_TARGETS = ("6B", "F1")
+_HEX = re.compile(r'^[0-9A-F]+$')
+_SEGMENT = re.compile(r'^([0-9A-F]):([0-9A-F]*)$')
+
+
+@dataclass
+class Frame:
+    ecu: int              # 0x7E8, 0x18DAF110, legacy source address, or 0 if headers off
+    header: bytes
+    payload: memoryview   # service byte first, e.g. 41 0C 1A F8
+    can: bool = False
+
+    @property
+    def service(self) -> int:
+        return self.payload[0] if len(self.payload) else -1
+
+    def data(self, skip: int = 1) -> memoryview:
+        """Payload after the service byte (and any further `skip` bytes)."""
+        return self.payload[skip:]
+
+
+def _header_kind(compact: str, protocol: str) -> str:
+    is_can = protocol in CAN_11BIT_PROTOCOLS or protocol in CAN_29BIT_PROTOCOLS
+    is_legacy = protocol in LEGACY_PROTOCOLS
+    if not is_legacy:
+        if len(compact) % 2 and protocol not in CAN_29BIT_PROTOCOLS:
+            return "can11"
+        if len(compact) >= 10 and compact.startswith("18D") and protocol not in CAN_11BIT_PROTOCOLS:
+            return "can29"
+    if not is_can and len(compact) >= 10 and compact[2:4] in _LEGACY_TARGETS:
+        return "legacy"
+    return "none"
+
+
+def parse_frames(raw: Union[bytes, bytearray, str], protocol: str = "") -> List[Frame]:
+    """
+    Split one adapter reply into frames. `protocol` is the ATDPN number
+    when known; without it the header layout is inferred per line.
+    """
+    return _parse(raw, protocol)[0]
+
+
+def has_incomplete_message(raw: Union[bytes, bytearray, str], protocol: str = "") -> bool:
+    """True if a multi-frame CAN message in the reply is missing frames."""
+    return bool(_parse(raw, protocol)[1])
+
+
+def _parse(raw: Union[bytes, bytearray, str], protocol: str) -> Tuple[List[Frame], Dict[int, list]]:
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("ascii", errors="ignore")
+
+    frames: List[Frame] = []
+    pending: Dict[int, list] = {}          # ecu -> [expected_len, buffer, header, next_seq]
+    segments: Dict[int, bytes] = {}        # headers-off multi-frame: index -> data
+    segment_len = None
+
+    for line in raw.replace("\n", "\r").split("\r"):
+        compact = line.replace(" ", "").replace(">", "").upper()
+        if not compact:
+            continue
+
+        seg = _SEGMENT.match(compact)
+        if seg:
+            segments[int(seg.group(1), 16)] = bytes.fromhex(seg.group(2)[:len(seg.group(2)) // 2 * 2])
+            continue
+        if not _HEX.match(compact):
+            continue
+        if len(compact) <= 3:
+            segment_len = int(compact, 16)    # byte count line before 0:/1:/...
+            continue
+
+        _parse_line(compact, protocol, frames, pending)
+
+    if segments:
+        joined = b"".join(segments[i] for i in sorted(segments))
+        if segment_len is not None:
+            joined = joined[:segment_len]
+        frames.append(Frame(0, b"", memoryview(joined), can=True))
+    return frames, pending
+
+
+def _parse_line(compact: str, protocol: str, frames: List[Frame], pending: Dict[int, list]):
+    kind = _header_kind(compact, protocol)
+    try:
+        if kind == "can11":
+            header, body = bytes.fromhex("0" + compact[:3]), bytes.fromhex(compact[3:])
+        elif kind == "can29":
+            header, body = bytes.fromhex(compact[:8]), bytes.fromhex(compact[8:])
+        else:
+            header, body = b"", bytes.fromhex(compact)
+    except ValueError:
+        return
+
+    if kind in ("can11", "can29"):
+        _feed_isotp(frames, pending, int.from_bytes(header, "big"), header, body)
+    elif kind == "legacy":
+        # 3 header bytes, data, 1 check byte
+        frames.append(Frame(body[2], body[:3], memoryview(body)[3:-1]))
+    else:
+        frames.append(Frame(0, b"", memoryview(body), can=protocol not in LEGACY_PROTOCOLS))
+
+
+class FrameAssembler:
+    """
+    Stateful framer for streamed output (ATMA monitoring, continuous
+    polling): feed one line at a time, get back the frames it completes.
+    ISO-TP reassembly state is kept per ECU between lines.
+    """
+
+    def __init__(self, protocol: str = ""):
+        self.protocol = protocol
+        self._pending: Dict[int, list] = {}
+
+    def feed(self, line: Union[bytes, bytearray, memoryview, str]) -> List[Frame]:
+        if not isinstance(line, str):
+            line = bytes(line).decode("ascii", errors="ignore")
+        compact = line.replace(" ", "").replace(">", "").upper()
+        if len(compact) <= 3 or not _HEX.match(compact):
+            return []
+        frames: List[Frame] = []
+        _parse_line(compact, self.protocol, frames, self._pending)
+        return frames
+
+    def reset(self):
+        self._pending.clear()
+
+
+def _feed_isotp(frames: List[Frame], pending: Dict[int, list], ecu: int, header: bytes, body: bytes):
+    if not body:
+        return
+    pci = body[0] >> 4
+    if pci == 0:                                   # single frame
+        length = body[0] & 0x0F
+        frames.append(Frame(ecu, header, memoryview(body)[1:1 + length], can=True))
+    elif pci == 1 and len(body) >= 2:              # first frame
+        length = ((body[0] & 0x0F) << 8) | body[1]
+        pending[ecu] = [length, bytearray(body[2:]), header, 1]
+    elif pci == 2:                                 # consecutive frame
+        entry = pending.get(ecu)
+        if entry is None:
+            return
+        if body[0] & 0x0F != entry[3] & 0x0F:
+            del pending[ecu]                        # lost a frame: drop the message
+            return
+        entry[1] += body[1:]
+        entry[3] += 1
+        if len(entry[1]) >= entry[0]:
+            frames.append(Frame(ecu, entry[2], memoryview(entry[1])[:entry[0]], can=True))
+            del pending[ecu]
+
+
+def frames_for_service(frames: List[Frame], service: int) -> List[Frame]:
+    return [f for f in frames if f.service == service]
+
+
+def group_by_ecu(frames: List[Frame]) -> Dict[int, List[Frame]]:
+    """Frames keyed by responding ECU, ECUs in ascending address order."""
+    grouped: Dict[int, List[Frame]] = {}
+    for frame in sorted(frames, key=lambda f: f.ecu):
+        grouped.setdefault(frame.ecu, []).append(frame)
+    return grouped
@@ -0,0 +1,131 @@
+# obd/freeze_frame.py
+"""
+Mode 02 freeze frames: the PID values an ECU stored when a DTC set.
+
+Frames are found by asking PID 02 (the DTC that caused the frame) for
+frame numbers 0, 1, 2, ...; an ECU without that frame stays silent or
+answers 0000. The PIDs supported in freeze frames come from the Mode 02
+support chain, discovered once and cached in the vehicle profile like
+Mode 01. Each frame is then read in multi-PID requests (three PID/frame
+pairs per CAN request) addressed to the ECU that stored it, and decoded
+with the same PID table as live data.
+
+    frames = read_freeze_frames(session)
+    # {0x7E8: [{'frame': 0, 'dtc': 'P0300', 'values': {'020C': 812.5, ...}}]}
+"""
+
+from typing import Dict, List
+
+from obd.discovery import supported_pids
+from obd.dtc_lookup import dtc_from_bytes
+from obd.framer import frames_for_service, parse_frames
+from obd.pid_table import get_definition
+
+# (PID, frame) pairs per request: 7 data bytes in one CAN single frame
+PAIRS_PER_REQUEST = 3
+# Highest frame number probed + 1
+MAX_FRAMES = 0x10
+
+FreezeFrames = Dict[int, List[Dict]]
+
+
+def freeze_frame_requests(pids: List[int], frame: int, can: bool) -> List[str]:
+    """'02' requests for `pids` of one frame, batched on CAN."""
+    per_request = PAIRS_PER_REQUEST if can else 1
+    return ["02" + "".join(f"{pid:02X}{frame:02X}" for pid in pids[i:i + per_request])
+            for i in range(0, len(pids), per_request)]
+
+
+def parse_freeze_frame_reply(raw: str, protocol: str = "") -> Dict[int, Dict[int, Dict[int, object]]]:
+    """
+    {ecu: {frame: {pid: value}}} from a (multi-PID) Mode 02 reply. PID 02
+    decodes to its DTC code ('' for 0000), everything else through the
+    Mode 01 PID table.
+    """
+    result: Dict[int, Dict[int, Dict[int, object]]] = {}
+    for frame in frames_for_service(parse_frames(raw, protocol), 0x42):
+        payload = bytes(frame.payload)
+        pos = 1
+        while pos + 2 <= len(payload):
+            pid, number = payload[pos], payload[pos + 1]
+            if pid == 0x02:
+                length = 2
+            elif pid % 0x20 == 0:
+                length = 4
+            else:
+                definition = get_definition(pid)
+                if definition is None:
+                    break
+                length = definition.length
+            data = payload[pos + 2:pos + 2 + length]
+            if len(data) < length:
+                break
+            if pid == 0x02:
+                value = dtc_from_bytes(data[0], data[1])
+            elif pid % 0x20 == 0:
+                value = int.from_bytes(data, "big")
+            else:
+                value = get_definition(pid).decode(data)
+            result.setdefault(frame.ecu, {}).setdefault(number, {})[pid] = value
+            pos += 2 + length
+    return result
+
+
+def find_frames(session, can: bool) -> Dict[int, Dict[int, str]]:
+    """{ecu: {frame: dtc}} for every frame that holds a DTC (broadcast)."""
+    found: Dict[int, Dict[int, str]] = {}
+    frame = 0
+    while frame < MAX_FRAMES:
+        batch = list(range(frame, min(frame + (PAIRS_PER_REQUEST if can else 1), MAX_FRAMES)))
+        request = "02" + "".join(f"02{n:02X}" for n in batch)
+        seen = set()
+        for ecu, frames in parse_freeze_frame_reply(session.send_command(request), session.protocol).items():
+            for number, values in frames.items():
+                if values.get(0x02):
+                    found.setdefault(ecu, {})[number] = values[0x02]
+                    seen.add(number)
+        # frames are numbered without gaps, so a missing last one ends the search
+        if batch[-1] not in seen:
+            break
+        frame = batch[-1] + 1
+    return found
+
+
+def read_freeze_frames(session) -> FreezeFrames:
+    """
+    Every freeze frame on the vehicle, per ECU:
+    {ecu: [{'frame': n, 'dtc': 'P0300', 'values': {'020C': value, ...}}]}.
+    Run it as one arbiter job.
+    """
+    session.clear_target()
+    frames = find_frames(session, session.is_can)
+    if not frames:
+        return {}
+    support = supported_pids(session, modes=("02",)).get("02", {})
+
+    result: FreezeFrames = {}
+    try:
+        for ecu, dtcs in sorted(frames.items()):
+            pids = [int(cmd[2:], 16) for cmd in support.get(ecu, [])]
+            pids = [pid for pid in pids if pid != 0x02 and pid % 0x20 and get_definition(pid)]
+            targeted = session.target_ecu(ecu)
+            suffix = "1" if targeted else ""
+            for number, dtc in sorted(dtcs.items()):
+                values: Dict[str, object] = {}
+                for request in freeze_frame_requests(pids, number, session.is_can):
+                    reply = parse_freeze_frame_reply(session.send_command(request + suffix),
+                                                     session.protocol)
+                    for pid, value in reply.get(ecu, {}).get(number, {}).items():
+                        values[f"02{pid:02X}"] = value
+                result.setdefault(ecu, []).append({"frame": number, "dtc": dtc, "values": values})
+    finally:
+        session.clear_target()
+    return result
+
+
+def attach_freeze_frames(dtcs: List[Dict], frames: List[Dict]):
+    """Add 'freeze_frame' to each DTC dict whose code set one of `frames`."""
+    by_code = {frame["dtc"]: frame for frame in frames}
+    for dtc in dtcs:
+        if dtc["code"] in by_code:
+            dtc["freeze_frame"] = by_code[dtc["code"]]
@@ -1,136 +1,183 @@
 # Live Data Fetcher for GUI Integration
-import serial
-import time
-import re
+from typing import Optional
+
+from adapter.arbiter import NORMAL, arbiter_for
+from adapter.session import AdapterSession, get_session, DEFAULT_PORT
+from obd.discovery import merged, supported_pids as discover_supported
+from obd.framer import frames_for_service, group_by_ecu, parse_frames
+from obd.pid_table import (
+    MAX_PIDS_PER_REQUEST,
+    decode_mode01_payload,
+    decode_pid,
+    get_definition,
+    supported_from_bitmap,
+)
 from utils.log_manager import save_session, logging
 
 #PID Parsing Helpers
 
-def parse_supported_pids(hex_string):
-    match = re.search(r'4100([0-9A-Fa-f]{8})', hex_string)
-    if not match:
+def parse_supported_pids(hex_string, protocol=""):
+    """Union of every responding ECU's 0100 bitmap."""
+    supported = set()
+    for pids in parse_supported_pids_by_ecu(hex_string, protocol).values():
+        supported.update(pids)
+    if not supported:
         print("⚠️ No valid '4100' response found.")
-        return []
-    bitfield = match.group(1)
-    bin_string = bin(int(bitfield, 16))[2:].zfill(32)
-    supported_pids = []
-    for i, bit in enumerate(bin_string):
-        if bit == '1':
-            pid = f"01{(i + 1):02X}"
-            supported_pids.append(pid)
-    return supported_pids
-
-def parse_rpm_response(text):
-    match = re.search(r'41\s?0C\s?([0-9A-Fa-f]{2})\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        A = int(match.group(1), 16)
-        B = int(match.group(2), 16)
-        return ((A * 256) + B) // 4
+    return sorted(supported)
+
+def parse_pid_response(pid, text, protocol=""):
+    """
+    Decode one Mode 01 PID from a raw reply using the compiled PID table.
+    Only the exact '41 <pid>' answer is accepted, so e.g. an intake
+    temperature reply can no longer be decoded as coolant temperature.
+    """
+    for frame in frames_for_service(parse_frames(text, protocol), 0x41):
+        if len(frame.payload) > 1 and frame.payload[1] == pid:
+            value = decode_pid(pid, frame.data(2))
+            if value is not None:
+                return value
     return None
 
-def parse_speed_response(text):
-    match = re.search(r'41\s?0D\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        return int(match.group(1), 16)
-    return None
-
-def parse_temp_response(text):
-    match = re.search(r'41\s?[0-5][0-9A-Fa-f]\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        return int(match.group(1), 16) - 40
-    return None
-
-def parse_throttle_response(text):
-    match = re.search(r'41\s?11\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        return (int(match.group(1), 16) * 100) / 255
-    return None
-
-def parse_maf_response(text):
-    match = re.search(r'41\s?10\s?([0-9A-Fa-f]{2})\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        A = int(match.group(1), 16)
-        B = int(match.group(2), 16)
-        return ((A * 256) + B) / 100.0
-    return None
-
-def parse_fuel_pressure_response(text):
-    match = re.search(r'41\s?0A\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        return int(match.group(1), 16) * 3
-    return None
-
-def parse_o2_sensor_response(text):
-    match = re.search(r'41\s?14\s?([0-9A-Fa-f]{2})', text)
-    if match:
-        return int(match.group(1), 16) / 200.0
-    return None
+def _table_parser(pid):
+    return lambda text, protocol="": parse_pid_response(pid, text, protocol)
+
+# --- Multi-PID batching (CAN only, at most MAX_PIDS_PER_REQUEST per request) ---
+
+def build_pid_batches(pid_cmds, size=MAX_PIDS_PER_REQUEST):
+    """['010C', '010D', ...] → ['010C0D...', ...] with up to `size` PIDs each."""
+    pids = [cmd[2:] for cmd in pid_cmds]
+    return ["01" + "".join(pids[i:i + size]) for i in range(0, len(pids), size)]
+
+def split_multi_pid_response(text, protocol=""):
+    """
+    Split a multi-PID Mode 01 reply into {'0C': '1AF8', '0D': '00', ...}
+    using the PID table's data lengths to find where each value ends.
+    """
+    values = {}
+    for frame in frames_for_service(parse_frames(text, protocol), 0x41):
+        payload = frame.payload
+        pos = 1
+        while pos < len(payload):
+            definition = get_definition(payload[pos])
+            if definition is None or pos + 1 + definition.length > len(payload):
+                break
+            values[f"{payload[pos]:02X}"] = payload[pos + 1:pos + 1 + definition.length].hex().upper()
+            pos += 1 + definition.length
+    return values
+
+# --- Dashboard PIDs ---
+
+PID_MAP = {
+    "RPM": ("010C", _table_parser(0x0C)),
+    "Vehicle Speed": ("010D", _table_parser(0x0D)),
+    "Coolant Temp": ("0105", _table_parser(0x05)),
+    "Throttle Position": ("0111", _table_parser(0x11)),
+    "Intake Temp": ("010F", _table_parser(0x0F)),
+    "MAF Rate": ("0110", _table_parser(0x10)),
+    "Fuel Pressure": ("010A", _table_parser(0x0A)),
+    "O2 Sensor (Bank 1)": ("0114", _table_parser(0x14))
+}
+
+def decode_pid_reply(pid_cmd, raw_response, protocol=""):
+    """Decode the reply to a single-PID request ('010C'), or None."""
+    return parse_pid_response(int(pid_cmd[2:], 16), raw_response, protocol)
+
+def decode_reply_by_ecu(raw_response, protocol=""):
+    """Decode a single- or multi-PID reply into {ecu: {pid_cmd: value}}."""
+    values = {}
+    for ecu, frames in group_by_ecu(frames_for_service(parse_frames(raw_response, protocol), 0x41)).items():
+        for frame in frames:
+            for pid, value in decode_mode01_payload(frame.payload).items():
+                values.setdefault(ecu, {})[f"01{pid:02X}"] = value
+    return values
+
+def decode_batch_reply(raw_response, protocol=""):
+    """Decode a multi-PID reply into {pid_cmd: value}, lowest ECU address first."""
+    return merge_ecu_values(decode_reply_by_ecu(raw_response, protocol))
+
+def merge_ecu_values(by_ecu):
+    """{ecu: {pid: value}} → {pid: value}, taking each PID from the lowest ECU address."""
+    merged = {}
+    for ecu in sorted(by_ecu):
+        for pid_cmd, value in by_ecu[ecu].items():
+            merged.setdefault(pid_cmd, value)
+    return merged
+
+def parse_supported_pids_by_ecu(hex_string, protocol=""):
+    """{ecu: ['0101', ...]} from a 0100 reply answered by one or more ECUs."""
+    supported = {}
+    for frame in frames_for_service(parse_frames(hex_string, protocol), 0x41):
+        if len(frame.payload) >= 6 and frame.payload[1] == 0x00:
+            supported.setdefault(frame.ecu, set()).update(supported_from_bitmap(frame.data(2)))
+    return {ecu: sorted(pids) for ecu, pids in supported.items()}
+
+def read_pids_by_ecu(session, pid_cmds, batch=True):
+    """
+    Request the given Mode 01 PIDs ('010C', ...) and return
+    {ecu: {pid_cmd: value}}. On CAN with `batch` the PIDs go out six per
+    request, otherwise one each. When the session is targeted at one ECU
+    the expected response count ('1') is appended, so the adapter returns
+    as soon as that ECU has answered.
+    """
+    requests = build_pid_batches(pid_cmds) if batch and session.is_can else list(pid_cmds)
+    suffix = "1" if session.target else ""
+    values = {}
+    for request in requests:
+        raw_response = session.send_command(request + suffix)
+        logging.debug("Raw response for %s: %s", request, raw_response.strip())
+        for ecu, ecu_values in decode_reply_by_ecu(raw_response, session.protocol).items():
+            values.setdefault(ecu, {}).update(ecu_values)
+    return values
+
+def read_pids(session, pid_cmds, batch=True):
+    """
+    Request the given Mode 01 PIDs and return {pid_cmd: value}.
+    PIDs that fail to decode are left out of the result.
+    """
+    return merge_ecu_values(read_pids_by_ecu(session, pid_cmds, batch=batch))
 
 # --- Main Function ---
 
-def fetch_live_data(port):
-    data = {
-        "RPM": None,
-        "Vehicle Speed": None,
-        "Coolant Temp": None,
-        "Throttle Position": None,
-        "Intake Temp": None,
-        "MAF Rate": None,
-        "Fuel Pressure": None,
-        "O2 Sensor (Bank 1)": None
-    }
+def fetch_live_data(port: str = DEFAULT_PORT, session: Optional[AdapterSession] = None,
+                    batch: bool = True):
+    """
+    One sweep over the dashboard PIDs. Runs on the shared adapter session,
+    so only the first call pays for opening the port and the AT init.
+    With `batch` on a CAN vehicle, PIDs are packed six per request.
+    """
+    data = {label: None for label in PID_MAP}
 
     try:
-        print(f"🔌 Connecting to {port}...")
-        ser = serial.Serial(port, baudrate=38400, timeout=3)
-        time.sleep(2)
-        ser.reset_input_buffer()
-
-        # Init commands
-        init_cmds = ["ATE0", "ATL0", "ATS0", "ATH1", "ATSP3"]
-        for cmd in init_cmds:
-            ser.write((cmd + '\r').encode())
-            time.sleep(0.4)
-            ser.read_until(b'>')
-
-        # Check supported PIDs
-        ser.write(b'0100\r')
-        time.sleep(0.5)
-        raw = ser.read_until(b'>').decode(errors="ignore")
-        supported_pids = parse_supported_pids(raw)
-        print(f"✅ Supported PIDs: {supported_pids}")
-
-        # Define PID map
-        pid_map = {
-            "RPM": ("010C", parse_rpm_response),
-            "Vehicle Speed": ("010D", parse_speed_response),
-            "Coolant Temp": ("0105", parse_temp_response),
-            "Throttle Position": ("0111", parse_throttle_response),
-            "Intake Temp": ("010F", parse_temp_response),
-            "MAF Rate": ("0110", parse_maf_response),
-            "Fuel Pressure": ("010A", parse_fuel_pressure_response),
-            "O2 Sensor (Bank 1)": ("0114", parse_o2_sensor_response)
-        }
-
-        # Request each data point
-        for label, (pid_cmd, parser) in pid_map.items():
-            if pid_cmd in supported_pids:
-                print(f"\n➡️ Requesting {label} ({pid_cmd})...")
-                ser.write((pid_cmd + '\r').encode())
-                time.sleep(0.5)
-                raw_response = ser.read_until(b'>').decode(errors="ignore")
-                print(f"🔍 Raw response for {label}:\n{raw_response.strip()}")
-
-                value = parser(raw_response)
-                if value is not None:
-                    print(f"✅ {label}: {value}")
-                    data[label] = value
+        session = session or get_session(port)
+        if not session.is_healthy():
+            print(f"🔌 Connecting to {session.port}...")
+            if not session.open():
+                raise ConnectionError(f"Adapter not reachable on {session.port}")
+
+        def sweep(session):
+            # Supported PIDs come from the vehicle profile after the first run
+            supported_pids = merged(discover_supported(session, modes=("01",)))
+            print(f"✅ Supported PIDs: {supported_pids}")
+
+            wanted = []
+            for label, (pid_cmd, _) in PID_MAP.items():
+                if pid_cmd in supported_pids:
+                    wanted.append(pid_cmd)
                 else:
-                    print(f"⚠️ Car does not support this or invalid response: {label}")
+                    print(f"❌ {label} ({pid_cmd}) not supported.")
+            session.clear_target()
+            return wanted, read_pids(session, wanted, batch=batch)
+
+        # one arbiter job, so a running poller cannot retarget in between
+        wanted, values = arbiter_for(session).run(sweep, NORMAL, name="live sweep")
+        for label, (pid_cmd, _) in PID_MAP.items():
+            if pid_cmd not in wanted:
+                continue
+            if pid_cmd in values:
+                data[label] = values[pid_cmd]
+                print(f"✅ {label}: {data[label]}")
             else:
-                print(f"❌ {label} ({pid_cmd}) not supported.")
-
-        ser.close()
+                print(f"⚠️ Car does not support this or invalid response: {label}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -140,7 +187,7 @@ def fetch_live_data(port):
 
 # Example run
 if __name__ == "__main__":
-    result = fetch_live_data("/dev/rfcomm0")
+    result = fetch_live_data(DEFAULT_PORT)
     print("\n=== Final Results ===")
     for key, val in result.items():
         print(f"{key}: {val}")
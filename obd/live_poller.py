@@ -0,0 +1,225 @@
+# obd/live_poller.py
+"""
+Continuous live-data polling on the shared adapter session.
+
+Each dashboard PID gets a target refresh rate. The scheduler always sends
+the PID whose next sample is most overdue, and reschedules from the time
+it was actually served, so under load every PID slows down together
+instead of fast PIDs starving the slow ones. On CAN all PIDs that are due
+go out together in multi-PID requests, addressed (ATSH/ATCRA) to the ECU
+that serves them so no time is spent on other ECUs' broadcast replies.
+
+Requests go through the session's command arbiter at background priority,
+so DTC reads and other user actions are served between poll requests.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from adapter.arbiter import BACKGROUND, NORMAL, arbiter_for
+from adapter.session import AdapterSession, get_session, DEFAULT_PORT
+from obd.live_diagnostic_commands import (
+    PID_MAP,
+    MAX_PIDS_PER_REQUEST,
+    read_pids,
+)
+from obd.discovery import merged, supported_pids
+from utils.log_manager import logging
+
+# Target samples per second per dashboard label
+DEFAULT_RATES = {
+    "RPM": 10.0,
+    "Throttle Position": 10.0,
+    "Vehicle Speed": 5.0,
+    "MAF Rate": 5.0,
+    "O2 Sensor (Bank 1)": 2.0,
+    "Fuel Pressure": 1.0,
+    "Coolant Temp": 0.5,
+    "Intake Temp": 0.5,
+}
+
+# Window used to report the achieved rate per PID
+RATE_WINDOW = 5.0
+
+# How often a poller waiting on the arbiter re-checks for stop()
+WAIT_POLL = 0.1
+
+
+@dataclass
+class Sample:
+    label: str
+    pid: str
+    value: float
+    timestamp: float
+
+
+class LivePoller:
+    def __init__(self, session: Optional[AdapterSession] = None, port: str = DEFAULT_PORT,
+                 rates: Optional[Dict[str, float]] = None, batch: bool = True):
+        self.session = session or get_session(port)
+        self.arbiter = arbiter_for(self.session)
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.batch = batch
+        self.supported: List[str] = []
+        # label -> ECU that serves it (lowest address wins), 0 when unknown
+        self.pid_ecu: Dict[str, int] = {}
+        self._subscribers: List[Callable[[Sample], None]] = []
+        self._history: Dict[str, deque] = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ---------------- Subscribers ----------------
+    def subscribe(self, callback: Callable[[Sample], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Sample], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    # ---------------- Lifecycle ----------------
+    def start(self) -> bool:
+        if self.running:
+            self.resume()
+            return True
+        if not self.session.open():
+            return False
+        # full support chain per ECU, from the vehicle profile when known
+        support = self.arbiter.run(lambda s: supported_pids(s, modes=("01",)), NORMAL, name="discovery")
+        by_ecu = support.get("01", {})
+        self.supported = merged(support)
+        self.pid_ecu = {}
+        for label, (pid_cmd, _) in PID_MAP.items():
+            owners = [ecu for ecu, pids in by_ecu.items() if pid_cmd in pids]
+            self.pid_ecu[label] = min(owners) if owners else 0
+        # a fresh event per run: a thread still winding down keeps its own
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                        name="LivePoller", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, wait: bool = False) -> Future:
+        """
+        Stop polling without blocking (the GUI calls this on the Tk thread):
+        the poll thread winds down within WAIT_POLL, and the ECU target is
+        cleared by a queued arbiter job, returned as a future. With `wait`,
+        join the thread and wait for that job.
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        self.arbiter.resume()
+        cleared = self.arbiter.submit(lambda s: s.clear_target(), NORMAL, name="clear target")
+        if wait:
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=2)
+            cleared.result()
+        return cleared
+
+    def pause(self):
+        """Hold polling between requests; the adapter stays initialised."""
+        self.arbiter.pause()
+
+    def resume(self):
+        self.arbiter.resume()
+
+    @property
+    def paused(self) -> bool:
+        return self.arbiter.paused
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # ---------------- Statistics ----------------
+    def achieved_rates(self) -> Dict[str, float]:
+        """Samples per second over the last RATE_WINDOW seconds, per label."""
+        cutoff = time.monotonic() - RATE_WINDOW
+        result = {}
+        for label, stamps in self._history.items():
+            recent = sum(1 for t in stamps if t >= cutoff)
+            result[label] = recent / RATE_WINDOW
+        return result
+
+    # ---------------- Scheduler ----------------
+    def _schedule(self) -> tuple:
+        """Heap of (due_time, tiebreak, label) for every supported PID."""
+        counter = itertools.count()
+        now = time.monotonic()
+        heap = []
+        for label, rate in self.rates.items():
+            pid_cmd = PID_MAP.get(label, (None, None))[0]
+            if rate > 0 and pid_cmd in self.supported:
+                heap.append((now, next(counter), label))
+                self._history.setdefault(label, deque(maxlen=int(rate * RATE_WINDOW) + 1))
+        heapq.heapify(heap)
+        return heap, counter
+
+    def _run(self, stop: threading.Event):
+        heap, counter = self._schedule()
+        if not heap:
+            logging.info("LivePoller: no supported PIDs to poll")
+            return
+        per_request = MAX_PIDS_PER_REQUEST if self.batch and self.session.is_can else 1
+
+        while not stop.is_set():
+            now = time.monotonic()
+            due_at = heap[0][0]
+            if due_at > now:
+                stop.wait(due_at - now)
+                continue
+
+            # take the most overdue PIDs, as many as one request can carry
+            due = [heapq.heappop(heap)]
+            while heap and heap[0][0] <= now and len(due) < per_request:
+                due.append(heapq.heappop(heap))
+
+            # one request group per serving ECU, addressed physically
+            groups: Dict[int, List[str]] = {}
+            for _, _, label in due:
+                groups.setdefault(self.pid_ecu.get(label, 0), []).append(label)
+
+            for ecu, labels in groups.items():
+                pid_cmds = [PID_MAP[label][0] for label in labels]
+                values = self._request(ecu, pid_cmds, stop)
+                if values is None:
+                    return
+
+                served = time.monotonic()
+                for label, pid_cmd in zip(labels, pid_cmds):
+                    heapq.heappush(heap, (served + 1.0 / self.rates[label], next(counter), label))
+                    if pid_cmd in values:
+                        self._history[label].append(served)
+                        self._publish(Sample(label, pid_cmd, values[pid_cmd], time.time()))
+
+    def _request(self, ecu: int, pid_cmds: List[str],
+                 stop: threading.Event) -> Optional[Dict[str, float]]:
+        """One poll request as a background job; None if stopped while waiting."""
+        def job(session):
+            if not session.target_ecu(ecu):
+                session.clear_target()
+            return read_pids(session, pid_cmds, batch=self.batch)
+
+        future = self.arbiter.submit(job, BACKGROUND, name="poll " + ",".join(pid_cmds))
+        while True:
+            try:
+                return future.result(WAIT_POLL)
+            except FutureTimeout:
+                if stop.is_set():
+                    future.cancel()
+                    return None
+            except Exception as exc:
+                logging.warning("LivePoller: request %s failed: %s", pid_cmds, exc)
+                return {}
+
+    def _publish(self, sample: Sample):
+        for callback in list(self._subscribers):
+            try:
+                callback(sample)
+            except Exception as exc:
+                logging.warning("LivePoller: subscriber failed: %s", exc)
@@ -1,80 +1,206 @@
 # obd/mode22_support.py
 """
-Mode 22 Support: Manufacturer-specific DTC retrieval.
-This module attempts to query ELM327 for brand-specific codes
+Manufacturer-specific DTC retrieval.
+
+Each brand profile in assets/brand_profiles.json lists the modules to
+visit (request/response CAN IDs) and the request layouts to try on each:
+UDS 19 02 (ReadDTCInformation by status mask) and, for older ECUs, KWP
+18 02. The reader walks every module over the one shared adapter session,
+addressing it physically so only that module's reply is waited for, and
+decodes the DTC records (2 or 3 bytes plus a status mask) against the
+shared DTC index with the brand's own codes taking precedence.
 """
 
 import json
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from obd.dtc_index import dtc_index
+from obd.dtc_lookup import dtc_from_bytes
+from obd.framer import frames_for_service, group_by_ecu, parse_frames
+
+BRAND_PROFILE_FILE = Path(__file__).resolve().parents[1] / "assets" / "brand_profiles.json"
+
+# ISO 14229 DTC status bits
+STATUS_BITS = (
+    "testFailed", "testFailedThisOperationCycle", "pending", "confirmed",
+    "testNotCompletedSinceLastClear", "testFailedSinceLastClear",
+    "testNotCompletedThisOperationCycle", "warningIndicatorRequested",
+)
+
+# Negative response "requestCorrectlyReceived-ResponsePending": the module
+# is still working on 19 02 and answers later. The adapter stops listening
+# at its prompt, so the request is sent again after a pause.
+NRC_RESPONSE_PENDING = 0x78
+PENDING_RETRIES = 3
+PENDING_WAIT = 0.2      # seconds
+
+
+@dataclass(frozen=True)
+class DTCLayout:
+    name: str
+    request: str           # e.g. "19020D"
+    service: int           # positive response service, e.g. 0x59
+    skip: int              # bytes between the service byte and the first record (59: subfunction + availability mask)
+    dtc_bytes: int         # 2 (SAE code) or 3 (code + failure type byte)
+    status: bool           # a status mask byte follows every DTC
+
+
+@dataclass(frozen=True)
+class Module:
+    name: str
+    request: int           # 11-bit request ID, e.g. 0x713
+    response: int          # 11-bit response ID, e.g. 0x77D
 
-# Root folder for brand JSON tables
-ASSETS_DIR = Path(__file__).resolve().parents[1] / "assets" / "manufacturer_specific_dtc"
+
+_profiles: Dict[Path, dict] = {}
+
+
+def _load_profiles(path: Path = BRAND_PROFILE_FILE) -> dict:
+    """Parsed profile file, cached per path."""
+    path = Path(path)
+    if path not in _profiles:
+        try:
+            with path.open(encoding="utf-8") as f:
+                _profiles[path] = json.load(f)
+        except (FileNotFoundError, ValueError) as exc:
+            print(f"Warning: brand profiles could not be loaded from {path}: {exc}")
+            _profiles[path] = {}
+    return _profiles[path]
+
+
+def brand_profile(brand: str) -> Tuple[List[DTCLayout], List[Module]]:
+    """Layouts to try and modules to visit for `brand` (the default profile if unlisted)."""
+    data = _load_profiles()
+    key = brand.strip().lower().replace(" ", "").replace("-", "")
+    profile = data.get("brands", {}).get(key) or data.get("default", {})
+    layouts = []
+    for name in profile.get("layouts", []):
+        spec = data.get("layouts", {}).get(name)
+        if spec:
+            layouts.append(DTCLayout(name, spec["request"], int(spec["service"], 16),
+                                     int(spec.get("skip", 0)), int(spec.get("dtc_bytes", 2)),
+                                     bool(spec.get("status", False))))
+    modules = [Module(m["name"], int(m["request"], 16), int(m["response"], 16))
+               for m in profile.get("ecus", [])]
+    return layouts, modules
 
 
 def _load_brand_table(brand: str) -> dict:
     """
-    Load the JSON for the given brand.
-    Returns a dict { "P1234": "Description", ... } or {} if not found.
+    The brand's own table { "P1234": "Description", ... }, or {} if there
+    is none. Parsed once per process by the shared DTC index.
     """
-    fname = brand.strip().lower() + ".json"
-    path = ASSETS_DIR / fname
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict) and "codes" in data:
-            return data["codes"]
-        if isinstance(data, dict):
-            return data
-    except Exception:
+    return dtc_index().table(brand)
+
+
+def describe_status(mask: int) -> List[str]:
+    return [name for bit, name in enumerate(STATUS_BITS) if mask & (1 << bit)]
+
+
+def decode_dtc_records(payload: bytes, layout: DTCLayout, brand: str = "") -> List[Dict]:
+    """
+    DTC records from one positive response payload (service byte first):
+    [{'code', 'ftb', 'status', 'flags', 'desc'}, ...]. All-zero filler
+    records are skipped.
+    """
+    index = dtc_index()
+    record = layout.dtc_bytes + (1 if layout.status else 0)
+    data = payload[1 + layout.skip:]
+    dtcs = []
+    for i in range(0, len(data) - record + 1, record):
+        chunk = data[i:i + record]
+        code = dtc_from_bytes(chunk[0], chunk[1])
+        if not code:
+            continue
+        ftb = chunk[2] if layout.dtc_bytes == 3 else None
+        status = chunk[layout.dtc_bytes] if layout.status else None
+        dtcs.append({
+            "code": code,
+            "ftb": ftb,
+            "status": status,
+            "flags": describe_status(status) if status is not None else [],
+            "desc": index.lookup(code, brand) or "Unknown code",
+        })
+    return dtcs
+
+
+def read_module_dtcs(session, module: Module, layouts: List[DTCLayout],
+                     brand: str = "") -> Optional[List[Dict]]:
+    """
+    DTCs of one module, trying each layout until one is answered.
+    None when the module never answers (not fitted); [] when it answers
+    but rejects every layout, so it still shows up as present.
+    """
+    if not session.target_ecu(module.response, module.request):
+        return None
+    answered = False
+    for layout in layouts:
+        service = int(layout.request[:2], 16)
+        for attempt in range(PENDING_RETRIES + 1):
+            raw = session.send_command(layout.request)
+            frames = group_by_ecu(parse_frames(raw, session.protocol)).get(module.response, [])
+            positive = frames_for_service(frames, layout.service)
+            if positive:
+                dtcs = []
+                for frame in positive:
+                    dtcs += decode_dtc_records(bytes(frame.payload), layout, brand)
+                return dtcs
+            nrcs = [f.payload[2] for f in frames_for_service(frames, 0x7F)
+                    if len(f.payload) >= 3 and f.payload[1] == service]
+            if not nrcs or any(nrc != NRC_RESPONSE_PENDING for nrc in nrcs):
+                break
+            if attempt < PENDING_RETRIES:
+                time.sleep(PENDING_WAIT)
+        if not nrcs:
+            # silent: not fitted, or gone quiet after rejecting an earlier layout
+            break
+        answered = True
+        print(f"[Mode22] {module.name}: {layout.name} rejected (NRC {nrcs[-1]:02X})")
+    return [] if answered else None
+
+
+def scan_brand(session, brand: str) -> Dict[str, List[Dict]]:
+    """
+    Visit every module in the brand profile on `session` and return
+    {module name: [dtc, ...]} for the modules that answered. Needs CAN
+    with 11-bit IDs; run it as one arbiter job.
+    """
+    layouts, modules = brand_profile(brand)
+    if not session.is_can:
+        print(f"[Mode22] {brand}: module scan needs a CAN vehicle")
         return {}
-    return {}
+    results = {}
+    try:
+        for module in modules:
+            dtcs = read_module_dtcs(session, module, layouts, brand)
+            if dtcs is not None:
+                results[module.name] = dtcs
+    finally:
+        session.clear_target()
+    return results
 
 
 def read_brand_dtcs(brand: str, elm_adapter=None) -> list:
     """
-    Attempt to request brand-specific DTCs via Mode 22.
-    - `elm_adapter` is expected to be a connected ELM327 interface
-      with a .send_and_receive(cmd: str) -> str method.
-    - Returns a list of (code, description).
+    Brand-specific DTCs from every module in the brand profile.
+    - `elm_adapter` is the shared AdapterSession (None when offline).
+    - Returns a list of (code, description), the module name appended.
     - If fails, returns [].
 
     Fallback logic ensures the GUI can safely show 'No DTC found'.
     """
-    dtc_table = _load_brand_table(brand)
-    if not dtc_table:
+    if elm_adapter is None:
         return []
-
     try:
-        if elm_adapter:
-            # Example command: "22 F190" (this varies per brand!)
-            # For now, we simulate a read to keep the skeleton safe.
-            raw = elm_adapter.send_and_receive("22 F190")
-        else:
-            # If no adapter passed → skip comms
-            raw = ""
-
-        if not raw or "NO DATA" in raw.upper():
-            return []
-
-        # ------------------------------------------------------
-        # Dummy parse logic: in reality, Mode 22 responses vary
-        # ------------------------------------------------------
-        # Example: response "62 F190 01 23 45" → codes "P0123"
-        hex_bytes = raw.strip().split()
         codes = []
-
-        # Naive decode: take each pair of bytes after header
-        for i in range(2, len(hex_bytes), 2):
-            code_hex = "".join(hex_bytes[i:i+2])
-            if not code_hex:
-                continue
-            # Fallback: convert to fake P-codes
-            code = "P" + code_hex[-4:].upper()
-            desc = dtc_table.get(code, "Unknown code")
-            codes.append((code, desc))
-
+        for module, dtcs in scan_brand(elm_adapter, brand).items():
+            for dtc in dtcs:
+                code = dtc["code"] if dtc["ftb"] in (None, 0) else f"{dtc['code']}-{dtc['ftb']:02X}"
+                codes.append((code, f"{dtc['desc']} [{module}]"))
         return codes
-
     except Exception as e:
         print(f"[Mode22] Error: {e}")
         return []
@@ -0,0 +1,149 @@
+# obd/pid_table.py
+"""
+Table-driven PID decoding.
+
+PID definitions (mode, PID, data length, formula, unit, name) live in
+assets/pid_profiles.json, the Python counterpart of MASTER_PID_TABLE in
+HardwareSocketCAN/src/core/obd_pids_db.h. Each formula is written in the
+usual SAE J1979 notation over the data bytes A, B, C, ... and compiled
+once into a small function that works directly on a bytes payload, so no
+regex or text handling runs per sample.
+
+PIDs that carry several quantities (O2 sensor voltage + fuel trim, the
+0x4F maxima, torque points, ...) list them under "values"; `formula`
+stays the headline value and decode_values() returns all of them.
+
+Covered: the SAE J1979 Mode 01 PIDs 0x00-0xA6 (0x95-0x97 are not
+assigned), 0xA9 and 0xC0. Status and WWH-OBD records without a published
+scaling (0x7D, 0x88, 0x8C, 0x8F-0x94, 0x9A-0x9C, ...) decode to their
+raw integer. Records longer than 26 bytes (the AECD run timers) continue
+the byte names as AA, AB, ...; an unknown PID ends a multi-PID split
+rather than being mis-sized.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+PID_PROFILE_FILE = Path(__file__).resolve().parents[1] / "assets" / "pid_profiles.json"
+
+# Only byte names, numbers and arithmetic/bitwise operators are allowed
+_FORMULA_OK = re.compile(r'^[A-Z0-9+\-*/%^&|<>() .]+$')
+_BYTE_NAME = re.compile(r'\b([A-Z]|A[A-Z])\b')
+
+
+def _byte_index(name: str) -> int:
+    """'A' → 0, ..., 'Z' → 25, 'AA' → 26, ... (spreadsheet-style columns)."""
+    return ord(name[-1]) - ord('A') + (26 if len(name) == 2 else 0)
+
+
+@dataclass(frozen=True)
+class PIDDefinition:
+    mode: int
+    pid: int
+    length: int
+    name: str
+    unit: str
+    formula: Optional[str]
+    decode: Callable[[bytes], float]
+    # (name, unit, decode) per quantity of a multi-value PID
+    values: Tuple[Tuple[str, str, Callable[[bytes], float]], ...] = ()
+
+
+def compile_formula(formula: Optional[str], length: int) -> Callable[[bytes], float]:
+    """
+    Turn '(A*256+B)/4' into `lambda d: (d[0]*256+d[1])/4`.
+    Bitmapped PIDs (formula None) decode to their raw big-endian integer.
+    """
+    if formula is None:
+        return lambda d: int.from_bytes(d[:length], "big")
+    if not _FORMULA_OK.match(formula):
+        raise ValueError(f"Unsupported characters in PID formula: {formula!r}")
+    body = _BYTE_NAME.sub(lambda m: f"d[{_byte_index(m.group(1))}]", formula)
+    return eval(f"lambda d: {body}", {"__builtins__": {}})
+
+
+def load_pid_table(path: Path = PID_PROFILE_FILE) -> Dict[Tuple[int, int], PIDDefinition]:
+    """Load and compile the PID table, keyed by (mode, pid)."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"Warning: PID table could not be loaded from {path}: {exc}")
+        return {}
+
+    table = {}
+    for entry in data.get("pids", []):
+        mode, pid, length = int(entry["mode"], 16), int(entry["pid"], 16), int(entry["bytes"])
+        table[(mode, pid)] = PIDDefinition(
+            mode=mode,
+            pid=pid,
+            length=length,
+            name=entry.get("name", ""),
+            unit=entry.get("unit", ""),
+            formula=entry.get("formula"),
+            decode=compile_formula(entry.get("formula"), length),
+            values=tuple((value["name"], value.get("unit", ""), compile_formula(value["formula"], length))
+                         for value in entry.get("values", [])),
+        )
+    return table
+
+
+PID_TABLE = load_pid_table()
+
+# An ELM327 accepts at most six PIDs per Mode 01 request on CAN
+MAX_PIDS_PER_REQUEST = 6
+
+
+def supported_from_bitmap(bitmap, base: int = 0x00, mode: str = "01"):
+    """4-byte support bitmap for PIDs base+1 .. base+0x20 → ['0101', ...]."""
+    bits = int.from_bytes(bytes(bitmap[:4]), "big")
+    return [f"{mode}{base + i + 1:02X}" for i in range(32) if bits & (1 << (31 - i))]
+
+
+def get_definition(pid: int, mode: int = 0x01) -> Optional[PIDDefinition]:
+    return PID_TABLE.get((mode, pid))
+
+
+def decode_pid(pid: int, data: bytes, mode: int = 0x01):
+    """Engineering value for one PID's data bytes, or None if unknown/short."""
+    definition = PID_TABLE.get((mode, pid))
+    if definition is None or len(data) < definition.length:
+        return None
+    return definition.decode(data)
+
+
+def decode_values(pid: int, data: bytes, mode: int = 0x01) -> Dict[str, float]:
+    """
+    Every quantity of one PID, {name: value}; single-value PIDs give
+    {definition name: value}. {} if unknown/short.
+    """
+    definition = PID_TABLE.get((mode, pid))
+    if definition is None or len(data) < definition.length:
+        return {}
+    if not definition.values:
+        return {definition.name: definition.decode(data)}
+    return {name: decode(data) for name, _, decode in definition.values}
+
+
+def decode_mode01_payload(payload: bytes, mode: int = 0x01) -> Dict[int, float]:
+    """
+    Split a Mode 01 response payload (41 pid data [pid data ...]) into
+    {pid: value} using the table's data lengths. Multi-PID replies are
+    handled the same way as single-PID ones. Mode 02 payloads carry a
+    frame number after each PID and are not handled here.
+    """
+    values = {}
+    if not payload or payload[0] != 0x40 + mode:
+        return values
+    pos = 1
+    end = len(payload)
+    while pos < end:
+        definition = PID_TABLE.get((mode, payload[pos]))
+        if definition is None or pos + 1 + definition.length > end:
+            break
+        values[definition.pid] = definition.decode(payload[pos + 1:pos + 1 + definition.length])
+        pos += 1 + definition.length
+    return values
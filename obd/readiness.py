@@ -0,0 +1,284 @@
+# obd/readiness.py
+"""
+Readiness monitors (PID 0101 / 0141) and Mode 06 on-board test results,
+the pre-inspection check.
+
+One pass over the session, run as one arbiter job:
+
+    1. 0101 and 0141 together in one multi-PID broadcast (CAN), with the
+       known ECU count as the expected response count
+    2. the Mode 06 OBDMID support chain, discovered once and cached in the
+       vehicle profile like Mode 01
+    3. per ECU, addressed physically, one request per OBDMID (J1979 only
+       allows several OBDMIDs in one request for the support MIDs)
+
+Mode 06 is read on CAN (ISO 15765-4) only. Older protocols use the
+legacy TID/CID record layout, which is not decoded here, so on those
+vehicles the report carries readiness alone and 'tests' stays empty.
+
+Test values are scaled with the Unit and Scaling IDs of SAE J1979
+Appendix E; a test passes when min <= value <= max.
+
+    report = read_readiness(session)
+    inspection_ready(report[0x7E8])
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from obd.discovery import supported_pids
+from obd.framer import frames_for_service, parse_frames
+
+# ---------------- PID 01 / 41 bit layout ----------------
+# Byte B, bits 0-2 supported (41: enabled), bits 4-6 incomplete
+CONTINUOUS_MONITORS = ("Misfire", "Fuel System", "Components")
+# Bytes C (supported / enabled) and D (incomplete), bit 0 first
+SPARK_MONITORS = (
+    "Catalyst", "Heated Catalyst", "Evaporative System", "Secondary Air System",
+    "A/C Refrigerant", "Oxygen Sensor", "Oxygen Sensor Heater", "EGR/VVT System",
+)
+COMPRESSION_MONITORS = (
+    "NMHC Catalyst", "NOx/SCR Monitor", None, "Boost Pressure",
+    None, "Exhaust Gas Sensor", "PM Filter", "EGR/VVT System",
+)
+
+# ---------------- Mode 06 ----------------
+# Unit and Scaling ID → (scale, offset, unit, signed)
+UAS_SCALING: Dict[int, Tuple[float, float, str, bool]] = {
+    0x01: (1, 0, "", False),
+    0x02: (0.1, 0, "", False),
+    0x03: (0.01, 0, "", False),
+    0x04: (0.001, 0, "", False),
+    0x05: (0.0000305, 0, "", False),
+    0x06: (0.000305, 0, "", False),
+    0x07: (0.25, 0, "rpm", False),
+    0x08: (0.01, 0, "km/h", False),
+    0x09: (1, 0, "km/h", False),
+    0x0A: (0.122, 0, "mV", False),
+    0x0B: (0.001, 0, "V", False),
+    0x0C: (0.01, 0, "V", False),
+    0x0D: (0.00390625, 0, "mA", False),
+    0x0E: (0.001, 0, "A", False),
+    0x0F: (0.01, 0, "A", False),
+    0x10: (1, 0, "ms", False),
+    0x11: (100, 0, "ms", False),
+    0x12: (1, 0, "s", False),
+    0x13: (1, 0, "mΩ", False),
+    0x14: (1, 0, "Ω", False),
+    0x15: (1, 0, "kΩ", False),
+    0x16: (0.1, -40, "°C", False),
+    0x17: (0.01, 0, "kPa", False),
+    0x18: (0.0117, 0, "kPa", False),
+    0x19: (0.079, 0, "kPa", False),
+    0x1A: (1, 0, "kPa", False),
+    0x1B: (10, 0, "kPa", False),
+    0x1C: (0.01, 0, "°", False),
+    0x1D: (0.5, 0, "°", False),
+    0x1E: (0.0000305, 0, "ratio", False),
+    0x1F: (0.05, 0, "ratio", False),
+    0x20: (0.0039062, 0, "ratio", False),
+    0x21: (1, 0, "mHz", False),
+    0x22: (1, 0, "Hz", False),
+    0x23: (1, 0, "kHz", False),
+    0x24: (1, 0, "counts", False),
+    0x25: (1, 0, "km", False),
+    0x26: (0.1, 0, "mV/ms", False),
+    0x27: (0.01, 0, "g/s", False),
+    0x28: (1, 0, "g/s", False),
+    0x29: (0.25, 0, "Pa/s", False),
+    0x2A: (0.001, 0, "kg/h", False),
+    0x2B: (1, 0, "switches", False),
+    0x2C: (0.01, 0, "g/cyl", False),
+    0x2D: (0.01, 0, "mg/stroke", False),
+    0x2E: (1, 0, "", False),
+    0x2F: (0.01, 0, "%", False),
+    0x30: (0.001526, 0, "%", False),
+    0x31: (0.001, 0, "L", False),
+    0x81: (1, 0, "", True),
+    0x82: (0.1, 0, "", True),
+    0x83: (0.01, 0, "", True),
+    0x84: (0.001, 0, "", True),
+    0x85: (0.0000305, 0, "", True),
+    0x86: (0.000305, 0, "", True),
+    0x8A: (0.122, 0, "mV", True),
+    0x8B: (0.001, 0, "V", True),
+    0x8C: (0.01, 0, "V", True),
+    0x8D: (0.00390625, 0, "mA", True),
+    0x8E: (0.001, 0, "A", True),
+    0x90: (1, 0, "ms", True),
+    0x96: (0.1, 0, "°C", True),
+    0x9C: (0.01, 0, "°", True),
+    0x9D: (0.5, 0, "°", True),
+    0xA8: (1, 0, "g/s", True),
+    0xA9: (0.25, 0, "Pa/s", True),
+    0xAF: (0.01, 0, "%", True),
+    0xB0: (0.003052, 0, "%", True),
+    0xFC: (0.01, 0, "kPa", True),
+    0xFD: (0.001, 0, "kPa", True),
+    0xFE: (0.25, 0, "Pa", True),
+}
+
+OBDMID_NAMES = {
+    **{0x01 + i: f"Oxygen Sensor Monitor Bank {i // 4 + 1} - Sensor {i % 4 + 1}" for i in range(8)},
+    0x21: "Catalyst Monitor Bank 1", 0x22: "Catalyst Monitor Bank 2",
+    0x31: "EGR Monitor Bank 1", 0x32: "EGR Monitor Bank 2",
+    0x35: "VVT Monitor Bank 1", 0x36: "VVT Monitor Bank 2",
+    0x39: "EVAP Monitor (Cap Off / 0.150\")", 0x3A: "EVAP Monitor (0.090\")",
+    0x3B: "EVAP Monitor (0.040\")", 0x3C: "EVAP Monitor (0.020\")", 0x3D: "Purge Flow Monitor",
+    **{0x41 + i: f"Oxygen Sensor Heater Monitor Bank {i // 4 + 1} - Sensor {i % 4 + 1}" for i in range(8)},
+    0x61: "Heated Catalyst Monitor Bank 1", 0x62: "Heated Catalyst Monitor Bank 2",
+    0x71: "Secondary Air Monitor 1", 0x72: "Secondary Air Monitor 2",
+    0x81: "Fuel System Monitor Bank 1", 0x82: "Fuel System Monitor Bank 2",
+    0xA1: "Misfire Monitor General Data",
+    **{0xA2 + i: f"Misfire Cylinder {i + 1} Data" for i in range(12)},
+    0xB0: "PM Filter Monitor Bank 1",
+}
+
+# Bytes per Mode 06 test record: MID TID UASID value(2) min(2) max(2)
+RECORD_SIZE = 9
+
+
+def decode_monitor_status(data: bytes, this_cycle: bool = False) -> Dict:
+    """
+    PID 01 (since DTCs cleared) or PID 41 (this drive cycle) data bytes →
+    {'mil', 'dtc_count', 'ignition', 'monitors': {name: {'supported'|'enabled', 'complete'}}}.
+    PID 41 has no MIL/count byte, so those are None there.
+    """
+    a, b, c, d = data[:4]
+    key = "enabled" if this_cycle else "supported"
+    compression = bool(b & 0x08)
+    monitors = {}
+    for bit, name in enumerate(CONTINUOUS_MONITORS):
+        if b & (1 << bit):
+            monitors[name] = {key: True, "complete": not b & (0x10 << bit)}
+    names = COMPRESSION_MONITORS if compression else SPARK_MONITORS
+    for bit, name in enumerate(names):
+        if name and c & (1 << bit):
+            monitors[name] = {key: True, "complete": not d & (1 << bit)}
+    return {
+        "mil": None if this_cycle else bool(a & 0x80),
+        "dtc_count": None if this_cycle else a & 0x7F,
+        "ignition": "compression" if compression else "spark",
+        "monitors": monitors,
+    }
+
+
+def scale_uas(uasid: int, raw: int) -> Tuple[float, str]:
+    scale, offset, unit, signed = UAS_SCALING.get(uasid, (1, 0, "", False))
+    if signed and raw & 0x8000:
+        raw -= 0x10000
+    return raw * scale + offset, unit
+
+
+def decode_test_records(payload: bytes) -> List[Dict]:
+    """Mode 06 payload (46 first) → [{'mid', 'name', 'tid', 'value', 'min', 'max', 'unit', 'passed'}]."""
+    tests = []
+    data = payload[1:]
+    for i in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        mid, tid, uasid = data[i], data[i + 1], data[i + 2]
+        if mid % 0x20 == 0:
+            break               # support bitmaps are not test records
+        raw = [int.from_bytes(data[i + j:i + j + 2], "big") for j in (3, 5, 7)]
+        (value, unit), (low, _), (high, _) = (scale_uas(uasid, r) for r in raw)
+        tests.append({
+            "mid": mid,
+            "name": OBDMID_NAMES.get(mid, f"OBDMID {mid:02X}"),
+            "tid": tid,
+            "value": round(value, 6),
+            "min": round(low, 6),
+            "max": round(high, 6),
+            "unit": unit,
+            "passed": low <= value <= high,
+        })
+    return tests
+
+
+def parse_readiness_reply(raw: str, protocol: str = "") -> Dict[int, Dict]:
+    """{ecu: readiness dict} from a 0101 and/or 0141 (multi-PID) reply."""
+    result: Dict[int, Dict] = {}
+    for frame in frames_for_service(parse_frames(raw, protocol), 0x41):
+        payload = bytes(frame.payload)
+        pos = 1
+        while pos + 5 <= len(payload) and payload[pos] in (0x01, 0x41):
+            pid, data = payload[pos], payload[pos + 1:pos + 5]
+            entry = result.setdefault(frame.ecu, {"drive_cycle": None, "tests": []})
+            if pid == 0x01:
+                entry.update(decode_monitor_status(data))
+            else:
+                entry["drive_cycle"] = decode_monitor_status(data, this_cycle=True)["monitors"]
+            pos += 5
+    return result
+
+
+def incomplete_monitors(entry: Dict) -> List[str]:
+    """
+    Supported monitors that count against readiness and are incomplete.
+    Continuous monitors (misfire, fuel system, components) re-run all the
+    time and are not part of the inspection check.
+    """
+    return [name for name, state in entry.get("monitors", {}).items()
+            if name not in CONTINUOUS_MONITORS and not state["complete"]]
+
+
+def inspection_ready(entry: Dict, allowed_incomplete: int = 0) -> bool:
+    """
+    True when at most `allowed_incomplete` supported non-continuous
+    monitors are incomplete (many inspection schemes allow one on newer
+    cars) and the MIL is off.
+    """
+    return not entry.get("mil") and len(incomplete_monitors(entry)) <= allowed_incomplete
+
+
+def read_readiness(session, tests: bool = True) -> Dict[int, Dict]:
+    """
+    Readiness and (with `tests`) Mode 06 results per ECU:
+    {ecu: {'mil', 'dtc_count', 'ignition', 'monitors', 'drive_cycle', 'tests'}}.
+    Mode 06 is skipped on non-CAN vehicles (legacy layout, see above).
+    Run it as one arbiter job.
+    """
+    support = supported_pids(session, modes=("01",)).get("01", {})
+    count = len(support)
+    session.clear_target()
+    suffix = f"{count:X}" if 0 < count <= 0xF else ""
+    if session.is_can:
+        report = parse_readiness_reply(session.send_command("010141" + suffix), session.protocol)
+    else:
+        report = parse_readiness_reply(session.send_command("0101"), session.protocol)
+        if any("0141" in pids for pids in support.values()):
+            for ecu, entry in parse_readiness_reply(session.send_command("0141"), session.protocol).items():
+                report.setdefault(ecu, {"drive_cycle": None, "tests": []})["drive_cycle"] = entry["drive_cycle"]
+
+    if not tests or not session.is_can:
+        return report
+
+    mids = supported_pids(session, modes=("06",)).get("06", {})
+    try:
+        for ecu, cmds in sorted(mids.items()):
+            wanted = [cmd for cmd in cmds if int(cmd[2:], 16) % 0x20]
+            if not wanted:
+                continue
+            targeted = session.target_ecu(ecu)
+            for cmd in wanted:
+                raw = session.send_command(cmd + ("1" if targeted else ""))
+                for frame in frames_for_service(parse_frames(raw, session.protocol), 0x46):
+                    if frame.ecu == ecu:
+                        entry = report.setdefault(ecu, {"drive_cycle": None, "tests": []})
+                        entry["tests"] += decode_test_records(bytes(frame.payload))
+    finally:
+        session.clear_target()
+    return report
+
+
+def summarize(report: Dict[int, Dict]) -> Optional[Dict]:
+    """Whole-car verdict for the lane: ready, failed tests, incomplete monitors."""
+    if not report:
+        return None
+    # the same monitors inspection_ready() judges, so the verdict and list agree
+    incomplete = sorted({name for entry in report.values() for name in incomplete_monitors(entry)})
+    failed = [f"{entry_ecu:X} {t['name']} TID {t['tid']:02X}"
+              for entry_ecu, entry in sorted(report.items()) for t in entry["tests"] if not t["passed"]]
+    return {
+        "ready": all(inspection_ready(entry) for entry in report.values() if "monitors" in entry),
+        "mil": any(entry.get("mil") for entry in report.values()),
+        "incomplete": incomplete,
+        "failed_tests": failed,
+    }
@@ -0,0 +1,618 @@
+# simulator/elm327_emulator.py
+"""
+Protocol-level ELM327 emulator.
+
+Unlike SimulatedLiveData, which fakes values at the GUI level, this
+serves a pseudo-terminal (or a local TCP port) that the real adapter
+stack opens in place of /dev/rfcomm0. It speaks the AT commands the app
+uses, answers Mode 01/02/03/04/06/07/09/0A from one or more emulated ECUs with
+correctly framed single- and multi-frame CAN (or ISO 9141) replies, and
+can add latency, jitter and bus errors.
+
+    with ELM327Emulator(ecus=2, latency=0.03) as emu:
+        session = AdapterSession(emu.path)
+        ...
+
+    python -m simulator.elm327_emulator --ecus 2 --latency 0.03
+    python -m simulator.elm327_emulator --tcp 35000
+"""
+
+import math
+import os
+import random
+import select
+import socket
+import threading
+import time
+import tty
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+VERSION = "ELM327 v1.5"
+DEFAULT_VIN = "1D4GP00R55B123456"
+
+# Error replies picked when error_rate triggers; "drop_frame" loses one CAN frame
+ERROR_KINDS = ("NO DATA", "CAN ERROR", "BUS BUSY", "drop_frame")
+
+CAN_PROTOCOLS = {"6", "7", "8", "9"}
+CAN_29BIT_PROTOCOLS = {"7", "9"}
+
+
+# -----------------------------------------------------------
+#  Emulated vehicle
+# -----------------------------------------------------------
+def _engine_pids(t: float) -> Dict[int, bytes]:
+    """Current Mode 01 data bytes of a warm, idling-to-cruising engine."""
+    rpm = 800 + 1400 * (1 + math.sin(t / 3)) / 2
+    speed = int(60 * (1 + math.sin(t / 7)) / 2)
+    return {
+        0x04: bytes([int(35 * 255 / 100)]),
+        0x05: bytes([90 + 40]),
+        0x06: bytes([128 + 2]),
+        0x0A: bytes([300 // 3]),
+        0x0B: bytes([35]),
+        0x0C: int(rpm * 4).to_bytes(2, "big"),
+        0x0D: bytes([speed]),
+        0x0E: bytes([(12 + 64) * 2]),
+        0x0F: bytes([30 + 40]),
+        0x10: int(rpm * 0.4).to_bytes(2, "big"),
+        0x11: bytes([int((15 + 10 * math.sin(t)) * 255 / 100)]),
+        0x14: bytes([int(0.45 * 200 + 40 * math.sin(t * 5)), 0x80]),
+        0x1C: bytes([0x06]),
+        0x1F: int(t).to_bytes(2, "big"),
+        0x2F: bytes([int(62 * 255 / 100)]),
+        0x33: bytes([101]),
+        0x41: bytes([0x00, 0x07, 0x65, 0x04]),      # EVAP not yet run this drive cycle
+        0x42: (14200).to_bytes(2, "big"),
+        0x46: bytes([18 + 40]),
+    }
+
+
+# Mode 06 results of the engine ECU: OBDMID → [(TID, UASID, value, min, max)]
+ENGINE_TESTS = {
+    0x01: [(0x01, 0x0B, 450, 0, 1000), (0x05, 0x10, 72, 0, 120)],     # O2 B1S1 voltage, response time
+    0x21: [(0x80, 0x20, 90, 0, 128)],                                 # catalyst B1 ratio
+    0xA2: [(0x0B, 0x24, 3, 0, 0xFFFF), (0x0C, 0x24, 5, 0, 0xFFFF)],   # misfire cylinder 1
+}
+
+
+def _transmission_pids(t: float) -> Dict[int, bytes]:
+    engine = _engine_pids(t)
+    return {pid: engine[pid] for pid in (0x0C, 0x0D, 0x42)}
+
+
+def _body_pids(t: float) -> Dict[int, bytes]:
+    engine = _engine_pids(t)
+    return {pid: engine[pid] for pid in (0x42, 0x46)}
+
+
+def encode_dtc(code: str) -> bytes:
+    """'P0133' → b'\\x01\\x33'."""
+    hi = ("PCBU".index(code[0]) << 6) | (int(code[1]) << 4) | int(code[2], 16)
+    return bytes([hi, int(code[3:5], 16)])
+
+
+@dataclass
+class EmulatedECU:
+    address: int                    # 11-bit response ID, e.g. 0x7E8
+    name: str
+    pids: Callable[[float], Dict[int, bytes]] = _engine_pids
+    stored: List[str] = field(default_factory=list)
+    pending: List[str] = field(default_factory=list)
+    permanent: List[str] = field(default_factory=list)
+    vin: Optional[str] = None
+    freeze_time: float = 42.0       # freeze frame 0 holds the PIDs at this time
+    tests: Dict[int, List[Tuple[int, int, int, int, int]]] = field(default_factory=dict)
+
+    @property
+    def source(self) -> int:
+        """29-bit / legacy source address: 7E8 → 10, 7E9 → 18, ..."""
+        return 0x10 + 8 * (self.address - 0x7E8)
+
+    def mode01(self, pid: int, t: float) -> Optional[bytes]:
+        values = self.pids(t)
+        if pid % 0x20 == 0:
+            return self._bitmap(pid, values)
+        if pid == 0x01:
+            mil = 0x80 if self.stored else 0
+            return bytes([mil | min(len(self.stored), 0x7F), 0x07, 0x65, 0x00])
+        return values.get(pid)
+
+    def mode02(self, pid: int, frame: int) -> Optional[bytes]:
+        """Freeze frame 0 exists while a stored DTC does (the one that set it)."""
+        if frame != 0 or not self.stored:
+            return None
+        values = self.pids(self.freeze_time)
+        if pid % 0x20 == 0:
+            return self._bitmap(pid, values, extra=0x02)
+        if pid == 0x02:
+            return encode_dtc(self.stored[0])
+        return values.get(pid)
+
+    def mode06(self, mid: int) -> Optional[bytes]:
+        """Support bitmap or the test records of one OBDMID (CAN layout)."""
+        if mid % 0x20 == 0:
+            return self._bitmap(mid, self.tests, extra=None)
+        records = self.tests.get(mid)
+        if not records:
+            return None
+        return b"".join(bytes([mid, tid, uasid]) + value.to_bytes(2, "big")
+                        + low.to_bytes(2, "big") + high.to_bytes(2, "big")
+                        for tid, uasid, value, low, high in records)
+
+    @staticmethod
+    def _bitmap(base: int, values: Dict, extra: Optional[int] = 0x01) -> Optional[bytes]:
+        supported = set(values) | ({extra} if extra else set())
+        if base and not any(p > base for p in supported):
+            return None
+        bits = 0
+        for pid in supported:
+            if base < pid <= base + 0x20:
+                bits |= 1 << (base + 0x20 - pid)
+        if any(p > base + 0x20 for p in supported):
+            bits |= 1           # next support PID exists
+        return bits.to_bytes(4, "big")
+
+
+def default_ecus(count: int = 1, dtcs: Optional[Dict[int, List[str]]] = None,
+                 vin: str = DEFAULT_VIN) -> List[EmulatedECU]:
+    """Engine (7E8), transmission (7E9), then body ECUs, with a few stored DTCs."""
+    dtcs = dtcs if dtcs is not None else {0x7E8: ["P0133", "P0300"], 0x7E9: ["P0700"]}
+    ecus = []
+    for i in range(max(1, count)):
+        address = 0x7E8 + i
+        if i == 0:
+            ecu = EmulatedECU(address, "ECM-EngineControl", _engine_pids, vin=vin,
+                              tests=dict(ENGINE_TESTS))
+        elif i == 1:
+            ecu = EmulatedECU(address, "TCM-TransmissionCtl", _transmission_pids)
+        else:
+            ecu = EmulatedECU(address, f"BCM-Body{i}", _body_pids)
+        ecu.stored = list(dtcs.get(address, []))
+        ecu.permanent = list(ecu.stored)
+        ecus.append(ecu)
+    return ecus
+
+
+# -----------------------------------------------------------
+#  Emulator
+# -----------------------------------------------------------
+class ELM327Emulator:
+    def __init__(self, ecus: int = 1, protocol: str = "6", latency: float = 0.03,
+                 jitter: float = 0.0, error_rate: float = 0.0, search_time: float = 0.3,
+                 dtcs: Optional[Dict[int, List[str]]] = None, vin: str = DEFAULT_VIN,
+                 seed: Optional[int] = None):
+        self.ecus = default_ecus(ecus, dtcs, vin)
+        self.vehicle_protocol = protocol
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.search_time = search_time
+        self.rng = random.Random(seed)
+        self.path: Optional[str] = None
+        self.address: Optional[Tuple[str, int]] = None
+        self.requests = 0
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._fds: List[int] = []
+        self._server = None
+        self.reset()
+
+    # ---------------- Adapter state ----------------
+    def reset(self):
+        self.echo = True
+        self.linefeeds = False
+        self.spaces = True
+        self.headers = False
+        self.protocol = "0"          # ATSP value, "0" = automatic
+        self.connected = False       # protocol found on the bus
+        self.adaptive = 1
+        self.st = 0x32               # ATST, 4 ms units
+        self.header: Optional[str] = None
+        self.receive_filter: Optional[str] = None
+        self.priority = "18"
+        self.last_command = ""
+        self.monitoring = False
+
+    @property
+    def active_protocol(self) -> str:
+        return self.vehicle_protocol if self.connected else self.protocol.lstrip("A")
+
+    @property
+    def is_can(self) -> bool:
+        return self.active_protocol in CAN_PROTOCOLS
+
+    # ---------------- Command handling ----------------
+    def handle(self, cmd: str) -> Tuple[str, float]:
+        """One command line → (reply text without prompt, seconds before replying)."""
+        cmd = cmd.strip().replace(" ", "").upper()
+        if not cmd:
+            cmd = self.last_command
+        if not cmd:
+            return "", 0.0
+        self.last_command = cmd
+        if cmd.startswith("AT") or cmd.startswith("ST"):
+            return self._at(cmd), 0.001
+        if all(c in "0123456789ABCDEF" for c in cmd):
+            return self._obd(cmd)
+        return "?", 0.001
+
+    def _at(self, cmd: str) -> str:
+        body = cmd[2:]
+        if cmd.startswith("ST"):
+            return "?"                         # not an STN chip
+        if body in ("Z", "WS"):
+            self.reset()
+            return VERSION
+        if body == "I":
+            return VERSION
+        if body == "@1":
+            return "OBDII to RS232 Interpreter"
+        if body == "RV":
+            return "12.6V"
+        if body == "MA":
+            self.monitoring = True
+            return ""
+        if body in ("DPN", "DP"):
+            proto = self.vehicle_protocol if self.connected else self.protocol.lstrip("A")
+            auto = self.protocol.startswith("A") or self.protocol == "0"
+            if body == "DPN":
+                return ("A" if auto else "") + proto
+            return ("AUTO, " if auto else "") + f"PROTOCOL {proto}"
+        toggles = {"E": "echo", "L": "linefeeds", "S": "spaces", "H": "headers"}
+        if len(body) == 2 and body[0] in toggles and body[1] in "01":
+            setattr(self, toggles[body[0]], body[1] == "1")
+            return "OK"
+        if body.startswith("SP") or body.startswith("TP"):
+            self.protocol = body[2:] or "0"
+            self.connected = False
+            return "OK"
+        if body.startswith("AT") and body[2:] in ("0", "1", "2"):
+            self.adaptive = int(body[2:])
+            return "OK"
+        if body.startswith("ST") and len(body) == 4:
+            self.st = int(body[2:], 16) or 0x32
+            return "OK"
+        if body.startswith("SH"):
+            self.header = body[2:]
+            return "OK"
+        if body.startswith("CRA"):
+            self.receive_filter = body[3:] or None
+            return "OK"
+        if body.startswith("CP"):
+            self.priority = body[2:]
+            return "OK"
+        if body.startswith("BRD"):
+            return "?"                         # baud changes make no sense on a pty
+        if body in ("D", "PC", "CAF1", "CAF0", "AL", "NL", "M0", "M1"):
+            return "OK"
+        return "?"
+
+    def _responders(self) -> List[EmulatedECU]:
+        """ECUs addressed by the current ATSH and passed by ATCRA."""
+        ecus = self.ecus
+        header = self.header
+        if header and self.is_can:
+            if self.active_protocol in CAN_29BIT_PROTOCOLS and len(header) == 6 and header[:2] == "DA":
+                ecus = [e for e in ecus if e.source == int(header[2:4], 16)]
+            elif len(header) == 3 and header != "7DF":
+                ecus = [e for e in ecus if e.address == int(header, 16) + 8]
+        if self.receive_filter:
+            ecus = [e for e in ecus if self._response_header(e) == self.receive_filter]
+        return ecus
+
+    def _response_header(self, ecu: EmulatedECU) -> str:
+        if self.active_protocol in CAN_29BIT_PROTOCOLS:
+            return f"18DAF1{ecu.source:02X}"
+        if self.is_can:
+            return f"{ecu.address:03X}"
+        return f"486B{ecu.source:02X}"
+
+    def _obd(self, cmd: str) -> Tuple[str, float]:
+        self.requests += 1
+        count = None
+        if len(cmd) % 2:
+            count, cmd = int(cmd[-1], 16), cmd[:-1]
+        prefix = []
+        delay = self._latency()
+
+        if not self.connected:
+            wanted = self.protocol.lstrip("A")
+            if self.protocol in ("0", "") or self.protocol.startswith("A") or wanted == self.vehicle_protocol:
+                if self.protocol in ("0", "") or self.protocol.startswith("A"):
+                    prefix.append("SEARCHING...")
+                    delay += self.search_time
+                self.connected = True
+            else:
+                return "UNABLE TO CONNECT", self.search_time
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            kind = self.rng.choice(ERROR_KINDS)
+            if kind != "drop_frame":
+                return "\r".join(prefix + [kind]), delay + self._st_seconds()
+        else:
+            kind = None
+
+        mode, data = int(cmd[:2], 16), bytes.fromhex(cmd[2:])
+        lines = []
+        answered = 0
+        for ecu in self._responders():
+            payloads = self._answer(ecu, mode, data)
+            if payloads:
+                answered += 1
+                for payload in payloads:
+                    lines += self._format(ecu, payload)
+
+        if not lines:
+            return "\r".join(prefix + ["NO DATA"]), delay + self._st_seconds()
+        if kind == "drop_frame" and len(lines) > 1:
+            del lines[self.rng.randrange(1, len(lines))]
+        if count is None or answered < count:
+            # the adapter waits out its response timer for more ECUs
+            delay += self._idle_seconds()
+        return "\r".join(prefix + lines), delay
+
+    def _latency(self) -> float:
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def _st_seconds(self) -> float:
+        return self.st * 0.004
+
+    def _idle_seconds(self) -> float:
+        if self.adaptive == 0:
+            return self._st_seconds()
+        factor = 2 if self.adaptive == 1 else 1
+        return min(self._st_seconds(), self.latency * factor)
+
+    # ---------------- ECU answers ----------------
+    def _answer(self, ecu: EmulatedECU, mode: int, data: bytes) -> List[bytes]:
+        """Response payloads (service byte first) of one ECU, [] if it stays silent."""
+        t = time.monotonic() - self._started
+        if mode == 0x01 and data:
+            pids = data if self.is_can else data[:1]
+            body = b"".join(bytes([pid]) + value for pid in pids[:6]
+                            if (value := ecu.mode01(pid, t)) is not None)
+            return [b"\x41" + body] if body else []
+        if mode == 0x02 and len(data) >= 2:
+            pairs = data if self.is_can else data[:2]
+            body = b"".join(bytes([pid, frame]) + value
+                            for pid, frame in zip(pairs[0:6:2], pairs[1:6:2])
+                            if (value := ecu.mode02(pid, frame)) is not None)
+            return [b"\x42" + body] if body else []
+        if mode == 0x06 and data and self.is_can and ecu.tests:
+            body = b""
+            for mid in data[:6]:
+                answer = ecu.mode06(mid)
+                if answer is not None:
+                    body += answer if mid % 0x20 else bytes([mid]) + answer
+            return [b"\x46" + body] if body else []
+        if mode in (0x03, 0x07, 0x0A):
+            codes = {0x03: ecu.stored, 0x07: ecu.pending, 0x0A: ecu.permanent}[mode]
+            return self._dtc_payloads(mode + 0x40, codes)
+        if mode == 0x04:
+            ecu.stored.clear()
+            ecu.pending.clear()
+            return [b"\x44"]
+        if mode == 0x09 and data:
+            return self._mode09(ecu, data[0])
+        return []
+
+    def _dtc_payloads(self, service: int, codes: List[str]) -> List[bytes]:
+        raw = b"".join(encode_dtc(c) for c in codes)
+        if self.is_can:
+            return [bytes([service, len(codes)]) + raw]
+        # legacy: three DTCs per message, zero padded
+        chunks = [raw[i:i + 6] for i in range(0, len(raw), 6)] or [b""]
+        return [bytes([service]) + chunk.ljust(6, b"\x00") for chunk in chunks]
+
+    def _mode09(self, ecu: EmulatedECU, pid: int) -> List[bytes]:
+        if pid == 0x00:
+            bits = (1 << 30) | (1 << 22) if ecu.vin else (1 << 22)
+            value = bits.to_bytes(4, "big")
+        elif pid == 0x02 and ecu.vin:
+            value = ecu.vin.encode("ascii")
+        elif pid == 0x0A:
+            value = ecu.name.encode("ascii").ljust(20, b"\x00")
+        else:
+            return []
+        if self.is_can:
+            count = b"" if pid == 0x00 else b"\x01"
+            return [bytes([0x49, pid]) + count + value]
+        # legacy: numbered 4-byte messages, first one padded at the front
+        value = value.rjust(-(-len(value) // 4) * 4, b"\x00")
+        return [bytes([0x49, pid, n + 1]) + value[n * 4:n * 4 + 4] for n in range(len(value) // 4)]
+
+    # ---------------- Framing ----------------
+    def _hex(self, data: bytes) -> str:
+        return (" " if self.spaces else "").join(f"{b:02X}" for b in data)
+
+    def _line(self, header: str, data: bytes) -> str:
+        if not self.headers:
+            return self._hex(data)
+        if self.spaces:
+            head = header if len(header) == 3 else " ".join(header[i:i + 2] for i in range(0, len(header), 2))
+            return f"{head} {self._hex(data)}"
+        return header + self._hex(data)
+
+    def _format(self, ecu: EmulatedECU, payload: bytes) -> List[str]:
+        header = self._response_header(ecu)
+        if not self.is_can:
+            if not self.headers:
+                return [self._hex(payload)]
+            checksum = sum(bytes.fromhex(header) + payload) & 0xFF
+            return [self._line(header, payload + bytes([checksum]))]
+        if len(payload) <= 7:
+            if not self.headers:
+                return [self._hex(payload)]
+            return [self._line(header, bytes([len(payload)]) + payload)]
+
+        if not self.headers:
+            sep = " " if self.spaces else ""
+            lines = [f"{len(payload):03X}", f"0:{sep}{self._hex(payload[:6])}"]
+            rest = payload[6:]
+            for i in range(0, len(rest), 7):
+                lines.append(f"{(i // 7 + 1) & 0xF:X}:{sep}{self._hex(rest[i:i + 7])}")
+            return lines
+
+        lines = [self._line(header, bytes([0x10 | (len(payload) >> 8), len(payload) & 0xFF]) + payload[:6])]
+        rest = payload[6:]
+        for i in range(0, len(rest), 7):
+            lines.append(self._line(header, bytes([0x20 | ((i // 7 + 1) & 0xF)]) + rest[i:i + 7]))
+        return lines
+
+    def _monitor_line(self) -> str:
+        ecu = self.rng.choice(self.ecus)
+        pid = self.rng.choice(sorted(ecu.pids(0)))
+        value = ecu.mode01(pid, time.monotonic() - self._started) or b""
+        saved, self.headers = self.headers, True
+        try:
+            return self._format(ecu, b"\x41" + bytes([pid]) + value)[0]
+        finally:
+            self.headers = saved
+
+    # ---------------- Serving ----------------
+    def serve_pty(self) -> str:
+        """Serve on a new pseudo-terminal; returns the device path to open."""
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self.path = os.ttyname(slave)
+        self._fds = [master, slave]
+        self._start(lambda: master)
+        return self.path
+
+    def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Serve one client at a time on a TCP port (like Wi-Fi ELM327 clones)."""
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.1)
+        self.address = self._server.getsockname()[:2]
+
+        def accept():
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return None
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._fds.append(conn.detach())
+                return self._fds[-1]
+            return None
+
+        self._start(accept)
+        return self.address
+
+    def _start(self, connect):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, args=(connect,), name="ELM327Emulator", daemon=True)
+        self._thread.start()
+
+    def _serve(self, connect):
+        while not self._stop.is_set():
+            fd = connect()
+            if fd is None:
+                return
+            self.reset()
+            self._session(fd)
+            if self._server is None:
+                return                 # a pty has only one "client"
+            os.close(fd)
+            self._fds.remove(fd)
+
+    def _session(self, fd: int):
+        buf = bytearray()
+        while not self._stop.is_set():
+            timeout = 0.01 if self.monitoring else 0.05
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if not ready:
+                if self.monitoring:
+                    self._write(fd, self._monitor_line() + self._eol())
+                continue
+            try:
+                data = os.read(fd, 256)
+            except OSError:
+                return
+            if not data:
+                return
+            if self.monitoring:
+                # any character stops the monitor
+                self.monitoring = False
+                self._write(fd, "STOPPED" + self._eol() + self._eol() + ">")
+                continue
+            buf += data.replace(b"\n", b"")
+            while b"\r" in buf:
+                line, _, rest = bytes(buf).partition(b"\r")
+                buf[:] = rest
+                self._reply(fd, line.decode("ascii", errors="ignore"))
+
+    def _eol(self) -> str:
+        return "\r\n" if self.linefeeds else "\r"
+
+    def _reply(self, fd: int, line: str):
+        echo = line + self._eol() if self.echo else ""
+        reply, delay = self.handle(line)
+        if delay:
+            time.sleep(delay)
+        if self.monitoring:
+            self._write(fd, echo)
+            return
+        eol = self._eol()
+        text = echo + (reply.replace("\r", eol) + eol if reply else "") + eol + ">"
+        self._write(fd, text)
+
+    @staticmethod
+    def _write(fd: int, text: str):
+        try:
+            os.write(fd, text.encode("ascii"))
+        except OSError:
+            pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for fd in self._fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fds = []
+
+    def __enter__(self):
+        if self.path is None and self.address is None:
+            self.serve_pty()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve an emulated ELM327 on a pty or TCP port.")
+    parser.add_argument("--ecus", type=int, default=2)
+    parser.add_argument("--protocol", default="6")
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tcp", type=int, metavar="PORT", help="serve TCP instead of a pty")
+    args = parser.parse_args()
+
+    emulator = ELM327Emulator(ecus=args.ecus, protocol=args.protocol, latency=args.latency,
+                              jitter=args.jitter, error_rate=args.error_rate)
+    if args.tcp is not None:
+        host, port = emulator.serve_tcp(port=args.tcp)
+        print(f"🚗 Emulated ELM327 on tcp://{host}:{port}")
+    else:
+        print(f"🚗 Emulated ELM327 on {emulator.serve_pty()}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emulator.stop()
@@ -1,50 +1,26 @@
 # simulator/dtc_simulator.py
 from __future__ import annotations
-import json, random
-from pathlib import Path
+import random
 from typing import Dict, List, Tuple
 
-# Folder with brand JSONs (e.g., audi.json, bmw.json, volkswagen.json)
-ASSETS_DIR = Path(__file__).resolve().parents[1] / "assets" / "manufacturer_specific_dtc"
+from obd.dtc_index import dtc_index
 
 # In-memory session store: which simulated codes are currently “active” per brand
 _sim_memory: Dict[str, List[str]] = {}
 
 
-def _brand_file(brand: str) -> Path:
-    """Return the JSON path for a brand (lowercased, hyphen/space tolerant)."""
-    fname = brand.strip().lower().replace(" ", "").replace("-", "") + ".json"
-    return ASSETS_DIR / fname
-
-
 def available_brands() -> List[str]:
-    """List brands we can simulate (derived from JSON filenames)."""
-    brands = []
-    if ASSETS_DIR.exists():
-        for p in sorted(ASSETS_DIR.glob("*.json")):
-            name = p.stem
-            # nice title-case for display (volkswagen -> Volkswagen)
-            brands.append(name.capitalize())
-    return brands
+    """List brands we can simulate (derived from the brand table names)."""
+    # nice title-case for display (volkswagen -> Volkswagen)
+    return [name.capitalize() for name in dtc_index().brands()]
 
 
 def _load_dtc_map(brand: str) -> Dict[str, str]:
     """
-    Load the brand's DTC map { "P1234": "Description", ... }.
-    Returns {} if brand file missing / invalid.
+    The brand's DTC map { "P1234": "Description", ... } from the shared
+    DTC index (parsed once). Returns {} if the brand has no table.
     """
-    path = _brand_file(brand)
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        # allow either {"codes": {...}} or flat map for flexibility
-        if isinstance(data, dict) and "codes" in data and isinstance(data["codes"], dict):
-            return {str(k): str(v) for k, v in data["codes"].items()}
-        if isinstance(data, dict):
-            return {str(k): str(v) for k, v in data.items()}
-    except Exception:
-        pass
-    return {}
+    return dtc_index().table(brand)
 
 
 def simulate_read_brand_dtc(brand: str) -> List[Tuple[str, str]]:
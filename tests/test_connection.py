@@ -0,0 +1,861 @@
+import time
+
+import pytest
+
+import utils.profile_store as store
+from adapter.session import AdapterSession, read_until_prompt
+
+
+@pytest.fixture(autouse=True)
+def isolated_profiles(tmp_path, monkeypatch):
+    """Keep adapter/vehicle profiles out of the real config directory."""
+    monkeypatch.setattr(store, "PROFILE_FILE", tmp_path / "profiles.json")
+    monkeypatch.setattr(store, "_cache", None)
+
+
+@pytest.fixture
+def loop_session():
+    """
+    loop_session(name, handler) → AdapterSession on loop://name, served by
+    `handler` (e.g. ELM327Emulator(...).handle). Sessions are closed and
+    their loopbacks unregistered when the test ends.
+    """
+    from adapter.transport import register_loopback, unregister_loopback
+
+    made = []
+
+    def make(name, handler, timeout=1):
+        register_loopback(name, handler)
+        session = AdapterSession(f"loop://{name}", timeout=timeout)
+        made.append((name, session))
+        return session
+
+    yield make
+    for name, session in made:
+        session.close()
+        unregister_loopback(name)
+
+
+class FakeSerial:
+    """Minimal stand-in for serial.Serial that replays scripted replies."""
+
+    def __init__(self, replies, delay=0.0):
+        self.replies = dict(replies)
+        self.delay = delay
+        self.pending = bytearray()
+        self.written = []
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def write(self, data):
+        cmd = data.decode().strip()
+        self.written.append(cmd)
+        reply = self.replies.get(cmd, b"OK\r\r>")
+        if isinstance(reply, list):
+            # scripted sequence; the last reply repeats
+            reply = reply.pop(0) if len(reply) > 1 else reply[0]
+        self.pending += reply
+
+    def read(self, size=1):
+        if not self.pending:
+            time.sleep(0.01)
+            return b""
+        time.sleep(self.delay)
+        out = bytes(self.pending[:size])
+        del self.pending[:size]
+        return out
+
+    def reset_input_buffer(self):
+        self.pending.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeBaudPort:
+    """
+    ELM327/STN stand-in for the baud-rate handshake: answers ATBRD/STBR
+    with OK (or '?'), then sends its ID at the new rate if the host
+    switched to it and `echo` is set.
+    """
+
+    def __init__(self, chip="ELM", accepts=(115200, 230400), echo=True, baudrate=38400):
+        self.chip = chip
+        self.accepts = accepts
+        self.echo = echo
+        self.baudrate = baudrate
+        self.pending = bytearray()
+        self.switch_to = None
+        self.written = []
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def write(self, data):
+        cmd = data.decode().strip()
+        self.written.append(cmd)
+        if cmd == "ATI":
+            self.pending += b"ELM327 v1.5\r\r>" if self.chip else b"?\r\r>"
+        elif cmd == "STI":
+            self.pending += b"STN1110 r4.2\r\r>" if self.chip == "STN" else b"?\r\r>"
+        elif cmd.startswith(("ATBRD", "STBR")):
+            if cmd.startswith("STBR"):
+                baud = int(cmd[4:]) if self.chip == "STN" else None
+            else:
+                baud = round(4_000_000 / int(cmd[5:], 16))
+            match = next((b for b in self.accepts if baud and abs(b - baud) / b < 0.03), None)
+            if match is None:
+                self.pending += b"?\r\r>"
+            else:
+                self.pending += b"OK\r"
+                self.switch_to = match
+        elif cmd == "" and self.switch_to:
+            self.pending += b">"
+            self.switch_to = None
+
+    def read(self, size=1):
+        if self.switch_to and self.baudrate == self.switch_to and self.echo and not self.pending:
+            self.pending += f"{self.chip}327 v1.5\r".encode() if self.chip == "ELM" else b"STN1110\r"
+        if not self.pending:
+            time.sleep(0.005)
+            return b""
+        out = bytes(self.pending[:size])
+        del self.pending[:size]
+        return out
+
+    def reset_input_buffer(self):
+        self.pending.clear()
+
+
+def test_baudrate_handshake_switches_rejects_and_reverts(monkeypatch):
+    from adapter import baudrate
+    from adapter.baudrate import negotiate_baudrate, try_baudrate
+
+    monkeypatch.setattr(baudrate, "BRT_TIMEOUT", 0.05)
+
+    ok = FakeBaudPort()
+    assert try_baudrate(ok, 115200)
+    assert ok.baudrate == 115200 and ok.written[0] == "ATBRD23"
+
+    rejected = FakeBaudPort(accepts=(115200,))
+    assert not try_baudrate(rejected, 500000)
+    assert rejected.baudrate == 38400
+
+    # OK at the old rate, but no ID string at the new one: host side reverts
+    silent = FakeBaudPort(echo=False)
+    assert not try_baudrate(silent, 115200)
+    assert silent.baudrate == 38400
+
+    stn = FakeBaudPort(chip="STN", accepts=(500000,))
+    assert try_baudrate(stn, 500000, stn=True) and stn.written[0] == "STBR500000"
+
+    # fastest accepted rate wins and is remembered for the adapter
+    port = FakeBaudPort(accepts=(115200, 230400))
+    assert negotiate_baudrate(port, "/dev/ttyUSB0") == 230400 == port.baudrate
+    assert store.get_profile("adapters", store.hashed_key("adapter", "/dev/ttyUSB0"))["baudrate"] == 230400
+
+    # a clone without ATBRD/STBR support stays at the default rate
+    clone = FakeBaudPort(accepts=())
+    assert negotiate_baudrate(clone, "/dev/ttyUSB1") == 38400 == clone.baudrate
+    assert all(not cmd.startswith("STBR") for cmd in clone.written)
+
+
+def test_session_reopens_at_the_negotiated_rate(monkeypatch):
+    from adapter import session as session_module
+
+    opened = []
+
+    def fake_open(url, rate, timeout):
+        opened.append(rate)
+        return FakeSerial({"ATI": b"ELM327 v1.5\r\r>"})
+
+    monkeypatch.setattr(session_module, "open_transport", fake_open)
+    monkeypatch.setattr(session_module, "is_serial_url", lambda url: True)
+    monkeypatch.setattr(session_module, "wait_until_ready", lambda ser, limit: True)
+    monkeypatch.setattr(session_module, "negotiate_baudrate", lambda ser, port: 230400)
+    monkeypatch.setattr(session_module, "negotiate", lambda send, port, latency: {"protocol": "6"})
+
+    session = AdapterSession("/dev/ttyUSB0", baudrate=38400, upgrade_baudrate=True)
+    assert session.open()
+    assert session.baudrate == 230400
+    assert session.reopen()
+    assert opened == [38400, 230400]
+    session.reinit()                       # a fresh open starts at the power-up rate again
+    assert opened[-1] == 38400 and session.baudrate == 230400
+
+
+def test_read_returns_at_prompt():
+    ser = FakeSerial({})
+    ser.pending += b"41 0C 1A F8\r\r>"
+    raw, complete = read_until_prompt(ser, timeout=1.0)
+    assert complete
+    assert raw.endswith(b">")
+
+
+def test_read_stops_early_on_terminal_response():
+    ser = FakeSerial({})
+    ser.pending += b"NO DATA\r\r"
+    start = time.monotonic()
+    raw, complete = read_until_prompt(ser, timeout=2.0)
+    assert complete
+    assert b"NO DATA" in raw
+    assert time.monotonic() - start < 0.5
+
+
+def test_read_honours_deadline():
+    ser = FakeSerial({})
+    ser.pending += b"41 0C"
+    raw, complete = read_until_prompt(ser, timeout=0.1)
+    assert not complete
+    assert raw == b"41 0C"
+
+
+def test_session_records_command_timing():
+    session = AdapterSession("fake")
+    session.ser = FakeSerial({"010C": b"41 0C 1A F8\r\r>"})
+    session.initialised = True
+    assert "41 0C" in session.send_command("010C")
+    assert session.timings[-1][0] == "010C"
+    assert session.last_latency < 0.5
+
+
+def test_poller_serves_slow_pids_under_load():
+    from adapter.arbiter import INTERACTIVE
+    from obd.live_poller import LivePoller
+
+    replies = {
+        "0100": b"7E8064100BE3FB813\r\r>",
+        "010C": b"7E804410C1AF8\r\r>",
+        "010D": b"7E803410D28\r\r>",
+        "0105": b"7E803410578\r\r>",
+        "0111": b"7E803411140\r\r>",
+        "010F": b"7E803410F33\r\r>",
+        "0110": b"7E80441100190\r\r>",
+        "010A": b"7E803410A20\r\r>",
+        "0114": b"7E8044114A080\r\r>",
+    }
+    session = AdapterSession("fake")
+    session.ser = FakeSerial(replies, delay=0.002)
+    session.initialised = True
+
+    poller = LivePoller(session=session)
+    samples = []
+    poller.subscribe(samples.append)
+    assert poller.start()
+    time.sleep(1.0)
+    # stop() is called on the Tk thread: it must not wait behind a running job
+    busy = poller.arbiter.submit(lambda s: time.sleep(0.5), INTERACTIVE, name="slow user job")
+    time.sleep(0.05)
+    start = time.monotonic()
+    cleared = poller.stop()
+    assert time.monotonic() - start < 0.1
+    busy.result(timeout=2)
+    cleared.result(timeout=2)
+    assert session.target is None and not poller.running
+
+    seen = {s.label for s in samples}
+    assert {"RPM", "Coolant Temp", "Intake Temp"} <= seen
+    assert poller.achieved_rates()["RPM"] > 0
+
+
+def test_async_driver_over_pty(monkeypatch):
+    import asyncio
+    import os
+    import threading
+
+    import adapter.async_driver as async_driver
+
+    monkeypatch.setattr(async_driver, "SETTLE_TIME", 0)
+    master, slave = os.openpty()
+    replies = {b"ATDPN": b"A6", b"010C": b"7E804410C1AF8", b"03": b"7E80443010133"}
+
+    def fake_elm():
+        buf = b""
+        while True:
+            try:
+                data = os.read(master, 64)
+            except OSError:
+                return
+            buf += data
+            while b"\r" in buf:
+                cmd, buf = buf.split(b"\r", 1)
+                os.write(master, replies.get(cmd, b"OK") + b"\r\r>")
+
+    threading.Thread(target=fake_elm, daemon=True).start()
+
+    async def scenario():
+        async with async_driver.AsyncELM327(os.ttyname(slave), timeout=1) as elm:
+            assert elm.is_can
+            values = await elm.read_pids(["010C"])
+            dtcs = await elm.read_dtcs()
+            return values, dtcs
+
+    values, dtcs = asyncio.run(scenario())
+    os.close(master)
+    assert values == {"010C": 1726}
+    assert dtcs[0]["code"] == "P0133"
+
+
+def test_async_driver_gives_up_a_dropped_or_silent_link(monkeypatch):
+    import asyncio
+    import socket
+    import threading
+
+    import adapter.async_driver as async_driver
+
+    monkeypatch.setattr(async_driver, "SEARCH_TIMEOUT", 0.5)
+    server = socket.create_server(("127.0.0.1", 0))
+    host, port = server.getsockname()
+    replies = {b"ATDPN": b"A6", b"04": b"7E80144"}
+
+    def fake_elm(answer):
+        conn, _ = server.accept()
+        buf = b""
+        while answer:
+            data = conn.recv(64)
+            buf += data
+            while b"\r" in buf:
+                cmd, buf = buf.split(b"\r", 1)
+                if cmd == b"03":
+                    conn.close()            # adapter goes away mid-request
+                    return
+                conn.sendall(replies.get(cmd, b"OK") + b"\r\r>")
+        conn.recv(64)
+        conn.close()
+
+    async def scenario():
+        elm = async_driver.AsyncELM327(f"tcp://{host}:{port}", timeout=0.3)
+        threading.Thread(target=fake_elm, args=(True,), daemon=True).start()
+        assert await elm.open() and elm.is_can
+        assert await elm.clear_dtcs()
+        calls = 0
+        on_readable = elm._on_readable
+
+        def counted():
+            nonlocal calls
+            calls += 1
+            on_readable()
+        elm._loop.remove_reader(elm.ser.fileno())
+        elm._loop.add_reader(elm.ser.fileno(), counted)
+        with pytest.raises(ConnectionError):
+            await elm.read_dtcs()
+        await asyncio.sleep(0.1)
+        assert elm.ser is None and calls <= 2           # no busy loop on the dead socket
+
+        # nothing answers the init sequence: open fails and leaves nothing behind
+        threading.Thread(target=fake_elm, args=(False,), daemon=True).start()
+        assert not await elm.open()
+        assert elm.ser is None
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.close()
+
+
+def test_negotiation_caches_protocol_per_vehicle():
+    from adapter import negotiation
+
+    sent = []
+
+    def send(cmd, timeout=None):
+        sent.append(cmd)
+        if cmd in ("0100", "01002"):
+            return "7E8064100BE3EB811\r7E9064100BE3EB811\r\r>"
+        if cmd == "ATDPN":
+            return "A6\r\r>"
+        return "OK\r\r>"
+
+    first = negotiation.negotiate(send, "/dev/fake", lambda: 0.02)
+    assert first["protocol"] == "6" and not first["cached"]
+    assert "ATSP0" in sent
+    # timing probes wait for both ECUs only, not for the adapter's timeout
+    assert sent.count("01002") == negotiation.PROBE_COUNT
+    assert first["adaptive"] == 2 and first["st"] == negotiation.ST_MIN
+
+    sent.clear()
+    second = negotiation.negotiate(send, "/dev/fake", lambda: 0.02)
+    assert second["cached"]
+    assert sent[0] == "ATSP6" and "ATSP0" not in sent
+
+
+def test_session_targets_one_ecu_and_asks_for_one_reply():
+    from obd.live_diagnostic_commands import read_pids
+
+    session = AdapterSession("fake")
+    session.ser = FakeSerial({"010D1": b"7E803410D28\r\r>"})
+    session.initialised = True
+    session.protocol = "6"
+
+    assert session.target_ecu(0x7E8)
+    assert read_pids(session, ["010D"]) == {"010D": 40}
+    assert session.ser.written[:3] == ["ATSH7E0", "ATCRA7E8", "010D1"]
+
+    session.clear_target()
+    assert session.ser.written[-2:] == ["ATSH7DF", "ATCRA"]
+
+
+def test_supported_pids_are_cached_per_vehicle():
+    from obd.discovery import supported_pids
+
+    session = AdapterSession("fake")
+    session.ser = FakeSerial({"0100": b"7E8064100BE3EB810\r\r>", "0900": b"7E806490054400000\r\r>"})
+    session.initialised = True
+    session.settings = {"protocol": "6", "vehicle": "abc123"}
+
+    first = supported_pids(session)
+    assert "010C" in first["01"][0x7E8]
+    assert first["09"][0x7E8] == ["0902", "0904", "0906", "090A"]
+
+    session.ser.written.clear()
+    assert supported_pids(session) == first
+    assert session.ser.written == []
+
+
+def test_ring_buffer_wraps_without_growing():
+    from adapter.stream import PROMPT, RingBuffer
+
+    ring = RingBuffer(16)
+    assert ring.write(b"7E803410D28\r") == 12
+    assert ring.pop_line() == b"7E803410D28"
+    assert ring.write(b"7E803410D29\r\r>") == 14      # wraps past the end
+    assert ring.pop_line() == b"7E803410D29"
+    assert ring.pop_line() is PROMPT
+    assert len(ring) == 0 and ring.capacity == 16
+
+    ring.write(b"X" * 16)                             # no line end at all
+    assert ring.pop_line() is None and ring.dropped == 16
+
+
+def test_stream_reader_frames_monitor_output_over_pty():
+    import os
+    import tty
+
+    from adapter.stream import StreamReader
+    from obd.framer import FrameAssembler
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+
+    class Port:
+        def fileno(self):
+            return slave
+
+    lines = [b"7E8100A430401330300\r", b"7E82101710102000000\r"] * 50
+    reader = StreamReader(Port(), capacity=64).start()
+    assembler = FrameAssembler("6")
+    frames = []
+    try:
+        for line in lines:
+            os.write(master, line)
+        while len(frames) < 50:
+            line = reader.next_line(timeout=1.0)
+            assert line is not None
+            frames += assembler.feed(line)
+    finally:
+        reader.stop()
+        os.close(master)
+        os.close(slave)
+
+    assert len(frames) == 50
+    assert bytes(frames[-1].payload) == bytes.fromhex("43040133030001710102")
+    assert reader.ring.capacity == 64 and reader.ring.dropped == 0
+
+
+def test_monitor_holds_the_port_until_the_adapter_is_back_at_its_prompt():
+    import threading
+
+    from adapter.stream import monitor
+
+    session = AdapterSession("fake")
+    session.ser = FakeSerial({"ATMA": b"7E8100A430401330300\r7E82101710102000000\r",
+                              "": b"STOPPED\r\r>"})
+    session.initialised = True
+    session.protocol = "6"
+    waited = []
+
+    def interrupt():
+        start = time.monotonic()
+        session.send_command("ATRV")
+        waited.append(time.monotonic() - start)
+
+    frames = []
+    other = threading.Thread(target=interrupt, daemon=True)
+    for frame in monitor(session, duration=0.3):
+        frames.append(frame)
+        if len(frames) == 1:
+            other.start()
+    other.join(timeout=5)
+    assert waited, "the command queued behind the monitor never completed"
+
+    assert [bytes(f.payload).hex() for f in frames] == ["43040133030001710102"]
+    # the other command only ran once the monitor was stopped with a bare CR
+    assert session.ser.written == ["ATMA", "", "ATRV"]
+    assert waited[0] > 0.2
+
+
+def test_arbiter_serves_interactive_jobs_before_background_polling():
+    import threading
+
+    from adapter.arbiter import BACKGROUND, INTERACTIVE, CommandArbiter
+
+    arbiter = CommandArbiter(session=object())
+    gate = threading.Event()
+    order = []
+
+    arbiter.submit(lambda s: gate.wait(1), BACKGROUND, name="in flight")
+    while arbiter.stats()["running"] != "in flight":
+        time.sleep(0.01)
+    polls = [arbiter.submit(lambda s, i=i: order.append(f"poll{i}"), BACKGROUND) for i in range(3)]
+    read = arbiter.submit(lambda s: order.append("read 03"), INTERACTIVE)
+    assert arbiter.stats()["depth_by_priority"] == {"background": 3, "interactive": 1}
+
+    gate.set()
+    read.result(1)
+    for poll in polls:
+        poll.result(1)
+    assert order[0] == "read 03"
+
+    arbiter.pause()
+    held = arbiter.submit(lambda s: "poll", BACKGROUND)
+    assert arbiter.run(lambda s: "clear", INTERACTIVE, timeout=1) == "clear"
+    assert not held.done()
+    arbiter.resume()
+    assert held.result(1) == "poll"
+    assert arbiter.stats()["wait"]["interactive"]["count"] == 2
+
+
+def test_real_stack_runs_against_emulated_elm327(monkeypatch):
+    import adapter.session as session_module
+    from obd.dtc_lookup import DTCHandler
+    from obd.live_diagnostic_commands import fetch_live_data
+    from simulator.elm327_emulator import ELM327Emulator
+
+    monkeypatch.setattr(session_module, "SETTLE_TIME", 0)
+    with ELM327Emulator(ecus=2, latency=0.005, search_time=0.05) as emu:
+        session = AdapterSession(emu.path, timeout=2)
+        try:
+            assert session.open()
+            assert session.protocol == "6" and session.settings["vehicle"]
+
+            data = fetch_live_data(session=session)
+            assert data["Coolant Temp"] == 90 and data["Fuel Pressure"] == 300
+
+            handler = DTCHandler(session=session)
+            assert handler.connect()
+            by_ecu = handler.read_dtc_by_ecu()
+            assert [d["code"] for d in by_ecu[0x7E9]] == ["P0700"]
+            assert handler.clear_dtc()
+            assert handler.read_dtc() == []
+        finally:
+            session.close()
+
+
+@pytest.mark.parametrize("transport", ["tcp", "loop"])
+def test_session_runs_unchanged_over_tcp_and_loopback(transport, loop_session):
+    from obd.live_diagnostic_commands import read_pids
+    from simulator.elm327_emulator import ELM327Emulator
+
+    emu = ELM327Emulator(ecus=2, latency=0.002, search_time=0.01)
+    if transport == "tcp":
+        host, port = emu.serve_tcp()
+        session = AdapterSession(f"tcp://{host}:{port}", timeout=2)
+    else:
+        session = loop_session("test", emu.handle, timeout=2)
+    try:
+        assert session.open()
+        assert session.is_can
+        assert read_pids(session, ["0105", "010A"]) == {"0105": 90, "010A": 300}
+        assert session.timings[-1][1] < 0.5
+    finally:
+        session.close()
+        emu.stop()
+
+
+def test_session_pool_shares_one_session_per_port_and_warns_on_other_settings(capsys):
+    from adapter.session import close_all, get_session, redirect_port
+
+    try:
+        first = get_session("loop://a", baudrate=115200, timeout=5)
+        assert (first.default_baudrate, first.timeout, first.upgrade_baudrate) == (115200, 5, False)
+        assert get_session("loop://a") is first
+        assert get_session("loop://a", baudrate=115200, timeout=5) is first
+        assert capsys.readouterr().out == ""
+
+        # first caller wins; a conflicting request is reported, not applied
+        assert get_session("loop://a", baudrate=38400, upgrade_baudrate=True) is first
+        out = capsys.readouterr().out
+        assert "baudrate=38400" in out and "upgrade_baudrate=True" in out and "timeout" not in out
+        assert (first.default_baudrate, first.upgrade_baudrate) == (115200, False)
+
+        other = get_session("loop://b")
+        assert other is not first and (other.default_baudrate, other.timeout) == (38400, 3)
+        redirect_port("loop://a", "loop://b")
+        assert get_session("loop://a") is other
+        redirect_port("loop://a", "loop://a")
+        assert get_session("loop://a") is first
+    finally:
+        close_all()
+    assert get_session("loop://a") is not first
+    close_all()
+
+
+def test_fast_reconnect_reuses_a_live_port_without_scanning():
+    from adapter import reconnect
+    from adapter.session import DEFAULT_PORT, close_all, get_session, redirect_port
+    from simulator.elm327_emulator import ELM327Emulator
+
+    with ELM327Emulator(latency=0.002, search_time=0.01) as emu:
+        start = time.monotonic()
+        try:
+            assert reconnect.fast_reconnect(["/dev/rfcomm-missing", emu.path]) == emu.path
+            assert time.monotonic() - start < 2
+            assert get_session(DEFAULT_PORT) is get_session(emu.path)
+            assert reconnect.candidate_ports()[0] == emu.path
+        finally:
+            redirect_port(DEFAULT_PORT, DEFAULT_PORT)
+            close_all()
+
+
+def test_bluetooth_scan_stops_at_first_obd2_device():
+    import sys
+
+    from adapter import connection
+
+    fake_ctl = (
+        "import sys\n"
+        "for line in sys.stdin:\n"
+        "    cmd = line.strip()\n"
+        "    if cmd == 'scan on':\n"
+        "        print('[NEW] Device 11:22:33:44:55:66 Headphones')\n"
+        "        print('[\\x1b[0;92mNEW\\x1b[0m] Device 00:1D:A5:68:98:8B OBDII')\n"
+        "    elif cmd.startswith('pair'):\n"
+        "        print('Pairing successful')\n"
+        "    elif cmd.startswith('trust'):\n"
+        "        print('Changing 00:1D:A5:68:98:8B trust succeeded')\n"
+        "    elif cmd.startswith('connect'):\n"
+        "        print('Connection successful')\n"
+        "    sys.stdout.flush()\n"
+    )
+    start = time.monotonic()
+    mac = connection.run_bluetoothctl_and_connect_obd2(command=(sys.executable, "-u", "-c", fake_ctl))
+    assert mac == "00:1D:A5:68:98:8B"
+    assert connection.last_adapter_mac() == mac
+    # one second waiting on the known-devices list, no fixed sleeps otherwise
+    assert time.monotonic() - start < 3
+
+
+def test_bluetooth_failed_connect_is_not_remembered_and_falls_back_to_scan():
+    import sys
+
+    from adapter import connection
+
+    fake_ctl = (
+        "import sys\n"
+        "reachable = sys.argv[1]\n"
+        "for line in sys.stdin:\n"
+        "    cmd = line.strip()\n"
+        "    if cmd == 'devices':\n"
+        "        print('Device AA:AA:AA:AA:AA:AA OBDII')\n"
+        "    elif cmd == 'scan on' and reachable != 'none':\n"
+        "        print('[NEW] Device BB:BB:BB:BB:BB:BB OBDLink MX+')\n"
+        "    elif cmd.startswith('pair'):\n"
+        "        print('Failed to pair: org.bluez.Error.AlreadyExists')\n"
+        "    elif cmd.startswith('trust'):\n"
+        "        print('Changing trust succeeded')\n"
+        "    elif cmd.startswith('connect'):\n"
+        "        ok = cmd.endswith(reachable)\n"
+        "        print('Connection successful' if ok else 'Failed to connect: org.bluez.Error.Failed')\n"
+        "    sys.stdout.flush()\n"
+    )
+    command = (sys.executable, "-u", "-c", fake_ctl)
+
+    # saved adapter out of range, nothing else around: no MAC, nothing stored
+    assert connection.run_bluetoothctl_and_connect_obd2(timeout=0.5, command=command + ("none",)) is None
+    assert connection.last_adapter_mac() is None
+
+    # saved adapter out of range, another one found by the scan
+    mac = connection.run_bluetoothctl_and_connect_obd2(timeout=2, command=command + ("BB:BB:BB:BB:BB:BB",))
+    assert mac == "BB:BB:BB:BB:BB:BB"
+    assert connection.last_adapter_mac() == mac
+
+
+def test_bad_replies_get_the_cheapest_fix_within_the_cycle_budget():
+    from adapter.recovery import BUS_ERROR, classify
+    from obd.live_diagnostic_commands import read_pids
+
+    assert classify("010D", b"BUFFER FULL\r\r>", True) == "buffer_full"
+    assert classify("010D", b"NO DATA\r\r>", True) == "no_data"
+    assert classify("010D", b"41 0D \xff\x00\r\r>", True) == "garbage"
+    assert classify("010D", b"7E8 06 41", False) == "timeout"
+
+    session = AdapterSession("fake")
+    session.ser = FakeSerial({"010D": [b"CAN ERROR\r\r>", b"BUS INIT: ...ERROR\r\r>",
+                                       b"7E803410D28\r\r>"]})
+    session.initialised = True
+    session.protocol = "6"
+    assert read_pids(session, ["010D"]) == {"010D": 40}
+    # retry first, then ATPC for the bus init error
+    assert session.ser.written == ["010D", "010D", "ATPC", "010D"]
+
+    session.recovery.budget = 2
+    session.new_cycle()
+    session.ser.replies["010D"] = [b"CAN ERROR\r\r>"]
+    session.ser.written.clear()
+    assert read_pids(session, ["010D"]) == {}
+    assert session.ser.written == ["010D", "010D", "ATPC", "010D"]
+    session.ser.written.clear()
+    read_pids(session, ["010D"])
+    assert session.ser.written == ["010D"]          # budget spent until the next cycle
+    assert session.recovery.errors[BUS_ERROR] == 3
+    assert session.recovery.given_up == 2
+
+
+def test_session_reopens_a_dropped_link_and_replays_setup(loop_session):
+    from obd.live_diagnostic_commands import read_pids
+    from simulator.elm327_emulator import ELM327Emulator
+
+    emu = ELM327Emulator(ecus=2, latency=0.0, search_time=0.01)
+    session = loop_session("drop", emu.handle)
+    assert session.open()
+    session.target_ecu(0x7E8)
+    session.ser.close()                      # link lost under the session
+    assert "010D" in read_pids(session, ["010D"])
+    assert session.recovery.fixes["reopen"] == 1
+    assert session.is_healthy() and session.target == 0x7E8
+
+    # a full reinit keeps the target and does not refill the cycle budget
+    session.target_ecu(0x77D, 0x713)
+    session.recovery.remaining = 1
+    assert session.reinit()
+    assert (session.target, session.target_header) == (0x77D, 0x713)
+    assert [cmd for cmd, _ in session.timings][-2:] == ["ATFCSD300000", "ATFCSM1"]
+    assert session.recovery.remaining == 1
+
+
+def test_dtc_snapshot_reads_all_three_lists_per_ecu_on_one_session(loop_session):
+    from obd.dtc_lookup import DTCHandler
+    from simulator.elm327_emulator import ELM327Emulator
+
+    emu = ELM327Emulator(ecus=2, latency=0.02, search_time=0.01)
+    emu.ecus[1].pending = ["P0715"]
+    session = loop_session("snapshot", emu.handle)
+    handler = DTCHandler(session=session)
+    assert handler.connect()
+    handler.read_snapshot()             # first one discovers the ECUs
+    snapshot = handler.read_snapshot()
+
+    engine, gearbox = snapshot[0x7E8], snapshot[0x7E9]
+    assert engine["mil"] and engine["dtc_count"] == 2
+    assert [d["code"] for d in engine["stored"]] == ["P0133", "P0300"]
+    assert [d["code"] for d in engine["permanent"]] == ["P0133", "P0300"]
+    assert engine["pending"] == []
+    assert [d["code"] for d in gearbox["pending"]] == ["P0715"]
+    # every request carries the response count, none waits out the timer
+    assert [cmd for cmd, _ in session.timings][-4:] == ["01012", "032", "072", "0A2"]
+
+
+def test_brand_scan_walks_every_module_on_one_session(monkeypatch, loop_session):
+    from obd import mode22_support
+    from obd.mode22_support import read_brand_dtcs, scan_brand
+    from simulator.elm327_emulator import ELM327Emulator
+
+    monkeypatch.setattr(mode22_support, "PENDING_WAIT", 0.0)
+    emu = ELM327Emulator(ecus=1, latency=0.0, search_time=0.01)
+    modules = {
+        "7E0": {"19020D": "7E8075902FF1101002F"},               # availability mask FF, P1101-00 + status
+        "713": {"19020D": "77D037F1911",                        # UDS not supported → KWP
+                "1802FF00": "77D055801C12308"},                 # U0123 confirmed
+        # response pending, then the final answer to the repeated request
+        "714": {"19020D": ["77E037F1978", "77E0759020F9A0F0008"]},
+        "715": {"19020D": "77F037F1922", "1802FF00": "77F037F1822"},  # answers, reads nothing
+    }
+    header = {"id": "7DF"}
+
+    def handler(cmd):
+        if cmd.startswith("ATSH"):
+            header["id"] = cmd[4:]
+        if cmd in ("19020D", "1802FF00"):
+            reply = modules.get(header["id"], {}).get(cmd)
+            if isinstance(reply, list):
+                reply = reply.pop(0) if len(reply) > 1 else reply[0]
+            return reply or "NO DATA", 0.0
+        return emu.handle(cmd)
+
+    session = loop_session("brand", handler)
+    assert session.open()
+    found = scan_brand(session, "Audi")
+    assert set(found) == {"Engine", "ABS/ESP", "Instruments", "Airbag"}
+    assert found["Instruments"][0]["code"] == "B1A0F" and found["Airbag"] == []
+    engine = found["Engine"][0]
+    assert engine["code"] == "P1101" and engine["ftb"] == 0
+    assert "confirmed" in engine["flags"]
+    assert engine["desc"].startswith("O2 Sensor")             # from the Audi table
+    assert found["ABS/ESP"][0]["code"] == "U0123"
+    sent = [cmd for cmd, _ in session.timings]
+    assert "ATFCSH713" in sent and sent[-1] == "ATFCSM0"    # flow control restored
+    assert session.target is None
+
+    codes = read_brand_dtcs("Audi", elm_adapter=session)
+    assert ("P1101", found["Engine"][0]["desc"] + " [Engine]") in codes
+
+
+def test_freeze_frames_are_found_read_and_attached_to_stored_codes(loop_session):
+    from obd.dtc_lookup import DTCHandler
+    from obd.freeze_frame import freeze_frame_requests
+    from simulator.elm327_emulator import ELM327Emulator
+
+    assert freeze_frame_requests([0x0C, 0x0D, 0x05, 0x11], 0, can=True) == ["020C000D000500", "021100"]
+
+    emu = ELM327Emulator(ecus=2, latency=0.0, search_time=0.01)
+    session = loop_session("freeze", emu.handle)
+    handler = DTCHandler(session=session)
+    assert handler.connect()
+    snapshot = handler.read_snapshot(freeze_frames=True)
+    p0133, p0300 = snapshot[0x7E8]["stored"]
+    frame = p0133["freeze_frame"]
+    assert frame["frame"] == 0 and frame["dtc"] == "P0133"
+    assert frame["values"]["0205"] == 90 and frame["values"]["020A"] == 300
+    assert "0202" not in frame["values"]
+    assert "freeze_frame" not in p0300
+    assert snapshot[0x7E9]["stored"][0]["freeze_frame"]["values"]["020D"] is not None
+
+    # the Mode 02 support chain is cached after the first read
+    session.timings.clear()
+    handler.read_freeze_frames()
+    assert not any(cmd.startswith("020000") for cmd, _ in session.timings)
+
+
+def test_readiness_and_mode06_results_in_one_pass(loop_session):
+    from obd.dtc_lookup import DTCHandler
+    from obd.readiness import inspection_ready, summarize
+    from simulator.elm327_emulator import ELM327Emulator
+
+    emu = ELM327Emulator(ecus=2, latency=0.0, search_time=0.01)
+    session = loop_session("ready", emu.handle)
+    handler = DTCHandler(session=session)
+    assert handler.connect()
+    report = handler.read_readiness()
+    engine = report[0x7E8]
+    assert engine["ignition"] == "spark" and engine["mil"] and engine["dtc_count"] == 2
+    assert set(engine["monitors"]) == {"Misfire", "Fuel System", "Components", "Catalyst",
+                                       "Evaporative System", "Oxygen Sensor", "Oxygen Sensor Heater"}
+    assert all(state["complete"] for state in engine["monitors"].values())
+    assert engine["drive_cycle"]["Evaporative System"] == {"enabled": True, "complete": False}
+    assert report[0x7E9]["drive_cycle"] is None
+
+    o2 = [t for t in engine["tests"] if t["mid"] == 0x01]
+    assert o2[0]["value"] == 0.45 and o2[0]["unit"] == "V" and o2[0]["passed"]
+    assert {t["mid"] for t in engine["tests"]} == {0x01, 0x21, 0xA2}
+    assert not inspection_ready(engine)                  # MIL is on
+    assert summarize(report)["failed_tests"] == []
+
+    # second pass: cached OBDMIDs, one request for both PIDs
+    session.timings.clear()
+    handler.read_readiness()
+    sent = [cmd for cmd, _ in session.timings]
+    assert sent[0] == "0101412" and "0600" not in "".join(sent)
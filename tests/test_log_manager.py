@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+
+import utils.log_manager as log_manager
+from utils.log_manager import SessionWriter
+
+
+def test_session_writer_batches_in_background_and_drops_under_overload(tmp_path):
+    path = tmp_path / "session.jsonl"
+    writer = SessionWriter(path, batch_size=100, flush_interval=0.05)
+    start = time.perf_counter()
+    for i in range(1000):
+        assert writer.write({"results": {"RPM": i}, "dtcs": []})
+    assert time.perf_counter() - start < 0.5       # producers never touch the disk
+    assert writer.flush(timeout=5)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["results"]["RPM"] for line in lines] == list(range(1000))
+    assert writer.stats()["batches"] <= 20
+
+    # a single record still reaches the disk after the flush interval
+    writer.write({"results": {"RPM": -1}, "dtcs": []})
+    time.sleep(0.3)
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1001
+    writer.close()
+
+    # full queue: new records are counted as dropped, queued ones drain on close
+    slow = SessionWriter(tmp_path / "slow.jsonl", queue_limit=5, batch_size=100, flush_interval=60)
+    accepted = [slow.write({"n": i}) for i in range(8)]
+    assert accepted == [True] * 5 + [False] * 3
+    slow.close()
+    assert slow.stats() == {"queued": 0, "written": 5, "dropped": 3, "batches": 1, "errors": 0}
+    assert not slow.write({"n": 9})
+
+
+def test_exit_export_waits_for_a_writer_that_is_still_writing(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    class StuckWriter(SessionWriter):
+        def _write_batch(self, batch):
+            release.wait(5)
+            return super()._write_batch(batch)
+
+    runtime = tmp_path / "runtime"
+    runtime.mkdir()
+    writer = StuckWriter(runtime / "diagnostic_log.jsonl", flush_interval=0.01)
+    writer.write({"timestamp": "t", "results": {"RPM": 800}, "dtcs": []})
+    monkeypatch.setattr(log_manager, "RUNTIME_DIR", runtime)
+    monkeypatch.setattr(log_manager, "JSONL", writer.path)
+    monkeypatch.setattr(log_manager, "CLOSE_TIMEOUT", 0.1)
+    monkeypatch.setattr(log_manager, "_enabled", True)
+    monkeypatch.setattr(log_manager, "_writer", writer)
+    try:
+        log_manager._export_and_purge()
+        # neither converted nor deleted while the worker is appending
+        assert runtime.exists() and not (runtime / "session.csv").exists()
+    finally:
+        release.set()
+    assert writer.close(timeout=5)
+    assert json.loads(writer.path.read_text(encoding="utf-8"))["results"] == {"RPM": 800}
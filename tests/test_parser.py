@@ -1 +1,302 @@
-#new tests
\ No newline at end of file
+from obd.live_diagnostic_commands import (
+    build_pid_batches,
+    split_multi_pid_response,
+)
+
+
+def test_build_pid_batches_packs_six_per_request():
+    cmds = ["010C", "010D", "0105", "0111", "010F", "0110", "010A"]
+    assert build_pid_batches(cmds) == ["010C0D05110F10", "010A"]
+
+
+def test_split_single_frame_multi_pid_reply():
+    raw = "7E8064105780D28\r\r>"
+    assert split_multi_pid_response(raw) == {"05": "78", "0D": "28"}
+
+
+def test_split_multi_frame_multi_pid_reply():
+    raw = (
+        "7E8100C410C1AF80D28\r"
+        "7E821057811400F3300\r\r>"
+    )
+    assert split_multi_pid_response(raw) == {
+        "0C": "1AF8", "0D": "28", "05": "78", "11": "40", "0F": "33",
+    }
+
+
+def test_pid_table_covers_mode01_and_compiles_formulas():
+    from obd.pid_table import PID_TABLE, decode_pid
+
+    assert len([k for k in PID_TABLE if k[0] == 0x01]) > 100
+    assert decode_pid(0x0C, b"\x1a\xf8") == 1726
+    assert decode_pid(0x05, b"\x78") == 80
+    assert decode_pid(0x32, b"\xff\xfc") == -1
+    assert decode_pid(0x0C, b"\x1a") is None
+
+
+def test_multi_value_pids_expose_every_quantity():
+    from obd.pid_table import decode_mode01_payload, decode_pid, decode_values
+
+    assert decode_values(0x4F, bytes([0x02, 0x05, 0x80, 0x19])) == {
+        "Maximum equivalence ratio": 2, "Maximum oxygen sensor voltage": 5,
+        "Maximum oxygen sensor current": 128, "Maximum intake manifold absolute pressure": 250}
+    assert decode_values(0x55, bytes([0x80, 0x40])) == {"Bank 1": 0.0, "Bank 3": -50.0}
+    assert decode_values(0x0C, b"\x1a\xf8") == {"Engine speed": 1726.0}
+    assert decode_pid(0xA4, bytes([0x01, 0x30, 0x0C, 0x1C])) == 3
+    # a 7-byte PID 68 no longer stops the split of a multi-PID reply
+    payload = bytes.fromhex("41 68 01 5A 00 00 00 00 00 0C 1A F8".replace(" ", ""))
+    assert decode_mode01_payload(payload) == {0x68: 50, 0x0C: 1726}
+
+
+def test_pid_table_covers_j1979_long_records():
+    from obd.pid_table import PID_TABLE, decode_mode01_payload, decode_values
+
+    missing = [pid for pid in range(0x00, 0xA7) if (0x01, pid) not in PID_TABLE]
+    assert missing == [0x95, 0x96, 0x97]
+    run_time = bytes([0x07]) + (3600).to_bytes(4, "big") + (600).to_bytes(4, "big") + bytes(4)
+    assert decode_values(0x7F, run_time) == {"Total": 3600, "Idle": 600, "PTO": 0}
+    # AECD timers run past byte Z: AECD #5 timer 2 is bytes AL-AO
+    aecd = bytes(37) + (42).to_bytes(4, "big")
+    assert decode_values(0x81, aecd)["AECD #5 timer 2"] == 42
+    payload = bytes([0x41, 0x7F]) + run_time + bytes([0x0C, 0x1A, 0xF8])
+    assert decode_mode01_payload(payload) == {0x7F: 3600, 0x0C: 1726}
+
+
+def test_temperature_parser_only_accepts_its_own_pid():
+    from obd.live_diagnostic_commands import PID_MAP
+
+    coolant_parser = PID_MAP["Coolant Temp"][1]
+    assert coolant_parser("7E803410F33\r\r>") is None
+    assert coolant_parser("7E803410578\r\r>") == 80
+
+
+def test_decode_mode01_payload_splits_multi_pid_reply():
+    from obd.pid_table import decode_mode01_payload
+
+    payload = bytes.fromhex("410C1AF80D28")
+    assert decode_mode01_payload(payload) == {0x0C: 1726, 0x0D: 40}
+
+
+def test_framer_reassembles_isotp_vin_reply():
+    from obd.framer import parse_frames
+
+    raw = (
+        b"7E8101449020131443447\r"
+        b"7E82150303052353542\r"
+        b"7E822313233343536\r\r>"
+    )
+    frames = parse_frames(raw, "6")
+    assert len(frames) == 1
+    assert frames[0].ecu == 0x7E8
+    assert frames[0].service == 0x49
+    assert bytes(frames[0].data(3)) == b"1D4GP00R55B123456"
+
+
+def test_framer_headers_off_segments_and_legacy_headers():
+    from obd.framer import parse_frames
+
+    segmented = parse_frames("014\r0: 49 02 01 31 44 34\r1: 47 50 30 30 52 35 35\r2: 42 31 32 33 34 35 36\r\r>")
+    assert bytes(segmented[0].data(3)) == b"1D4GP00R55B123456"
+
+    legacy = parse_frames("48 6B 10 41 0C 1A F8 A1\r\r>", "3")
+    assert legacy[0].ecu == 0x10
+    assert bytes(legacy[0].payload) == bytes.fromhex("410C1AF8")
+
+
+def test_dtc_parser_handles_headers_and_multi_frame_lists():
+    from obd.dtc_lookup import parse_dtc_response
+
+    raw = (
+        "7E8100A430401330300\r"
+        "7E82101710102000000\r\r>"
+    )
+    codes = [d["code"] for d in parse_dtc_response(raw, "6")]
+    assert codes == ["P0133", "P0300", "P0171", "P0102"]
+
+    legacy = "48 6B 10 43 01 33 00 00 00 00 5C\r\r>"
+    assert [d["code"] for d in parse_dtc_response(legacy, "3")] == ["P0133"]
+
+
+def test_replies_are_demultiplexed_per_ecu():
+    from obd.dtc_lookup import parse_dtc_response_by_ecu
+    from obd.live_diagnostic_commands import (
+        decode_reply_by_ecu,
+        parse_supported_pids_by_ecu,
+    )
+
+    supported = parse_supported_pids_by_ecu("7E8064100BE3EB811\r7E906410080000001\r\r>", "6")
+    assert set(supported) == {0x7E8, 0x7E9}
+    assert "010C" in supported[0x7E8] and "010C" not in supported[0x7E9]
+
+    dtcs = parse_dtc_response_by_ecu("7E80443010133\r7E90443010700\r\r>", "6")
+    assert [d["code"] for d in dtcs[0x7E8]] == ["P0133"]
+    assert [d["code"] for d in dtcs[0x7E9]] == ["P0700"]
+
+    values = decode_reply_by_ecu("7E803410D28\r7E903410D29\r\r>", "6")
+    assert values == {0x7E8: {"010D": 40}, 0x7E9: {"010D": 41}}
+
+
+def test_support_chain_is_followed_per_ecu():
+    from obd.discovery import discover_mode, parse_support_reply
+
+    replies = {
+        "010020406080A0": (
+            "7E810104100BE3EB811\r"
+            "7E8212080000001400000\r"
+            "7E822000000\r"
+            "7E906410080000000\r\r>"
+        ),
+    }
+    sent = []
+
+    def send(cmd):
+        sent.append(cmd)
+        return replies.get(cmd, "NO DATA\r\r>")
+
+    support = discover_mode(send, "01", "6", can=True)
+    assert sent == ["010020406080A0", "01C0E0"]
+    assert support[0x7E9] == ["0101"]
+    assert "0121" in support[0x7E8] and "0140" in support[0x7E8]
+
+    legacy = parse_support_reply("48 6B 10 49 00 01 54 40 00 00 5C\r\r>", "09", "3")
+    assert legacy == {0x10: {0x00: 0x54400000}}
+
+
+def test_emulated_multi_frame_replies_parse_with_headers_on_and_off():
+    from obd.framer import frames_for_service, parse_frames
+    from simulator.elm327_emulator import DEFAULT_VIN, ELM327Emulator
+
+    emu = ELM327Emulator(ecus=2)
+    for cmd in ("ATE0", "ATS0", "ATSP6"):
+        emu.handle(cmd)
+    for headers in ("ATH1", "ATH0"):
+        emu.handle(headers)
+        reply, _ = emu.handle("0902")
+        frames = frames_for_service(parse_frames(reply, "6"), 0x49)
+        assert bytes(frames[0].data(3)).decode() == DEFAULT_VIN
+
+
+def test_dtc_index_layers_brand_codes_and_answers_prefix_queries(tmp_path):
+    import json
+    import os
+    from obd.dtc_index import DTCIndex, dtc_index
+    from obd.mode22_support import _load_brand_table
+    from simulator.simulator_brand_specific import _load_dtc_map
+
+    generic = tmp_path / "dtc_db.json"
+    generic.write_text(json.dumps({"P0300": "Random Misfire", "P0301": "Cylinder 1 Misfire",
+                                   "P0420": "Catalyst Efficiency", "P1101": "Generic text"}))
+    (tmp_path / "brands").mkdir()
+    brand = tmp_path / "brands" / "audi.json"
+    brand.write_text(json.dumps({"dtcs": {"P1101": "O2 Sensor Circ. Voltage too Low",
+                                          "P0302": "Cylinder 2 Misfire (Audi)"}}))
+    index = DTCIndex(generic, tmp_path / "brands")
+
+    assert index.lookup("p0300") == "Random Misfire"
+    assert index.lookup("P1101", brand="Audi") == "O2 Sensor Circ. Voltage too Low"
+    assert index.lookup("P1101", brand="bmw") == "Generic text"
+    assert [c for c, _ in index.prefix("P03xx")] == ["P0300", "P0301"]
+    assert [c for c, _ in index.prefix("P03", brand="audi")] == ["P0300", "P0301", "P0302"]
+    assert [c for c, _ in index.range("P0301", "P0420")] == ["P0301", "P0420"]
+    assert index.table("audi") is index.table("AUDI")          # parsed once
+    # no brand means no brand table; the generic one has its own accessor
+    assert index.table("") == {} and index.table(None) == {}
+    assert index.generic()["P0420"] == "Catalyst Efficiency"
+
+    generic.write_text(json.dumps({"P0300": "Changed"}))
+    os.utime(generic, ns=(0, 0))
+    assert index.refresh() == [""]
+    assert index.lookup("P0300") == "Changed"
+
+    # the shipped brand tables are wrapped in "dtcs"
+    assert dtc_index().lookup("P1101", brand="audi")
+    assert _load_brand_table("") == {} and _load_dtc_map("") == {}
+    assert _load_brand_table("audi") is _load_dtc_map("Audi")
+
+
+def test_dtc_search_ranks_symptom_words_and_filters_by_brand():
+    import time
+    from obd.dtc_index import dtc_index
+
+    index = dtc_index()
+    hits = index.search("camshaft pos")
+    assert hits and all("camshaft" in m.desc.lower() and "pos" in m.desc.lower() for m in hits)
+
+    audi = index.search("misfire", brand="Audi")
+    assert audi and {m.brand for m in audi} <= {"", "audi"}
+    assert any(m.brand == "audi" for m in audi)
+    codes = [m.code for m in index.search("p110", brand="audi")]
+    assert codes and all(code.startswith("P110") for code in codes)
+    assert index.search("no such symptom xyz") == []
+
+    # first keystrokes match most of the vocabulary and must stay fast too
+    short = index.search("c", brand="audi")
+    assert len(short) == 50 and {m.brand for m in short} <= {"", "audi"}
+    assert [m.score for m in short] == sorted((m.score for m in short), reverse=True)
+    for query in ("evap le", "p", "c", "s"):
+        start = time.perf_counter()
+        for _ in range(100):
+            index.search(query)
+        assert (time.perf_counter() - start) / 100 < 0.001, query
+
+
+def test_readiness_bits_and_mode06_scaling():
+    from obd.readiness import decode_monitor_status, decode_test_records
+
+    diesel = decode_monitor_status(bytes([0x00, 0x0F, 0xC1, 0x40]))
+    assert diesel["ignition"] == "compression" and not diesel["mil"]
+    assert diesel["monitors"]["PM Filter"] == {"supported": True, "complete": False}
+    assert diesel["monitors"]["NMHC Catalyst"]["complete"]
+
+    # signed °C (0x96) below its minimum fails
+    record = bytes([0x46, 0x21, 0x80, 0x96, 0xFF, 0x9C, 0x00, 0x00, 0x03, 0xE8])
+    test = decode_test_records(record)[0]
+    assert test["value"] == -10.0 and test["unit"] == "°C" and not test["passed"]
+
+
+def test_readiness_verdict_and_incomplete_list_agree():
+    from obd.readiness import decode_monitor_status, inspection_ready, summarize
+
+    # misfire (continuous) still running, catalyst done, MIL off
+    entry = dict(decode_monitor_status(bytes([0x00, 0x17, 0x01, 0x00])), tests=[])
+    assert inspection_ready(entry)
+    assert summarize({0x7E8: entry}) == {"ready": True, "mil": False, "incomplete": [], "failed_tests": []}
+
+    entry = dict(decode_monitor_status(bytes([0x00, 0x17, 0x01, 0x01])), tests=[])
+    assert not inspection_ready(entry)
+    assert summarize({0x7E8: entry})["incomplete"] == ["Catalyst"]
+
+
+def test_bulk_decode_matches_per_sample_decoders():
+    import numpy as np
+
+    from obd.bulk_decode import decode_dtc_words, decode_pids, pack_payloads
+    from obd.dtc_lookup import dtc_from_bytes
+    from obd.pid_table import decode_pid
+
+    samples = [(0x0C, b"\x1a\xf8"), (0x05, b"\x78"), (0x01, b"\x83\x07\xe1\x00"),
+               (0x0C, b"\x0b"), (0xFF, b"\x01"), (0x10, b"\x01\x90"), (0x0C, b"\x0b\xb8")]
+    data, lengths = pack_payloads(p for _, p in samples)
+    values = decode_pids([pid for pid, _ in samples], data, lengths)
+    for value, (pid, payload) in zip(values, samples):
+        expected = decode_pid(pid, payload)
+        assert np.isnan(value) if expected is None else value == expected
+    rpm = decode_pids(0x0C, pack_payloads([b"\x1a\xf8", b"\x0b\xb8"])[0])
+    assert rpm.tolist() == [1726.0, 750.0]
+
+    words = [0x0133, 0xC101, 0x0000, 0x9A4F, 0x4123]
+    assert decode_dtc_words(words).tolist() == [dtc_from_bytes(w >> 8, w & 0xFF) for w in words]
+    assert decode_dtc_words(bytes.fromhex("01330000C101")).tolist() == ["P0133", "", "U0101"]
+
+
+def test_brand_profiles_are_cached_per_file(tmp_path):
+    import json
+
+    from obd.mode22_support import BRAND_PROFILE_FILE, _load_profiles
+
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    first.write_text(json.dumps({"default": {"layouts": ["uds_19_02"]}}), encoding="utf-8")
+    second.write_text(json.dumps({"default": {"layouts": ["kwp_18_02"]}}), encoding="utf-8")
+    assert _load_profiles(first)["default"]["layouts"] == ["uds_19_02"]
+    assert _load_profiles(second)["default"]["layouts"] == ["kwp_18_02"]
+    assert "brands" in _load_profiles(BRAND_PROFILE_FILE)
@@ -1,5 +1,6 @@
 # utils/log_manager.py
-import os, json, csv, datetime, logging, shutil, atexit, tempfile
+import os, json, csv, datetime, logging, shutil, atexit, tempfile, threading, time
+from collections import deque
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
@@ -8,17 +9,167 @@ RUNTIME_DIR = Path(tempfile.gettempdir()) / "librediag_runtime"  # OS temp
 JSONL = RUNTIME_DIR / "diagnostic_log.jsonl"
 DEBUG = RUNTIME_DIR / "debug.log"
 _enabled = False
+_writer: "SessionWriter | None" = None
+
+# Session records wait in memory until a batch is full or FLUSH_INTERVAL
+# has passed; past QUEUE_LIMIT new records are dropped, never waited on.
+QUEUE_LIMIT = 10_000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0    # seconds
+# How long the exit hook waits for the writer to drain
+CLOSE_TIMEOUT = 5.0
 
 # -----------------------------------------------------------------------
-def configure_logging(enable: bool):
-    global _enabled
+class SessionWriter:
+    """
+    Appends session records to a JSONL file from a background thread.
+
+    write() only queues the record, so the live poller never waits for
+    json.dumps or the disk; the thread writes whole batches with one
+    write() (and one fsync, if asked). When the queue is full the record
+    is dropped and counted in stats() instead of stalling the caller.
+    """
+
+    def __init__(self, path: Path, fsync: bool = False, queue_limit: int = QUEUE_LIMIT,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.queue_limit = queue_limit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._queued = 0          # records accepted so far
+        self._done = 0            # records written or given up on
+        self._flush_now = False
+        self._closed = False
+        self._worker = None
+        self._file = None
+        self.written = self.dropped = self.batches = self.errors = 0
+
+    # ---------------- Producers ----------------
+    def write(self, record: dict) -> bool:
+        """Queue one record; False if it was dropped (queue full or closed)."""
+        with self._cond:
+            if self._closed or len(self._pending) >= self.queue_limit:
+                self.dropped += 1
+                return False
+            self._pending.append(record)
+            self._queued += 1
+            self._ensure_worker()
+            # wake the thread to start the flush timer, or for a full batch
+            if len(self._pending) in (1, self.batch_size):
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until everything queued so far has been written."""
+        with self._cond:
+            target = self._queued
+            self._flush_now = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._done >= target or not (self._worker and self._worker.is_alive()),
+                timeout)
+
+    def close(self, timeout: float | None = CLOSE_TIMEOUT) -> bool:
+        """
+        Drain the queue, then stop the thread and close the file. False if
+        the thread was still writing when `timeout` ran out.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+            return not worker.is_alive()
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._pending),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "errors": self.errors,
+            }
+
+    # ---------------- Worker ----------------
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="SessionWriter", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> tuple[list, bool]:
+        """Wait for a full batch, the flush interval, flush() or close()."""
+        with self._cond:
+            deadline = None
+            while not (self._closed or self._flush_now or len(self._pending) >= self.batch_size):
+                if self._pending:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    elif time.monotonic() >= deadline:
+                        break
+                self._cond.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.batch_size))]
+            if not self._pending:
+                self._flush_now = False
+            return batch, self._closed and not self._pending
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            written, failed = self._write_batch(batch) if batch else (0, False)
+            with self._cond:
+                # counters are shared with producers, so only touch them under the lock
+                self.written += written
+                self.dropped += len(batch) - written
+                self.batches += 1 if written else 0
+                self.errors += 1 if failed else 0
+                self._done += len(batch)
+                self._cond.notify_all()
+            if stop:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write_batch(self, batch: list) -> tuple[int, bool]:
+        """Write one batch; (records written, whether the write failed)."""
+        lines = []
+        for record in batch:
+            try:
+                lines.append(json.dumps(record) + "\n")
+            except (TypeError, ValueError):
+                pass            # not serializable: counted as dropped
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError as exc:
+            logging.warning(f"Session log write failed: {exc}")
+            return 0, True
+        return len(lines), False
+
+# -----------------------------------------------------------------------
+def configure_logging(enable: bool, fsync: bool = False):
+    global _enabled, _writer
     _enabled = enable
 
     if not enable:
         logging.disable(logging.CRITICAL)
         return
 
+    if _writer is not None:
+        _writer.close()
     _fresh_runtime_dir()
+    _writer = SessionWriter(JSONL, fsync=fsync)
 
     handler = RotatingFileHandler(DEBUG, maxBytes=1_000_000, backupCount=3)
     logging.basicConfig(
@@ -31,16 +182,15 @@ def configure_logging(enable: bool):
     atexit.register(_export_and_purge)
 
 def save_session(results: dict, dtcs: list | None):
-    if not _enabled:
+    """Queue one record for the session log; never waits on the disk."""
+    if not _enabled or _writer is None:
         return
-    JSONL.write_text("", encoding="utf-8") if not JSONL.exists() else None
     payload = {
         "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
-        "results": results,
-        "dtcs": dtcs or []
+        "results": dict(results),   # the caller may keep updating its dict
+        "dtcs": list(dtcs or [])
     }
-    with open(JSONL, "a", encoding="utf-8") as f:
-        f.write(json.dumps(payload) + "\n")
+    _writer.write(payload)
 
 # -----------------------------------------------------------------------
 def _fresh_runtime_dir():
@@ -56,6 +206,20 @@ def _export_and_purge():
     if not _enabled:
         return
 
+    # drain queued records to disk before converting them
+    if _writer is not None:
+        stopped = _writer.close(CLOSE_TIMEOUT)
+        stats = _writer.stats()
+        if stats["dropped"]:
+            logging.warning(f"Session log dropped {stats['dropped']} records")
+        if not stopped:
+            # the file is still being appended: converting or deleting it now
+            # would lose records, so leave it where it is
+            logging.warning(f"Session log still being written after {CLOSE_TIMEOUT}s, "
+                            f"skipping export; records left in {JSONL}")
+            print(f"⚠️ Session log not exported, still being written: {JSONL}")
+            return
+
     logging.shutdown()  # flush debug.log
 
     # nothing recorded? skip
@@ -0,0 +1,70 @@
+# utils/profile_store.py
+"""
+Small persistent store for adapter and vehicle profiles.
+
+Unlike the session logs (wiped on exit), profiles survive restarts so a
+known car or adapter can skip slow discovery steps. Vehicles are keyed by
+a one-way hash, never by VIN or any other raw identifier. The only raw
+identifier kept is the MAC of the user's own Bluetooth adapter, which is
+needed to reuse its rfcomm binding.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+CONFIG_HOME = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config")
+PROFILE_FILE = CONFIG_HOME / "librediag" / "profiles.json"
+
+_lock = threading.Lock()
+_cache = None
+
+
+def hashed_key(*parts) -> str:
+    """Stable, non-reversible key for identifiers such as a VIN or MAC."""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _load() -> dict:
+    global _cache
+    if _cache is None:
+        try:
+            with PROFILE_FILE.open(encoding="utf-8") as f:
+                _cache = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def get_profile(section: str, key: str) -> dict:
+    """Return a copy of the stored profile, or {} if unknown."""
+    with _lock:
+        return dict(_load().get(section, {}).get(key, {}))
+
+
+def update_profile(section: str, key: str, **values) -> dict:
+    """Merge `values` into a profile and write the store to disk."""
+    with _lock:
+        profile = _load().setdefault(section, {}).setdefault(key, {})
+        profile.update(values)
+        _write()
+        return dict(profile)
+
+
+def forget_profile(section: str, key: str):
+    with _lock:
+        if _load().get(section, {}).pop(key, None) is not None:
+            _write()
+
+
+def _write():
+    try:
+        PROFILE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = PROFILE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_load(), indent=2), encoding="utf-8")
+        tmp.replace(PROFILE_FILE)
+    except OSError as exc:
+        print(f"⚠️ Could not save profile: {exc}")